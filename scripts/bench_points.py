@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Measure memory and copy cost of freehand stroke point storage.
+
+Compares a list of Point dataclasses (the original storage) with the
+array-backed PointArray, without needing GTK:
+
+    python3 scripts/bench_points.py [--points N]
+"""
+
+import argparse
+import copy
+import math
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.editor import Point  # noqa: E402
+from src.points import PointArray  # noqa: E402
+
+
+def make_list(count):
+    return [Point(math.cos(i * 0.01) * i, math.sin(i * 0.01) * i) for i in range(count)]
+
+
+def make_array(count):
+    points = PointArray()
+    for i in range(count):
+        points.append(Point(math.cos(i * 0.01) * i, math.sin(i * 0.01) * i))
+    return points
+
+
+def allocated(factory, count):
+    """Bytes still allocated by the object factory(count) returns."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = factory(count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def timed_deepcopy(points, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        copy.deepcopy(points)
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=10_000)
+    args = parser.parse_args()
+    count = args.points
+
+    print(f"Stroke of {count} points")
+    print(f"{'storage':<16}{'bytes':>12}{'bytes/pt':>10}{'deepcopy ms':>14}")
+    for name, factory in (("list[Point]", make_list), ("PointArray", make_array)):
+        size = allocated(factory, count)
+        copy_ms = timed_deepcopy(factory(count)) * 1000
+        print(f"{name:<16}{size:>12}{size / count:>10.1f}{copy_ms:>14.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,649 @@
+"""Cached rendering layers for the LikX editor canvas."""
+
+import math
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+try:
+    import gi
+
+    gi.require_version("Gdk", "3.0")
+    from gi.repository import Gdk
+
+    GTK_AVAILABLE = True
+except (ImportError, ValueError):
+    GTK_AVAILABLE = False
+
+from .editor import (
+    DrawingElement,
+    Rect,
+    get_element_extents,
+    rects_intersect,
+    render_elements,
+)
+from .render_cache import RenderCache
+from .tiled_image import TiledImage
+
+# Largest cached layer (in device pixels) before falling back to direct drawing
+LAYER_MAX_PIXELS = 32 * 1024 * 1024
+# Cairo image surfaces cannot exceed this size in either dimension
+CAIRO_MAX_DIMENSION = 32767
+# Zoom beyond which image pixels are shown as sharp squares
+NEAREST_ZOOM = 2.0
+# Zoom from which a grid is drawn between image pixels
+PIXEL_GRID_ZOOM = 8.0
+# Cached zoomed views cover the visible area rounded out to this many pixels
+VIEW_ALIGN = 32
+
+
+def uses_nearest(scale: float) -> bool:
+    """Check whether the image is drawn with nearest-neighbour filtering."""
+    return scale > NEAREST_ZOOM
+
+
+def image_filter(scale: float) -> int:
+    """Get the cairo filter for painting the image at scale."""
+    import cairo
+
+    return cairo.FILTER_NEAREST if uses_nearest(scale) else cairo.FILTER_GOOD
+
+
+def intersect_rects(a: Rect, b: Rect) -> Optional[Rect]:
+    """Get the overlap of two rectangles, or None if they are disjoint."""
+    if not rects_intersect(a, b):
+        return None
+    return (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3]))
+
+
+def merge_rects(rects: List[Rect]) -> List[Rect]:
+    """Union overlapping rectangles until the remaining ones are disjoint."""
+    merged: List[Rect] = []
+    for rect in rects:
+        while True:
+            for i, other in enumerate(merged):
+                if rects_intersect(rect, other):
+                    rect = (
+                        min(rect[0], other[0]),
+                        min(rect[1], other[1]),
+                        max(rect[2], other[2]),
+                        max(rect[3], other[3]),
+                    )
+                    del merged[i]
+                    break
+            else:
+                break
+        merged.append(rect)
+    return merged
+
+
+def to_device_rect(
+    rect: Rect, scale: float, width: int, height: int
+) -> Optional[Tuple[int, int, int, int]]:
+    """Convert an image-space rect to a widget (x, y, width, height) area.
+
+    The area is grown to whole pixels and clamped to the widget size;
+    returns None if nothing of it is visible.
+    """
+    x1 = max(0, math.floor(rect[0] * scale) - 1)
+    y1 = max(0, math.floor(rect[1] * scale) - 1)
+    x2 = min(width, math.ceil(rect[2] * scale) + 1)
+    y2 = min(height, math.ceil(rect[3] * scale) + 1)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return (x1, y1, x2 - x1, y2 - y1)
+
+
+class DamageTracker:
+    """Remembers where transient overlays were last drawn.
+
+    Overlays such as the element being drawn, selection handles and snap
+    guides move between frames, so both the area they were drawn in and
+    the area they are about to be drawn in must be repainted.
+    """
+
+    def __init__(self):
+        """Initialize with nothing on screen."""
+        self._drawn: List[Rect] = []
+
+    def drawn(self, rects: List[Rect]) -> None:
+        """Record the overlay areas painted by the current frame."""
+        self._drawn = list(rects)
+
+    def damage(self, rects: List[Rect]) -> List[Rect]:
+        """Get the areas to repaint to move overlays from drawn to rects."""
+        return merge_rects(self._drawn + list(rects))
+
+
+def _surface_from_pixbuf(pixbuf: Any) -> Any:
+    """Convert a pixbuf to a cairo ImageSurface."""
+    return Gdk.cairo_surface_create_from_pixbuf(pixbuf, 1, None)
+
+
+def _downscale_half(surface: Any) -> Any:
+    """Make a half-size copy of a cairo ImageSurface."""
+    import cairo
+
+    width, height = surface.get_width(), surface.get_height()
+    half_width, half_height = max(1, (width + 1) // 2), max(1, (height + 1) // 2)
+    half = cairo.ImageSurface(cairo.FORMAT_ARGB32, half_width, half_height)
+    ctx = cairo.Context(half)
+    ctx.scale(half_width / width, half_height / height)
+    ctx.set_source_surface(surface, 0, 0)
+    ctx.get_source().set_filter(cairo.FILTER_GOOD)
+    ctx.paint()
+    return half
+
+
+class ImagePyramid:
+    """Cairo surfaces of the base image at full, 1/2, 1/4, ... resolution.
+
+    Converting the pixbuf for cairo and filtering it down on every frame is
+    expensive for large captures, so the full-resolution surface is made
+    once and smaller levels are built lazily, each from the one above.
+    The levels are dropped when the image or its generation changes (crop,
+    effects), see :meth:`get_level`.
+    """
+
+    def __init__(self):
+        """Initialize an empty pyramid."""
+        self._levels: List[Any] = []
+        self._tiled: Optional[TiledImage] = None
+        self._key: Optional[Hashable] = None
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def invalidate(self) -> None:
+        """Drop all cached levels."""
+        self._levels = []
+        self._tiled = None
+        self._key = None
+
+    @staticmethod
+    def level_for(scale: float) -> int:
+        """Get the smallest level that still has at least scale resolution."""
+        if scale >= 1.0:
+            return 0
+        return int(math.floor(math.log2(1.0 / scale) + 1e-9))
+
+    def get_level(self, pixbuf: Any, level: int, generation: int = 0) -> Any:
+        """Return the surface for a level, building missing levels.
+
+        Args:
+            pixbuf: Base image.
+            level: Pyramid level, 0 being full resolution.
+            generation: Image generation; a new value drops cached levels.
+
+        Returns:
+            A cairo ImageSurface (the smallest one if level is past 1x1),
+            or None if the image is too large for a cairo surface and has
+            to be painted tile by tile instead.
+        """
+        key = (id(pixbuf), generation)
+        if key != self._key:
+            self.invalidate()
+            self._key = key
+
+        if not self._levels:
+            width, height = pixbuf.get_width(), pixbuf.get_height()
+            if max(width, height) > CAIRO_MAX_DIMENSION:
+                return None
+            self._levels.append(_surface_from_pixbuf(pixbuf))
+
+        while len(self._levels) <= level:
+            top = self._levels[-1]
+            if top.get_width() == 1 and top.get_height() == 1:
+                break
+            self._levels.append(_downscale_half(top))
+        return self._levels[min(level, len(self._levels) - 1)]
+
+    def paint(self, ctx: Any, pixbuf: Any, scale: float, generation: int = 0) -> None:
+        """Paint the base image into ctx, whose user space is image pixels.
+
+        Args:
+            ctx: Cairo context.
+            pixbuf: Base image.
+            scale: Zoom the image will be shown at, used to pick the level.
+            generation: Image generation, see :meth:`get_level`.
+        """
+        surface = self.get_level(pixbuf, self.level_for(scale), generation)
+        if surface is None:
+            # Beyond cairo's size limit - paint the visible tiles only
+            if self._tiled is None:
+                self._tiled = TiledImage(pixbuf)
+            self._tiled.paint(ctx, ctx.clip_extents(), filter=image_filter(scale))
+            return
+
+        ctx.save()
+        ctx.scale(
+            pixbuf.get_width() / surface.get_width(),
+            pixbuf.get_height() / surface.get_height(),
+        )
+        ctx.set_source_surface(surface, 0, 0)
+        ctx.get_source().set_filter(image_filter(scale))
+        ctx.paint()
+        ctx.restore()
+
+
+def view_rect(visible: Rect, width: int, height: int) -> Optional[Rect]:
+    """Round a visible area out to VIEW_ALIGN pixels, within the image.
+
+    Returns:
+        Integer (x1, y1, x2, y2), or None if nothing of the image is visible.
+    """
+    x1 = max(0, int(math.floor(visible[0] / VIEW_ALIGN)) * VIEW_ALIGN)
+    y1 = max(0, int(math.floor(visible[1] / VIEW_ALIGN)) * VIEW_ALIGN)
+    x2 = min(width, int(math.ceil(visible[2] / VIEW_ALIGN)) * VIEW_ALIGN)
+    y2 = min(height, int(math.ceil(visible[3] / VIEW_ALIGN)) * VIEW_ALIGN)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return (x1, y1, x2, y2)
+
+
+class ZoomedView:
+    """The visible part of the image pre-scaled to device pixels.
+
+    At high zoom the image is too large to cache as a whole layer, and
+    resampling it on every frame (in-progress strokes, selection handles)
+    is wasted work: the pixels only change when the view scrolls or the
+    image is edited. This keeps the visible area, rounded out to
+    VIEW_ALIGN image pixels so small scrolls reuse it, scaled with
+    nearest-neighbour filtering, and frames only blit it.
+    """
+
+    def __init__(self):
+        """Initialize with no cached view."""
+        self.rebuilds = 0
+        self._surface: Optional[Any] = None
+        self._origin = (0, 0)
+        self._rect: Optional[Rect] = None
+        self._key: Optional[Hashable] = None
+
+    def invalidate(self) -> None:
+        """Drop the cached view."""
+        self._surface = None
+        self._key = None
+
+    def paint(
+        self,
+        ctx: Any,
+        pixbuf: Any,
+        scale: float,
+        visible: Rect,
+        pyramid: ImagePyramid,
+        generation: int = 0,
+    ) -> None:
+        """Paint the image into ctx, whose user space is device pixels.
+
+        Args:
+            ctx: Cairo context, unscaled, with the image origin at (0, 0).
+            pixbuf: Base image.
+            scale: Zoom factor (image to device pixels).
+            visible: Visible (x1, y1, x2, y2) area in image coordinates.
+            pyramid: ImagePyramid to scale the image from.
+            generation: Image generation, see ImagePyramid.get_level.
+        """
+        rect = view_rect(visible, pixbuf.get_width(), pixbuf.get_height())
+        if rect is None:
+            return
+
+        key = (id(pixbuf), generation, scale)
+        if self._surface is None or key != self._key or not _contains(self._rect, rect):
+            self._surface, self._origin = self._render(
+                pixbuf, rect, scale, pyramid, generation
+            )
+            self._rect = rect
+            self._key = key
+            self.rebuilds += 1
+
+        ctx.set_source_surface(self._surface, *self._origin)
+        ctx.paint()
+
+    @staticmethod
+    def _render(
+        pixbuf: Any,
+        rect: Rect,
+        scale: float,
+        pyramid: ImagePyramid,
+        generation: int,
+    ) -> Tuple[Any, Tuple[int, int]]:
+        """Scale rect of the image into a new surface and its device origin."""
+        import cairo
+
+        x1, y1, x2, y2 = rect
+        left, top = math.floor(x1 * scale), math.floor(y1 * scale)
+        width = max(1, math.ceil(x2 * scale) - left)
+        height = max(1, math.ceil(y2 * scale) - top)
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+        ctx = cairo.Context(surface)
+        ctx.translate(-left, -top)
+        ctx.scale(scale, scale)
+        ctx.rectangle(x1, y1, x2 - x1, y2 - y1)
+        ctx.clip()
+        pyramid.paint(ctx, pixbuf, scale, generation)
+        return surface, (left, top)
+
+
+def _contains(outer: Optional[Rect], inner: Rect) -> bool:
+    """Check whether rect outer covers rect inner."""
+    if outer is None:
+        return False
+    return (
+        outer[0] <= inner[0]
+        and outer[1] <= inner[1]
+        and outer[2] >= inner[2]
+        and outer[3] >= inner[3]
+    )
+
+
+class PixelGrid:
+    """Lines between image pixels at high zoom, from a repeating pattern.
+
+    One grid cell is rendered once per zoom level and tiled by cairo,
+    instead of stroking a line per pixel row and column on every frame.
+    """
+
+    def __init__(self, min_scale: float = PIXEL_GRID_ZOOM):
+        """Initialize.
+
+        Args:
+            min_scale: Smallest zoom the grid is shown at.
+        """
+        self.min_scale = min_scale
+        self._pattern: Optional[Any] = None
+        self._scale: Optional[float] = None
+
+    def visible(self, scale: float) -> bool:
+        """Check whether the grid is shown at scale."""
+        return scale >= self.min_scale
+
+    def paint(self, ctx: Any, scale: float, width: int, height: int) -> None:
+        """Draw the grid over a width x height image.
+
+        Args:
+            ctx: Cairo context in image coordinates, scaled by scale.
+            scale: Zoom factor (image to device pixels).
+            width, height: Image size.
+        """
+        if not self.visible(scale):
+            return
+
+        if self._pattern is None or self._scale != scale:
+            self._pattern = self._make_pattern(scale)
+            self._scale = scale
+
+        ctx.save()
+        ctx.rectangle(0, 0, width, height)
+        ctx.clip()
+        # Pattern space is device pixels from the image origin
+        ctx.scale(1 / scale, 1 / scale)
+        ctx.set_source(self._pattern)
+        ctx.paint()
+        ctx.restore()
+
+    @staticmethod
+    def _make_pattern(scale: float) -> Any:
+        """Render one grid cell: a hairline on its top and left edges."""
+        import cairo
+
+        cell = max(1, math.ceil(scale))
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, cell, cell)
+        ctx = cairo.Context(surface)
+        ctx.set_source_rgba(0.5, 0.5, 0.5, 0.35)
+        ctx.rectangle(0, 0, cell, 1)
+        ctx.rectangle(0, 1, 1, cell - 1)
+        ctx.fill()
+
+        pattern = cairo.SurfacePattern(surface)
+        pattern.set_extend(cairo.EXTEND_REPEAT)
+        pattern.set_filter(cairo.FILTER_NEAREST)
+        # One cell per image pixel, even at fractional zoom
+        pattern.set_matrix(cairo.Matrix(xx=cell / scale, yy=cell / scale))
+        return pattern
+
+
+class AnnotationLayer:
+    """Offscreen surface holding the base image plus committed annotations.
+
+    The surface is rendered at the current zoom (device pixels) so vector
+    annotations stay sharp, and is only rebuilt when its key changes: the
+    editor's edit generation, the base image, the zoom or any extra state
+    the caller folds in (e.g. the grid overlay). Each frame then only has
+    to composite this surface and draw the in-progress element on top.
+    """
+
+    def __init__(self, max_pixels: int = LAYER_MAX_PIXELS):
+        """Initialize an empty layer.
+
+        Args:
+            max_pixels: Largest surface (width * height) worth caching.
+        """
+        self.max_pixels = max_pixels
+        self.rebuilds = 0
+        self._surface: Optional[Any] = None
+        self._key: Optional[Hashable] = None
+
+    def invalidate(self) -> None:
+        """Drop the cached surface so the next frame rebuilds it."""
+        self._surface = None
+        self._key = None
+
+    def fits(self, pixbuf: Any, scale: float) -> bool:
+        """Check whether a layer for pixbuf at scale is small enough to cache."""
+        width, height = self.layer_size(pixbuf, scale)
+        return (
+            width <= CAIRO_MAX_DIMENSION
+            and height <= CAIRO_MAX_DIMENSION
+            and width * height <= self.max_pixels
+        )
+
+    @staticmethod
+    def layer_size(pixbuf: Any, scale: float) -> tuple:
+        """Get the (width, height) in device pixels of a layer at scale."""
+        return (
+            max(1, int(pixbuf.get_width() * scale)),
+            max(1, int(pixbuf.get_height() * scale)),
+        )
+
+    def get_surface(
+        self,
+        pixbuf: Any,
+        elements: List[DrawingElement],
+        generation: int,
+        scale: float = 1.0,
+        render_cache: Optional[RenderCache] = None,
+        underlay: Optional[Callable[[Any], None]] = None,
+        extra_key: Hashable = None,
+        pyramid: Optional[ImagePyramid] = None,
+    ) -> Any:
+        """Return the cached layer, rebuilding it if anything changed.
+
+        Args:
+            pixbuf: Base image.
+            elements: Committed elements to bake into the layer.
+            generation: Edit generation of the elements.
+            scale: Zoom factor (image to device pixels).
+            render_cache: Optional cache for blur/pixelate rasters.
+            underlay: Optional callback drawing between image and elements,
+                called with a context in image coordinates.
+            extra_key: Hashable state affecting the underlay.
+            pyramid: Optional ImagePyramid to paint the base image from.
+
+        Returns:
+            A cairo ImageSurface in device pixels.
+        """
+        key = (generation, id(pixbuf), scale, extra_key)
+        if render_cache is not None:
+            key += (render_cache.generation,)
+
+        if self._surface is None or key != self._key:
+            self._surface = self._render(
+                pixbuf, elements, scale, render_cache, underlay, pyramid
+            )
+            self._key = key
+            self.rebuilds += 1
+        return self._surface
+
+    def _render(
+        self,
+        pixbuf: Any,
+        elements: List[DrawingElement],
+        scale: float,
+        render_cache: Optional[RenderCache],
+        underlay: Optional[Callable[[Any], None]],
+        pyramid: Optional[ImagePyramid] = None,
+    ) -> Any:
+        """Render the base image and elements into a new surface."""
+        import cairo
+
+        width, height = self.layer_size(pixbuf, scale)
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+        ctx = cairo.Context(surface)
+        ctx.scale(scale, scale)
+
+        if pyramid is not None:
+            generation = render_cache.generation if render_cache else 0
+            pyramid.paint(ctx, pixbuf, scale, generation)
+        else:
+            Gdk.cairo_set_source_pixbuf(ctx, pixbuf, 0, 0)
+            ctx.paint()
+
+        if underlay is not None:
+            underlay(ctx)
+
+        if elements:
+            render_elements(ctx, elements, pixbuf, cache=render_cache)
+
+        return surface
+
+
+class DragSprites:
+    """Rasterized copies of the elements being dragged.
+
+    When a move starts each selected element is rendered once into its own
+    surface (device pixels, covering its extents); every frame of the drag
+    then only composites those surfaces at the current offset instead of
+    re-tracing strokes and re-running effects. The AnnotationLayer keeps
+    the other elements for the whole drag under :attr:`generation`, the
+    edit generation captured when the sprites were made. Resizing and
+    releasing go back to rendering from the vector data.
+    """
+
+    def __init__(self, max_pixels: int = LAYER_MAX_PIXELS):
+        """Initialize with no sprites.
+
+        Args:
+            max_pixels: Largest total sprite area worth caching.
+        """
+        self.max_pixels = max_pixels
+        self.renders = 0
+        self.generation = 0
+        self._sprites: List[Tuple[Any, int, int]] = []
+        self._key: Optional[Hashable] = None
+        self._origin = (0.0, 0.0)
+
+    @property
+    def active(self) -> bool:
+        """Whether sprites are held for a drag."""
+        return self._key is not None
+
+    def end(self) -> None:
+        """Drop the sprites once the drag is over."""
+        self._sprites = []
+        self._key = None
+
+    @staticmethod
+    def sprite_rect(
+        elem: DrawingElement, scale: float
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """Get the device-pixel (x, y, width, height) a sprite of elem covers."""
+        extents = get_element_extents(elem)
+        if not extents:
+            return None
+        x1 = math.floor(extents[0] * scale)
+        y1 = math.floor(extents[1] * scale)
+        x2 = math.ceil(extents[2] * scale)
+        y2 = math.ceil(extents[3] * scale)
+        return (x1, y1, max(1, x2 - x1), max(1, y2 - y1))
+
+    def begin(
+        self,
+        pixbuf: Any,
+        elements: List[DrawingElement],
+        generation: int,
+        offset: Tuple[float, float],
+        scale: float = 1.0,
+        render_cache: Optional[RenderCache] = None,
+        key: Hashable = None,
+    ) -> bool:
+        """Rasterize the dragged elements unless already done for key.
+
+        Args:
+            pixbuf: Base image (for blur and pixelate).
+            elements: Selected elements at their current position.
+            generation: Current edit generation.
+            offset: Drag offset the elements have already moved by.
+            scale: Zoom factor (image to device pixels).
+            render_cache: Optional cache for blur/pixelate rasters.
+            key: Hashable state the sprites depend on (e.g. the selection).
+
+        Returns:
+            False if the sprites would be too large to cache.
+        """
+        full_key = (id(pixbuf), scale, key)
+        if render_cache is not None:
+            full_key += (render_cache.generation,)
+        if full_key == self._key:
+            return True
+
+        self.end()
+        rects = [(elem, self.sprite_rect(elem, scale)) for elem in elements]
+        rects = [(elem, rect) for elem, rect in rects if rect]
+        if sum(rect[2] * rect[3] for _, rect in rects) > self.max_pixels or any(
+            rect[2] > CAIRO_MAX_DIMENSION or rect[3] > CAIRO_MAX_DIMENSION
+            for _, rect in rects
+        ):
+            return False
+
+        self._sprites = [
+            (self._render(pixbuf, elem, rect, scale, render_cache), rect[0], rect[1])
+            for elem, rect in rects
+        ]
+        self._key = full_key
+        self._origin = offset
+        self.generation = generation
+        self.renders += 1
+        return True
+
+    def paint(self, ctx: Any, offset: Tuple[float, float], scale: float = 1.0) -> None:
+        """Composite the sprites moved to the current drag offset.
+
+        Args:
+            ctx: Cairo context in device pixels.
+            offset: Current drag offset in image coordinates.
+            scale: Zoom factor the sprites were rendered at.
+        """
+        # Whole device pixels keep the sprites as sharp as the vectors
+        dx = round((offset[0] - self._origin[0]) * scale)
+        dy = round((offset[1] - self._origin[1]) * scale)
+        for surface, x, y in self._sprites:
+            ctx.set_source_surface(surface, x + dx, y + dy)
+            ctx.paint()
+
+    @staticmethod
+    def _render(
+        pixbuf: Any,
+        elem: DrawingElement,
+        rect: Tuple[int, int, int, int],
+        scale: float,
+        render_cache: Optional[RenderCache],
+    ) -> Any:
+        """Render one element into a surface covering rect."""
+        import cairo
+
+        x, y, width, height = rect
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+        ctx = cairo.Context(surface)
+        ctx.translate(-x, -y)
+        ctx.scale(scale, scale)
+        render_elements(ctx, [elem], pixbuf, cache=render_cache)
+        return surface
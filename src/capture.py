@@ -6,7 +6,7 @@ import time
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Callable, List, Optional, Tuple
 
 try:
     import gi
@@ -20,6 +20,9 @@ except (ImportError, ValueError):
     GTK_AVAILABLE = False
 
 from . import config
+from .image import compact_pixbuf
+from .png_optimizer import configured_preset, optimize_png
+from .saving import SaveJob, pixbuf_format, save_service, write_atomic
 
 
 class CaptureMode(Enum):
@@ -47,11 +50,14 @@ class CaptureResult:
         filepath: Optional[Path] = None,
         error: Optional[str] = None,
         pixbuf: Optional[object] = None,
+        saved_bytes: int = 0,
     ):
         self.success = success
         self.filepath = filepath
         self.error = error
         self.pixbuf = pixbuf
+        # Bytes the PNG optimizer saved when the capture was written
+        self.saved_bytes = saved_bytes
 
     def __bool__(self) -> bool:
         return self.success
@@ -213,7 +219,7 @@ def capture_fullscreen_wayland(delay: int = 0) -> CaptureResult:
     try:
         result = subprocess.run(["grim", temp_file], capture_output=True, timeout=5)
         if result.returncode == 0 and os.path.exists(temp_file):
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file(temp_file)
+            pixbuf = compact_pixbuf(GdkPixbuf.Pixbuf.new_from_file(temp_file))
             os.unlink(temp_file)
             return CaptureResult(True, pixbuf=pixbuf)
     except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
@@ -225,7 +231,7 @@ def capture_fullscreen_wayland(delay: int = 0) -> CaptureResult:
             ["gnome-screenshot", "-f", temp_file], capture_output=True, timeout=5
         )
         if result.returncode == 0 and os.path.exists(temp_file):
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file(temp_file)
+            pixbuf = compact_pixbuf(GdkPixbuf.Pixbuf.new_from_file(temp_file))
             os.unlink(temp_file)
             return CaptureResult(True, pixbuf=pixbuf)
     except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
@@ -237,7 +243,7 @@ def capture_fullscreen_wayland(delay: int = 0) -> CaptureResult:
             ["spectacle", "-b", "-n", "-o", temp_file], capture_output=True, timeout=5
         )
         if result.returncode == 0 and os.path.exists(temp_file):
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file(temp_file)
+            pixbuf = compact_pixbuf(GdkPixbuf.Pixbuf.new_from_file(temp_file))
             os.unlink(temp_file)
             return CaptureResult(True, pixbuf=pixbuf)
     except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
@@ -329,7 +335,7 @@ def capture_region_wayland(
             ["grim", "-g", geometry, temp_file], capture_output=True, timeout=5
         )
         if result.returncode == 0 and os.path.exists(temp_file):
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file(temp_file)
+            pixbuf = compact_pixbuf(GdkPixbuf.Pixbuf.new_from_file(temp_file))
             os.unlink(temp_file)
             return CaptureResult(True, pixbuf=pixbuf)
     except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
@@ -340,7 +346,11 @@ def capture_region_wayland(
     if full_result.success and full_result.pixbuf:
         try:
             cropped = GdkPixbuf.Pixbuf.new(
-                GdkPixbuf.Colorspace.RGB, True, 8, width, height
+                GdkPixbuf.Colorspace.RGB,
+                full_result.pixbuf.get_has_alpha(),
+                8,
+                width,
+                height,
             )
             full_result.pixbuf.copy_area(x, y, width, height, cropped, 0, 0)
             return CaptureResult(True, pixbuf=cropped)
@@ -432,7 +442,7 @@ def capture_window_wayland(delay: int = 0) -> CaptureResult:
             ["gnome-screenshot", "-w", "-f", temp_file], capture_output=True, timeout=5
         )
         if result.returncode == 0 and os.path.exists(temp_file):
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file(temp_file)
+            pixbuf = compact_pixbuf(GdkPixbuf.Pixbuf.new_from_file(temp_file))
             os.unlink(temp_file)
             return CaptureResult(True, pixbuf=pixbuf)
     except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
@@ -446,7 +456,7 @@ def capture_window_wayland(delay: int = 0) -> CaptureResult:
             timeout=5,
         )
         if result.returncode == 0 and os.path.exists(temp_file):
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file(temp_file)
+            pixbuf = compact_pixbuf(GdkPixbuf.Pixbuf.new_from_file(temp_file))
             os.unlink(temp_file)
             return CaptureResult(True, pixbuf=pixbuf)
     except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
@@ -538,10 +548,28 @@ def capture_window(window_id: Optional[int] = None, delay: int = 0) -> CaptureRe
         return CaptureResult(False, error=f"Window capture failed: {str(e)}")
 
 
+def _save_target(
+    filepath: Optional[Path], format_str: Optional[str]
+) -> Tuple[Path, str]:
+    """Resolve the file and GdkPixbuf format a capture is saved as."""
+    if filepath is None:
+        filepath = config.get_save_path(format_str=format_str)
+    else:
+        filepath = Path(filepath)
+
+    if format_str is None:
+        format_str = filepath.suffix.lstrip(".").lower()
+        if not format_str:
+            format_str = config.get_setting("default_format", "png")
+
+    return filepath, pixbuf_format(format_str)
+
+
 def save_capture(
     result: CaptureResult,
     filepath: Optional[Path] = None,
     format_str: Optional[str] = None,
+    optimize: Optional[str] = None,
 ) -> CaptureResult:
     """Save a captured screenshot to file.
 
@@ -549,6 +577,7 @@ def save_capture(
         result: The CaptureResult containing the pixbuf.
         filepath: Path to save the file (auto-generated if None).
         format_str: Image format (uses config default if None).
+        optimize: PNG optimizer preset, or None to write GdkPixbuf's PNG.
 
     Returns:
         CaptureResult with the filepath set.
@@ -556,38 +585,78 @@ def save_capture(
     if not result.success or result.pixbuf is None:
         return CaptureResult(False, error="No screenshot to save")
 
-    if filepath is None:
-        filepath = config.get_save_path(format_str=format_str)
-    else:
-        filepath = Path(filepath)
-
-    if format_str is None:
-        format_str = filepath.suffix.lstrip(".").lower()
-        if not format_str:
-            format_str = config.get_setting("default_format", "png")
-
-    # Map format strings to GdkPixbuf format names
-    format_map = {
-        "jpg": "jpeg",
-        "jpeg": "jpeg",
-        "png": "png",
-        "bmp": "bmp",
-        "gif": "gif",
-    }
-
-    pixbuf_format = format_map.get(format_str.lower(), "png")
+    filepath, pixbuf_format_name = _save_target(filepath, format_str)
 
     try:
         # Ensure parent directory exists
         filepath.parent.mkdir(parents=True, exist_ok=True)
 
-        result.pixbuf.savev(str(filepath), pixbuf_format, [], [])
+        if optimize is not None and pixbuf_format_name == "png":
+            _, data = result.pixbuf.save_to_bufferv("png", [], [])
+            optimized = optimize_png(result.pixbuf, data, optimize)
+            write_atomic(filepath, optimized.data)
+            return CaptureResult(
+                True,
+                filepath=filepath,
+                pixbuf=result.pixbuf,
+                saved_bytes=optimized.saved,
+            )
+
+        result.pixbuf.savev(str(filepath), pixbuf_format_name, [], [])
         return CaptureResult(True, filepath=filepath, pixbuf=result.pixbuf)
 
     except Exception as e:
         return CaptureResult(False, error=f"Failed to save: {str(e)}")
 
 
+def save_capture_async(
+    result: CaptureResult,
+    on_done: Callable[[CaptureResult], None],
+    filepath: Optional[Path] = None,
+    format_str: Optional[str] = None,
+    optimize: Optional[str] = None,
+) -> Optional[SaveJob]:
+    """Save a captured screenshot on a worker thread.
+
+    Like :func:`save_capture`, but the image is encoded and written by
+    the shared SaveService, so the GTK main loop keeps running.
+
+    Args:
+        result: The CaptureResult containing the pixbuf.
+        on_done: Called on the main loop with the save's CaptureResult.
+        filepath: Path to save the file (auto-generated if None).
+        format_str: Image format (uses config default if None).
+        optimize: PNG optimizer preset, or None to write GdkPixbuf's PNG.
+
+    Returns:
+        The queued SaveJob, or None if there was nothing to save (on_done
+        has been called with the failure).
+    """
+    if not result.success or result.pixbuf is None:
+        on_done(CaptureResult(False, error="No screenshot to save"))
+        return None
+
+    filepath, pixbuf_format_name = _save_target(filepath, format_str)
+    pixbuf = result.pixbuf
+
+    def finished(job: SaveJob) -> None:
+        if job.succeeded:
+            on_done(
+                CaptureResult(
+                    True,
+                    filepath=job.filepath,
+                    pixbuf=pixbuf,
+                    saved_bytes=job.saved_bytes,
+                )
+            )
+        else:
+            on_done(CaptureResult(False, error=f"Failed to save: {job.error}"))
+
+    return save_service().save(
+        pixbuf, filepath, pixbuf_format_name, on_done=finished, optimize=optimize
+    )
+
+
 def copy_to_clipboard(result: CaptureResult, use_gtk: bool = True) -> bool:
     """Copy a captured screenshot to the clipboard.
 
@@ -718,6 +787,6 @@ def capture(
 
     # Auto-save if requested
     if auto_save or cfg.get("auto_save", False):
-        result = save_capture(result)
+        result = save_capture(result, optimize=configured_preset(cfg))
 
     return result
@@ -173,6 +173,7 @@ def build_command_registry(editor_window) -> List[Command]:
                 lambda: (
                     editor_window.editor_state.zoom_in(),
                     editor_window._update_zoom_label(),
+                    editor_window._update_canvas_size(),
                     editor_window.drawing_area.queue_draw(),
                 ),
                 "🔎",
@@ -184,6 +185,7 @@ def build_command_registry(editor_window) -> List[Command]:
                 lambda: (
                     editor_window.editor_state.zoom_out(),
                     editor_window._update_zoom_label(),
+                    editor_window._update_canvas_size(),
                     editor_window.drawing_area.queue_draw(),
                 ),
                 "🔍",
@@ -195,6 +197,7 @@ def build_command_registry(editor_window) -> List[Command]:
                 lambda: (
                     editor_window.editor_state.reset_zoom(),
                     editor_window._update_zoom_label(),
+                    editor_window._update_canvas_size(),
                     editor_window.drawing_area.queue_draw(),
                 ),
                 "↺",
@@ -0,0 +1,121 @@
+"""Flattened export images for LikX, reused while a document is unchanged."""
+
+import threading
+from typing import Any, Callable, List, Optional
+
+from .editor import DrawingElement
+from .render_cache import RenderCache
+from .saving import run_on_main_loop
+from .tiled_image import render_annotated
+
+
+class ExportCompositor:
+    """The flattened image of one document, shared by every export.
+
+    Copy, save, pin and upload all need the base image with the
+    annotations drawn on top. The composite is kept together with the base
+    pixbuf and the editor's ``edit_generation`` it was made from, so
+    exporting an unchanged document again reuses it instead of rendering
+    the whole image once more.
+
+    Rendering holds a lock, so :meth:`composite_async` can flatten on a
+    worker thread while the editor keeps drawing; a second export that
+    arrives meanwhile waits for the first and reuses its result. Blur and
+    pixelate rasters go to the compositor's own RenderCache, which only
+    that lock guards. Its keys name the base image by id(), so it is
+    emptied whenever the base image changes; an id can be reused once the
+    old pixbuf is freed.
+    """
+
+    def __init__(self, cache: Optional[RenderCache] = None):
+        """Initialize the compositor.
+
+        Args:
+            cache: RenderCache for effect rasters (a private one by default;
+                it must not be shared with the GTK thread).
+        """
+        self.cache = cache if cache is not None else RenderCache()
+        self.renders = 0
+        self._lock = threading.Lock()
+        self._source: Any = None
+        self._generation: Optional[int] = None
+        self._composite: Any = None
+
+    def cached(self, pixbuf: Any, generation: int) -> Any:
+        """Get the composite if it is up to date, else None."""
+        with self._lock:
+            return self._lookup(pixbuf, generation)
+
+    def _lookup(self, pixbuf: Any, generation: int) -> Any:
+        if self._source is pixbuf and self._generation == generation:
+            return self._composite
+        return None
+
+    def composite(
+        self, pixbuf: Any, elements: List[DrawingElement], generation: int
+    ) -> Any:
+        """Get the flattened image, rendering it only if it is stale.
+
+        Args:
+            pixbuf: Base image.
+            elements: Annotations to draw on top.
+            generation: The editor's edit generation for elements.
+
+        Returns:
+            An RGBA GdkPixbuf. It is shared; callers must not modify it.
+        """
+        with self._lock:
+            composite = self._lookup(pixbuf, generation)
+            if composite is None:
+                if pixbuf is not self._source:
+                    self.cache.invalidate()
+                composite = render_annotated(pixbuf, elements, cache=self.cache)
+                self.renders += 1
+                self._source = pixbuf
+                self._generation = generation
+                self._composite = composite
+            return composite
+
+    def composite_async(
+        self,
+        pixbuf: Any,
+        elements: List[DrawingElement],
+        generation: int,
+        callback: Callable[[Any], None],
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ) -> Optional[threading.Thread]:
+        """Flatten on a worker thread and hand the result to callback.
+
+        callback (or on_error, with the exception) runs on the GTK main
+        loop. elements must not change while the worker renders them;
+        pass :meth:`EditorState.export_snapshot`.
+
+        Returns:
+            The worker thread, or None if the composite was up to date and
+            callback has already been called.
+        """
+        composite = self.cached(pixbuf, generation)
+        if composite is not None:
+            callback(composite)
+            return None
+
+        def work() -> None:
+            try:
+                result = self.composite(pixbuf, elements, generation)
+            except Exception as e:
+                if on_error is not None:
+                    run_on_main_loop(on_error, e)
+                return
+            run_on_main_loop(callback, result)
+
+        thread = threading.Thread(target=work, name="likx-export", daemon=True)
+        thread.start()
+        return thread
+
+    def invalidate(self) -> None:
+        """Drop the composite and the cached effect rasters."""
+        with self._lock:
+            self._source = None
+            self._generation = None
+            self._composite = None
+            self.cache.invalidate()
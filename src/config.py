@@ -14,6 +14,8 @@ DEFAULT_CONFIG: Dict[str, Any] = {
     "hotkey_region": "<Control><Shift>R",
     "hotkey_window": "<Control><Shift>W",
     "auto_save": False,
+    "png_optimize": False,  # Shrink automatically saved PNGs (palette, no alpha)
+    "png_preset": "balanced",  # PNG optimizer effort: fast, balanced, small
     "copy_to_clipboard": True,
     "show_notification": True,
     "include_cursor": False,
@@ -34,6 +36,10 @@ DEFAULT_CONFIG: Dict[str, Any] = {
     # Editor settings
     "grid_size": 20,  # Grid snap size in pixels (5-100)
     "snap_to_grid": False,  # Whether grid snap is enabled by default
+    "pixelate_size": 15,  # Block size for the pixelate tool (2-100)
+    "stroke_tolerance": 0.5,  # Max freehand simplification error in px (0-5)
+    "undo_memory_mb": 64,  # Memory budget for undo history; oldest dropped first
+    "picker_sample_size": 1,  # Eyedropper averages a 1x1, 3x3 or 5x5 square
     # GIF recording settings
     "gif_fps": 15,  # Frames per second (10-30)
     "gif_quality": "medium",  # low, medium, high
@@ -4,7 +4,7 @@ import copy
 import math
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, List, Optional, Set, Tuple
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set, Tuple
 
 try:
     import gi
@@ -17,6 +17,46 @@ try:
 except (ImportError, ValueError):
     GTK_AVAILABLE = False
 
+from .pixels import pixel_view, release_views  # noqa: E402
+from .points import PointArray, simplify  # noqa: E402
+from .render_cache import RenderCache  # noqa: E402
+from .snapping import SnapLines  # noqa: E402
+from .spatial_index import SpatialIndex  # noqa: E402
+from .text_layout import TextLayout, get_layout  # noqa: E402
+
+# Lazy-loaded numpy for the vectorized blur/pixelate paths (keeps startup fast)
+np = None
+NUMPY_AVAILABLE = None
+
+
+def _ensure_numpy() -> bool:
+    """Lazy-load numpy when a vectorized pixel operation is needed."""
+    global np, NUMPY_AVAILABLE
+    if NUMPY_AVAILABLE is None:
+        try:
+            import numpy as _np
+
+            np = _np
+            NUMPY_AVAILABLE = True
+        except ImportError:
+            NUMPY_AVAILABLE = False
+    return NUMPY_AVAILABLE
+
+
+def _measure_text(
+    text: str, family: str, size: float, bold: bool = False, italic: bool = False
+) -> Optional[Tuple[tuple, tuple]]:
+    """Measure text the way the renderers draw it (shared layout cache).
+
+    Returns:
+        (ink, logical) boxes as (x1, y1, x2, y2) relative to the pen
+        position on the first baseline, or None if text can't be measured.
+    """
+    layout = get_layout(text, family, size, bold, italic)
+    if layout is None:
+        return None
+    return layout.ink, layout.logical
+
 
 class ToolType(Enum):
     """Available editing tools."""
@@ -106,6 +146,32 @@ COLORS = {
     "pink": Color(1.0, 0.0, 1.0),
 }
 
+# Tools hit-tested against their drawn line rather than their bbox
+STROKE_TOOLS = (ToolType.PEN, ToolType.HIGHLIGHTER, ToolType.LINE, ToolType.ARROW)
+# Tools that record every pointer motion rather than just start and end
+FREEHAND_TOOLS = (ToolType.PEN, ToolType.HIGHLIGHTER, ToolType.ERASER)
+# Tools that process the image under their region
+EFFECT_TOOLS = (ToolType.BLUR, ToolType.PIXELATE)
+# Reach of measurement labels beyond the element's points
+LABEL_OVERHANG = 120
+# Callout box padding around its text and line advance (factor of font size)
+CALLOUT_PADDING = 10
+CALLOUT_LINE_SPACING = 1.3
+# Selection boxes, resize handles and snap guides beyond the element extents
+SELECTION_HANDLE_PAD = 6
+
+Rect = Tuple[float, float, float, float]  # (x1, y1, x2, y2)
+
+# Longest side of the reduced image blurred for live blur previews
+PREVIEW_MAX_SIDE = 1024
+
+# Default memory budget for undo history
+DEFAULT_HISTORY_LIMIT = 64 * 1024 * 1024
+# Rough size of a DrawingElement with its Color and empty PointArray
+ELEMENT_BASE_BYTES = 1024
+# Size of one element reference in a history snapshot
+SNAPSHOT_SLOT_BYTES = 8
+
 
 @dataclass
 class DrawingElement:
@@ -114,7 +180,7 @@ class DrawingElement:
     tool: ToolType
     color: Color = field(default_factory=lambda: Color())
     stroke_width: float = 2.0
-    points: List[Point] = field(default_factory=list)
+    points: PointArray = field(default_factory=PointArray)
     text: str = ""
     filled: bool = False
     font_size: int = 16
@@ -125,8 +191,187 @@ class DrawingElement:
     stamp: str = ""  # For STAMP tool
     fill_color: Optional[Color] = None  # For CALLOUT background
     arrow_style: ArrowStyle = ArrowStyle.OPEN  # For ARROW tool
+    blur_radius: int = 10  # For BLUR tool
+    pixel_size: int = 15  # For PIXELATE tool (block size)
     group_id: Optional[str] = None  # For grouping elements
     locked: bool = False  # For locking elements from modification
+    # Bumped on every geometry edit, invalidating the cached bbox
+    version: int = field(default=0, compare=False, repr=False)
+    _bbox_cache: Optional[tuple] = field(
+        default=None, init=False, compare=False, repr=False
+    )
+
+    def __post_init__(self) -> None:
+        # Accept plain lists of Point and store them compactly
+        if not isinstance(self.points, PointArray):
+            self.points = PointArray(self.points)
+
+    def touch(self) -> None:
+        """Record that the element's points were edited in place."""
+        self.version += 1
+
+
+def get_element_bbox(elem: DrawingElement) -> Optional[tuple]:
+    """Get bounding box (x1, y1, x2, y2) for an element.
+
+    The result is cached on the element until its version changes, so code
+    editing points in place must call DrawingElement.touch afterwards.
+    """
+    key = (elem.version, len(elem.points))
+    cached = elem._bbox_cache
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    bbox = _measure_element_bbox(elem)
+    elem._bbox_cache = (key, bbox)
+    return bbox
+
+
+def _measure_element_bbox(elem: DrawingElement) -> Optional[tuple]:
+    """Compute the bounding box of an element from scratch."""
+    if not elem.points:
+        return None
+
+    point = elem.points[0]
+    if elem.tool == ToolType.NUMBER:
+        # Same radius as _render_number, centered on the point
+        radius = _number_radius(elem.number)
+        return (point.x - radius, point.y - radius, point.x + radius, point.y + radius)
+
+    if elem.tool == ToolType.STAMP:
+        # Same font size as _render_stamp, ink centered on the point
+        font_size = _stamp_font_size(elem)
+        metrics = _measure_text(elem.stamp, "Sans", font_size)
+        if metrics is not None:
+            ink = metrics[0]
+            half_w, half_h = (ink[2] - ink[0]) / 2, (ink[3] - ink[1]) / 2
+        else:
+            half_w = half_h = font_size / 2
+        return (point.x - half_w, point.y - half_h, point.x + half_w, point.y + half_h)
+
+    if elem.tool == ToolType.TEXT:
+        metrics = _measure_text(
+            elem.text,
+            elem.font_family,
+            elem.font_size,
+            elem.font_bold,
+            elem.font_italic,
+        )
+        if metrics is None:
+            # No cairo - approximate text size based on font size
+            lines = elem.text.split("\n")
+            width = elem.font_size * max(max(map(len, lines)), 1) * 0.6
+            height = elem.font_size * 1.2
+            below = elem.font_size * CALLOUT_LINE_SPACING * (len(lines) - 1)
+            return (point.x, point.y - height, point.x + width, point.y + below)
+        ink, logical = metrics
+        return (
+            point.x + min(ink[0], logical[0]),
+            point.y + min(ink[1], logical[1]),
+            point.x + max(ink[2], logical[2]),
+            point.y + max(ink[3], logical[3]),
+        )
+
+    if elem.tool == ToolType.CALLOUT and len(elem.points) >= 2 and elem.text:
+        # Box around the text plus the tail tip
+        box_x, box_y, box_width, box_height = _callout_box(elem)[0]
+        return (
+            min(box_x, point.x),
+            min(box_y, point.y),
+            max(box_x + box_width, point.x),
+            max(box_y + box_height, point.y),
+        )
+
+    return elem.points.bounds()
+
+
+def _number_radius(number: int) -> float:
+    """Get the circle radius of a number marker (grows with the digits)."""
+    return max(14, 10 + len(str(number)) * 4)
+
+
+def _stamp_font_size(elem: DrawingElement) -> float:
+    """Get the font size stamps are drawn at (larger than text)."""
+    return max(24, elem.font_size * 2)
+
+
+def _callout_box(
+    elem: DrawingElement,
+) -> Tuple[Tuple[float, float, float, float], List[Optional[TextLayout]]]:
+    """Get a callout's box (x, y, width, height) and its line layouts.
+
+    The box is centered on the second point and sized to the widest line.
+    """
+    lines = elem.text.split("\n")
+    layouts = [get_layout(line, "Sans", elem.font_size) for line in lines]
+    max_width = max(
+        layout.width if layout is not None else elem.font_size * len(line) * 0.6
+        for line, layout in zip(lines, layouts)
+    )
+
+    box_width = max_width + CALLOUT_PADDING * 2
+    box_height = (
+        len(lines) * elem.font_size * CALLOUT_LINE_SPACING + CALLOUT_PADDING * 2
+    )
+    box_pos = elem.points[1]
+    box = (
+        box_pos.x - box_width / 2,
+        box_pos.y - box_height / 2,
+        box_width,
+        box_height,
+    )
+    return box, layouts
+
+
+def get_element_extents(elem: DrawingElement) -> Optional[tuple]:
+    """Get the area (x1, y1, x2, y2) an element may paint on screen.
+
+    Unlike get_element_bbox this pads for stroke width, arrowheads,
+    markers and labels, so it can be used to invalidate or cull redraws.
+    """
+    bbox = get_element_bbox(elem)
+    if not bbox:
+        return None
+
+    x1, y1, x2, y2 = bbox
+    pad = elem.stroke_width * 4 + 2  # Arrowheads and round caps
+    if elem.tool == ToolType.MEASURE:
+        pad += LABEL_OVERHANG
+    return (x1 - pad, y1 - pad, x2 + pad, y2 + pad)
+
+
+def element_nbytes(elem: DrawingElement) -> int:
+    """Estimate the memory held by an element (for the undo memory cap)."""
+    return ELEMENT_BASE_BYTES + elem.points.nbytes() + len(elem.text) + len(elem.stamp)
+
+
+def rects_intersect(a: Rect, b: Rect) -> bool:
+    """Check whether two (x1, y1, x2, y2) rectangles overlap."""
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def distance_to_polyline(points: Sequence[Point], x: float, y: float) -> float:
+    """Get the shortest distance from (x, y) to the polyline through points."""
+    if isinstance(points, PointArray):
+        coords = points.coords()
+    else:
+        coords = ((p.x, p.y) for p in points)
+
+    start_x, start_y = next(coords)
+    best = math.hypot(x - start_x, y - start_y)
+    for end_x, end_y in coords:
+        dx = end_x - start_x
+        dy = end_y - start_y
+        length_sq = dx * dx + dy * dy
+        if length_sq == 0:
+            t = 0.0
+        else:
+            t = max(
+                0.0, min(1.0, ((x - start_x) * dx + (y - start_y) * dy) / length_sq)
+            )
+        best = min(best, math.hypot(x - (start_x + t * dx), y - (start_y + t * dy)))
+        start_x, start_y = end_x, end_y
+    return best
 
 
 class EditorState:
@@ -143,11 +388,41 @@ class EditorState:
         self.elements: List[DrawingElement] = []
         self.undo_stack: List[List[DrawingElement]] = []
         self.redo_stack: List[List[DrawingElement]] = []
+        # Estimated bytes held by each undo/redo entry (parallel to the
+        # stacks); the oldest undo entries are dropped past history_limit
+        self._undo_costs: List[int] = []
+        self._redo_costs: List[int] = []
+        self._history_bytes = 0  # sum(self._undo_costs)
+        self.history_limit = DEFAULT_HISTORY_LIMIT
+        # Elements copied since the last snapshot, safe to edit in place
+        self._unshared: Dict[int, DrawingElement] = {}
+        # Key of the last coalescable operation (e.g. repeated nudges)
+        self._coalesce_key: Hashable = None
+        # Bumped whenever committed elements change (used by render caches)
+        self.edit_generation = 0
+        # Bumped whenever the image itself is replaced (crop, image effects)
+        self.image_generation = 0
+        # Spatial index of element extents, keyed by id(element) and synced
+        # lazily against edit_generation (see _sync_spatial_index)
+        self._spatial_index = SpatialIndex()
+        self._indexed: Dict[int, DrawingElement] = {}
+        self._index_order: Dict[int, int] = {}
+        self._index_versions: Dict[int, int] = {}
+        self._index_generation = 0
+        # Rubber-band selection rectangle (x1, y1, x2, y2) while dragging
+        self.marquee: Optional[Tuple[float, float, float, float]] = None
         self.current_tool = ToolType.PEN
         self.current_color = COLORS["red"]
         self.recent_colors: List[Color] = []  # Last 8 used colors
         self.max_recent_colors = 8
         self.stroke_width = 2.0
+        # Freehand input filtering: motion closer than stroke_min_distance to
+        # the last sample is dropped while drawing, and finished strokes are
+        # simplified so no point strays more than stroke_tolerance (0 = off)
+        self.stroke_min_distance = 2.0
+        self.stroke_tolerance = 0.5
+        # Eyedropper averages a square of this many pixels per side
+        self.pick_sample_size = 1
         self.is_drawing = False
         self.current_element: Optional[DrawingElement] = None
         self.font_size = 16
@@ -157,6 +432,8 @@ class EditorState:
         self.number_counter = 1  # For NUMBER tool
         self.current_stamp = "✓"  # Default stamp
         self.arrow_style = ArrowStyle.OPEN  # Default arrow style
+        self.blur_radius = 10  # Radius for BLUR tool
+        self.pixel_size = 15  # Block size for PIXELATE tool
         # Zoom state
         self.zoom_level = 1.0  # 1.0 = 100%
         self.pan_offset_x = 0.0  # Pan offset in image coordinates
@@ -164,24 +441,213 @@ class EditorState:
         # Selection state (multi-select support)
         self.selected_indices: Set[int] = set()
         self._drag_start: Optional[Point] = None
+        self._drag_recorded = False  # Undo entry saved for the current drag
         self._resize_handle: Optional[str] = None  # 'nw', 'ne', 'sw', 'se', None
+        # Total (dx, dy) of the current move drag, None when not moving
+        self.drag_offset: Optional[Tuple[float, float]] = None
         # Clipboard for copy/paste annotations
         self._clipboard: List[DrawingElement] = []
         # Snapping state
         self.snap_enabled = True
         self.snap_threshold = 10.0  # Pixels to trigger snap
         self.active_snap_guides: List[Tuple[str, float]] = []  # ('h', y) or ('v', x)
+        self._snap_lines: Optional[SnapLines] = None  # Built once per drag
         # Grid snapping
         self.grid_snap_enabled = False
         self.grid_size = 20  # Grid cell size in pixels
+        # Cached blur/pixelate rasters (invalidated when the image changes)
+        self.render_cache = RenderCache()
 
     def set_pixbuf(self, pixbuf: Any) -> None:
         """Set the pixbuf to edit."""
+        replaced = (self.original_pixbuf, self.current_pixbuf)
         self.original_pixbuf = pixbuf
         self.current_pixbuf = pixbuf
+        self._image_replaced(*replaced)
         self.elements.clear()
         self.undo_stack.clear()
         self.redo_stack.clear()
+        self._undo_costs.clear()
+        self._redo_costs.clear()
+        self._history_bytes = 0
+        self._unshared = {}
+        self._coalesce_key = None
+        self.render_cache.invalidate()
+        self.mark_modified()
+
+    def replace_pixbuf(self, pixbuf: Any) -> None:
+        """Replace the image being edited (e.g. after a crop), keeping history."""
+        replaced = self.current_pixbuf
+        self.current_pixbuf = pixbuf
+        self._image_replaced(replaced)
+        self.render_cache.invalidate()
+        self.mark_modified()
+
+    def _image_replaced(self, *old: Any) -> None:
+        """Start a new image generation and free pixels read from old images."""
+        self.image_generation += 1
+        for pixbuf in old:
+            in_use = pixbuf is self.original_pixbuf or pixbuf is self.current_pixbuf
+            if pixbuf is not None and not in_use:
+                release_views(pixbuf)
+
+    def mark_modified(self) -> None:
+        """Record that committed elements (or the image) changed."""
+        self.edit_generation += 1
+
+    def _sync_spatial_index(self) -> None:
+        """Bring the spatial index up to date with the element list.
+
+        Only new elements and those whose version changed since they were
+        indexed are re-measured; elements no longer in the list are dropped.
+        The index keeps a reference to every element it holds, so ids stay
+        unique.
+        """
+        if self._index_generation == self.edit_generation:
+            return
+
+        index = self._spatial_index
+        order: Dict[int, int] = {}
+        for position, elem in enumerate(self.elements):
+            key = id(elem)
+            order[key] = position
+            if self._index_versions.get(key) == elem.version:
+                continue
+            extents = get_element_extents(elem)
+            self._index_versions[key] = elem.version
+            if extents:
+                index.insert(key, extents)
+            else:
+                index.remove(key)
+            self._indexed[key] = elem
+
+        for key in [k for k in self._indexed if k not in order]:
+            index.remove(key)
+            del self._indexed[key]
+            del self._index_versions[key]
+
+        self._index_order = order
+        self._index_generation = self.edit_generation
+
+    def elements_at(self, x: float, y: float) -> List[int]:
+        """Get indices of elements hit at (x, y), top-most first."""
+        self._sync_spatial_index()
+        candidates = self._spatial_index.query_point(x, y)
+        hits = [
+            self._index_order[key]
+            for key in candidates
+            if self._hit_test_element(self._indexed[key], x, y)
+        ]
+        return sorted(hits, reverse=True)
+
+    def elements_in_rect(self, x1: float, y1: float, x2: float, y2: float) -> List[int]:
+        """Get indices of elements lying entirely inside a rectangle."""
+        rect = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        self._sync_spatial_index()
+        inside = []
+        for key in self._spatial_index.query_rect(rect):
+            bbox = self._get_element_bbox(self._indexed[key])
+            if (
+                bbox
+                and rect[0] <= bbox[0]
+                and rect[1] <= bbox[1]
+                and bbox[2] <= rect[2]
+                and bbox[3] <= rect[3]
+            ):
+                inside.append(self._index_order[key])
+        return sorted(inside)
+
+    def _push_undo(
+        self,
+        snapshot: Optional[List[DrawingElement]] = None,
+        coalesce: Hashable = None,
+    ) -> None:
+        """Save an undo snapshot before modifying committed elements.
+
+        Snapshots are shallow lists sharing their elements with the live
+        list; operations get a private copy of an element through
+        _edit_element before changing it, so an entry only costs the
+        elements its operation actually touched.
+
+        Args:
+            snapshot: Element list to restore on undo (default: current).
+            coalesce: Key of a repeatable operation. A push with the same
+                key as the previous push extends that entry instead of
+                adding another one.
+        """
+        self.redo_stack.clear()
+        self._redo_costs.clear()
+        if coalesce is None or coalesce != self._coalesce_key or not self.undo_stack:
+            if snapshot is None:
+                snapshot = list(self.elements)
+            self.undo_stack.append(snapshot)
+            self._undo_costs.append(0)
+            self._unshared = {}
+            self._add_history_bytes(len(snapshot) * SNAPSHOT_SLOT_BYTES)
+        self._coalesce_key = coalesce
+        self.mark_modified()
+
+    def _edit_element(self, idx: int) -> DrawingElement:
+        """Get the element at idx for editing in place.
+
+        The first edit after a snapshot replaces the shared element with a
+        private copy, charging the original to the newest history entry;
+        later edits reuse that copy.
+        """
+        elem = self.elements[idx]
+        if id(elem) in self._unshared:
+            return elem
+        self._charge_history(elem)
+        elem = copy.deepcopy(elem)
+        self.elements[idx] = elem
+        self._unshared[id(elem)] = elem
+        return elem
+
+    def export_snapshot(self) -> List[DrawingElement]:
+        """Get the committed elements as a list later edits won't change.
+
+        Forgetting which elements are private copies makes the next edit
+        of any of them copy it first, as after an undo snapshot; the next
+        edit also starts a new undo entry, which those copies are charged
+        to, rather than extending a coalesced one. Reading a
+        PointArray can still bake its pending transform in place, so the
+        list holds shallow copies of the elements with their points baked
+        into new arrays; it can be rendered off the GTK thread.
+        """
+        self._unshared = {}
+        self._coalesce_key = None
+        snapshot = []
+        for elem in self.elements:
+            clone = copy.copy(elem)
+            clone.points = PointArray.from_coords(elem.points.baked())
+            snapshot.append(clone)
+        return snapshot
+
+    def _charge_history(self, elem: DrawingElement) -> None:
+        """Account for an element now only referenced by undo history."""
+        if self._undo_costs:
+            self._add_history_bytes(element_nbytes(elem))
+
+    def _add_history_bytes(self, nbytes: int) -> None:
+        """Charge bytes to the newest undo entry and enforce the limit."""
+        self._undo_costs[-1] += nbytes
+        self._history_bytes += nbytes
+        self._trim_history()
+
+    def _trim_history(self) -> None:
+        """Drop the oldest undo entries while history exceeds its limit."""
+        while self._history_bytes > self.history_limit and len(self.undo_stack) > 1:
+            self.undo_stack.pop(0)
+            self._history_bytes -= self._undo_costs.pop(0)
+
+    def set_history_limit(self, megabytes: float) -> None:
+        """Set the undo history memory budget in megabytes."""
+        self.history_limit = int(max(1.0, float(megabytes)) * 1024 * 1024)
+        self._trim_history()
+
+    def history_nbytes(self) -> int:
+        """Get the estimated memory held by the undo history."""
+        return self._history_bytes
 
     def set_tool(self, tool: ToolType) -> None:
         """Set the current drawing tool."""
@@ -216,6 +682,19 @@ class EditorState:
         """Set the stroke width."""
         self.stroke_width = max(1.0, min(50.0, width))
 
+    def set_stroke_tolerance(self, tolerance: float) -> None:
+        """Set how far (px) simplified freehand strokes may deviate."""
+        self.stroke_tolerance = max(0.0, min(5.0, float(tolerance)))
+
+    def set_pick_sample_size(self, size: int) -> None:
+        """Set the eyedropper sample square (1, 3 or 5 pixels)."""
+        size = max(1, min(5, int(size)))
+        self.pick_sample_size = size if size % 2 else size - 1
+
+    def set_pixel_size(self, size: int) -> None:
+        """Set the block size for the pixelate tool."""
+        self.pixel_size = max(2, min(100, int(size)))
+
     def set_font_size(self, size: int) -> None:
         """Set the font size for text tool."""
         self.font_size = max(8, min(72, size))
@@ -245,35 +724,50 @@ class EditorState:
             font_italic=self.font_italic,
             font_family=self.font_family,
             arrow_style=self.arrow_style,
+            blur_radius=self.blur_radius,
+            pixel_size=self.pixel_size,
         )
 
     def continue_drawing(self, x: float, y: float) -> None:
         """Continue the current drawing element."""
         if self.is_drawing and self.current_element is not None:
-            # For pen and highlighter, add all points
-            if self.current_element.tool in [
-                ToolType.PEN,
-                ToolType.HIGHLIGHTER,
-                ToolType.ERASER,
-            ]:
-                self.current_element.points.append(Point(x, y))
+            points = self.current_element.points
+            # For pen and highlighter, add all points that moved far enough
+            if self.current_element.tool in FREEHAND_TOOLS:
+                last = points[-1]
+                if math.hypot(x - last.x, y - last.y) < self.stroke_min_distance:
+                    return
+                points.append(Point(x, y))
             # For shapes, just update the end point
-            elif len(self.current_element.points) == 1:
-                self.current_element.points.append(Point(x, y))
+            elif len(points) == 1:
+                points.append(Point(x, y))
             else:
-                self.current_element.points[-1] = Point(x, y)
+                points[-1] = Point(x, y)
+            self.current_element.touch()
 
     def finish_drawing(self, x: float, y: float) -> None:
         """Finish the current drawing element."""
         if self.is_drawing and self.current_element is not None:
-            if len(self.current_element.points) == 1:
-                self.current_element.points.append(Point(x, y))
+            element = self.current_element
+            if element.tool in FREEHAND_TOOLS:
+                # Keep the release point unless it is a filtered-out jitter
+                last = element.points[-1]
+                if (
+                    len(element.points) == 1
+                    or math.hypot(x - last.x, y - last.y) >= self.stroke_min_distance
+                ):
+                    element.points.append(Point(x, y))
+                else:
+                    element.points[-1] = Point(x, y)
+                element.points = simplify(element.points, self.stroke_tolerance)
+            elif len(element.points) == 1:
+                element.points.append(Point(x, y))
             else:
-                self.current_element.points[-1] = Point(x, y)
+                element.points[-1] = Point(x, y)
+            element.touch()
 
             # Save state for undo
-            self.undo_stack.append(self.elements.copy())
-            self.redo_stack.clear()
+            self._push_undo()
 
             self.elements.append(self.current_element)
             self.current_element = None
@@ -301,8 +795,7 @@ class EditorState:
             font_family=self.font_family,
         )
 
-        self.undo_stack.append(self.elements.copy())
-        self.redo_stack.clear()
+        self._push_undo()
         self.elements.append(element)
 
     def add_number(self, x: float, y: float) -> None:
@@ -316,8 +809,7 @@ class EditorState:
             font_size=self.font_size,
         )
 
-        self.undo_stack.append(self.elements.copy())
-        self.redo_stack.clear()
+        self._push_undo()
         self.elements.append(element)
         self.number_counter += 1
 
@@ -344,8 +836,7 @@ class EditorState:
             font_size=self.font_size,
         )
 
-        self.undo_stack.append(self.elements.copy())
-        self.redo_stack.clear()
+        self._push_undo()
         self.elements.append(element)
 
     def add_callout(
@@ -371,37 +862,34 @@ class EditorState:
             fill_color=Color(1.0, 1.0, 0.9, 0.95),  # Light yellow
         )
 
-        self.undo_stack.append(self.elements.copy())
-        self.redo_stack.clear()
+        self._push_undo()
         self.elements.append(element)
 
-    def pick_color(self, x: float, y: float) -> Optional[Color]:
+    def pick_color(
+        self, x: float, y: float, sample_size: Optional[int] = None
+    ) -> Optional[Color]:
         """Pick color from the current pixbuf at given position.
 
+        Args:
+            x, y: Position in image coordinates.
+            sample_size: Edge of the square averaged around the position
+                (1, 3 or 5); defaults to pick_sample_size.
+
         Returns:
             Color at position, or None if out of bounds.
         """
         if self.current_pixbuf is None:
             return None
 
-        px = int(x)
-        py = int(y)
-        width = self.current_pixbuf.get_width()
-        height = self.current_pixbuf.get_height()
-
-        if px < 0 or px >= width or py < 0 or py >= height:
+        if sample_size is None:
+            sample_size = self.pick_sample_size
+        view = pixel_view(self.current_pixbuf, self.image_generation)
+        mean = view.average(int(x), int(y), sample_size)
+        if mean is None:
             return None
 
-        n_channels = self.current_pixbuf.get_n_channels()
-        rowstride = self.current_pixbuf.get_rowstride()
-        pixels = self.current_pixbuf.get_pixels()
-
-        offset = py * rowstride + px * n_channels
-        r = pixels[offset] / 255.0
-        g = pixels[offset + 1] / 255.0
-        b = pixels[offset + 2] / 255.0
-
-        return Color(r, g, b, 1.0)
+        r, g, b = mean
+        return Color(r / 255.0, g / 255.0, b / 255.0, 1.0)
 
     def zoom_in(self, factor: float = 1.25) -> None:
         """Increase zoom level."""
@@ -454,6 +942,34 @@ class EditorState:
         if value is not None:
             self.selected_indices.add(value)
 
+    def start_marquee(self, x: float, y: float) -> None:
+        """Start a rubber-band selection at the given position."""
+        self.marquee = (x, y, x, y)
+
+    def update_marquee(self, x: float, y: float) -> None:
+        """Move the free corner of the rubber-band selection."""
+        if self.marquee is not None:
+            self.marquee = (self.marquee[0], self.marquee[1], x, y)
+
+    def finish_marquee(self, add_to_selection: bool = False) -> bool:
+        """Select the elements inside the rubber-band rectangle.
+
+        Args:
+            add_to_selection: If True (Shift), add to the existing selection.
+
+        Returns True if any elements were selected.
+        """
+        if self.marquee is None:
+            return False
+
+        indices = self.elements_in_rect(*self.marquee)
+        self.marquee = None
+        if not add_to_selection:
+            self.selected_indices.clear()
+        self.selected_indices.update(indices)
+        self._expand_selection_to_groups()
+        return bool(indices)
+
     def select_at(
         self,
         x: float,
@@ -470,32 +986,39 @@ class EditorState:
 
         Returns True if an element was selected.
         """
+        # A new drag may start here; snap lines depend on what is selected
+        self._snap_lines = None
+        self._drag_recorded = False
+
         # Check if clicking on a resize handle of already selected element (single selection only)
         if len(self.selected_indices) == 1:
             handle = self._hit_test_handles(x, y, handle_margin)
             if handle:
                 self._resize_handle = handle
                 self._drag_start = Point(x, y)
+                self.drag_offset = None
                 return True
 
-        # Search elements in reverse order (top-most first)
-        for i in range(len(self.elements) - 1, -1, -1):
-            if self._hit_test_element(self.elements[i], x, y):
-                if add_to_selection:
-                    # Toggle selection
-                    if i in self.selected_indices:
-                        self.selected_indices.discard(i)
-                    else:
-                        self.selected_indices.add(i)
+        # Pick the top-most element under the cursor
+        hits = self.elements_at(x, y)
+        if hits:
+            i = hits[0]
+            if add_to_selection:
+                # Toggle selection
+                if i in self.selected_indices:
+                    self.selected_indices.discard(i)
                 else:
-                    # Replace selection
-                    self.selected_indices.clear()
                     self.selected_indices.add(i)
-                # Expand selection to include all group members
-                self._expand_selection_to_groups()
-                self._drag_start = Point(x, y)
-                self._resize_handle = None
-                return True
+            else:
+                # Replace selection
+                self.selected_indices.clear()
+                self.selected_indices.add(i)
+            # Expand selection to include all group members
+            self._expand_selection_to_groups()
+            self._drag_start = Point(x, y)
+            self._resize_handle = None
+            self.drag_offset = (0.0, 0.0)
+            return True
 
         # Clicked on empty space - deselect (unless adding to selection)
         if not add_to_selection:
@@ -513,24 +1036,62 @@ class EditorState:
 
         x1, y1, x2, y2 = bbox
         margin = max(5, elem.stroke_width / 2)
-        return x1 - margin <= x <= x2 + margin and y1 - margin <= y <= y2 + margin
+        if elem.tool == ToolType.HIGHLIGHTER:
+            margin = max(5, elem.stroke_width * 3 / 2)  # Drawn 3x wider
+        if not (x1 - margin <= x <= x2 + margin and y1 - margin <= y <= y2 + margin):
+            return False
+
+        # Strokes only hit near the drawn line, not anywhere in their bbox
+        if elem.tool in STROKE_TOOLS:
+            return distance_to_polyline(elem.points, x, y) <= margin
+        return True
 
     def _get_element_bbox(self, elem: DrawingElement) -> Optional[tuple]:
         """Get bounding box (x1, y1, x2, y2) for an element."""
-        if not elem.points:
-            return None
+        return get_element_bbox(elem)
 
-        xs = [p.x for p in elem.points]
-        ys = [p.y for p in elem.points]
+    def _get_element_extents(self, elem: DrawingElement) -> Optional[tuple]:
+        """Get the area (x1, y1, x2, y2) an element may paint on screen."""
+        return get_element_extents(elem)
 
-        # For text/stamps, estimate size
-        if elem.tool in (ToolType.TEXT, ToolType.STAMP, ToolType.NUMBER):
-            # Approximate text size based on font size
-            width = elem.font_size * max(len(elem.text), 1) * 0.6
-            height = elem.font_size * 1.2
-            return (xs[0], ys[0] - height, xs[0] + width, ys[0])
+    def get_damage_rects(self, width: float, height: float) -> List[tuple]:
+        """Get areas (x1, y1, x2, y2) covered by transient editor overlays.
 
-        return (min(xs), min(ys), max(xs), max(ys))
+        Covers the element being drawn, the selection boxes and handles,
+        the rubber-band rectangle and the active snap guides, which span
+        the image of the given size.
+        """
+        rects = []
+        if self.is_drawing and self.current_element is not None:
+            extents = self._get_element_extents(self.current_element)
+            if extents:
+                rects.append(extents)
+
+        pad = SELECTION_HANDLE_PAD
+        for idx in self.selected_indices:
+            if 0 <= idx < len(self.elements):
+                extents = self._get_element_extents(self.elements[idx])
+                if extents:
+                    x1, y1, x2, y2 = extents
+                    rects.append((x1 - pad, y1 - pad, x2 + pad, y2 + pad))
+
+        if self.marquee is not None:
+            x1, y1, x2, y2 = self.marquee
+            rects.append(
+                (
+                    min(x1, x2) - pad,
+                    min(y1, y2) - pad,
+                    max(x1, x2) + pad,
+                    max(y1, y2) + pad,
+                )
+            )
+
+        for guide_type, value in self.active_snap_guides:
+            if guide_type == "h":
+                rects.append((0, value - pad, width, value + pad))
+            elif guide_type == "v":
+                rects.append((value - pad, 0, value + pad, height))
+        return rects
 
     def _hit_test_handles(
         self, x: float, y: float, margin: float = 8.0
@@ -576,6 +1137,11 @@ class EditorState:
         if self.is_selection_locked():
             return False
 
+        # One undo entry covers the whole drag
+        if not self._drag_recorded:
+            self._push_undo()
+            self._drag_recorded = True
+
         # Resize only works for single selection
         if self._resize_handle and len(self.selected_indices) == 1:
             return self._resize_selected(x, y, aspect_locked)
@@ -590,10 +1156,9 @@ class EditorState:
 
         # Move all selected elements
         for idx in self.selected_indices:
-            elem = self.elements[idx]
-            for p in elem.points:
-                p.x += dx
-                p.y += dy
+            elem = self._edit_element(idx)
+            elem.points.translate(dx, dy)
+            elem.touch()
 
         # Apply snapping (based on first selected element)
         if self.selected_indices:
@@ -605,12 +1170,17 @@ class EditorState:
                 if snap_dx != 0 or snap_dy != 0:
                     # Apply snap offset to all selected elements
                     for idx in self.selected_indices:
-                        elem = self.elements[idx]
-                        for p in elem.points:
-                            p.x += snap_dx
-                            p.y += snap_dy
+                        elem = self._edit_element(idx)
+                        elem.points.translate(snap_dx, snap_dy)
+                        elem.touch()
+                    dx += snap_dx
+                    dy += snap_dy
+
+        if self.drag_offset is not None:
+            self.drag_offset = (self.drag_offset[0] + dx, self.drag_offset[1] + dy)
 
         self._drag_start = Point(x, y)
+        self.mark_modified()
         return True
 
     def _resize_selected(self, x: float, y: float, aspect_locked: bool = False) -> bool:
@@ -624,7 +1194,7 @@ class EditorState:
         if self.selected_index is None or not self._resize_handle:
             return False
 
-        elem = self.elements[self.selected_index]
+        elem = self._edit_element(self.selected_index)
         if len(elem.points) < 2:
             return False
 
@@ -632,9 +1202,7 @@ class EditorState:
         handle = self._resize_handle
 
         # Get current bbox
-        xs = [p.x for p in elem.points]
-        ys = [p.y for p in elem.points]
-        x1, y1, x2, y2 = min(xs), min(ys), max(xs), max(ys)
+        x1, y1, x2, y2 = elem.points.bounds()
 
         # Store original dimensions for aspect ratio
         orig_width = x2 - x1
@@ -700,16 +1268,18 @@ class EditorState:
         if len(elem.points) == 2:
             elem.points[0] = Point(x1, y1)
             elem.points[1] = Point(x2, y2)
+            elem.touch()
 
+        self.mark_modified()
         return True
 
     def finish_move(self) -> None:
-        """Finish moving/resizing and save undo state."""
-        if self.selected_indices and self._drag_start is not None:
-            # Save state for undo (we modified in place, so save current state)
-            pass  # Already tracking via elements list
+        """Finish moving/resizing (the undo entry was saved on the first move)."""
         self._drag_start = None
+        self._drag_recorded = False
         self._resize_handle = None
+        self.drag_offset = None
+        self._snap_lines = None
         self.active_snap_guides.clear()  # Clear snap guides
 
     def delete_selected(self) -> bool:
@@ -731,11 +1301,11 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append(list(self.elements))
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Remove elements in reverse index order to maintain correct indices
         for idx in sorted(deletable, reverse=True):
+            self._charge_history(self.elements[idx])
             del self.elements[idx]
 
         self.selected_indices.clear()
@@ -746,6 +1316,7 @@ class EditorState:
         self.selected_indices.clear()
         self._drag_start = None
         self._resize_handle = None
+        self.drag_offset = None
 
     def get_selected(self) -> Optional[DrawingElement]:
         """Get the first selected element (for single selection compatibility)."""
@@ -780,19 +1351,17 @@ class EditorState:
         if self.is_selection_locked():
             return False
 
-        # Save for undo
-        self.undo_stack.append(list(self.elements))
-        self.redo_stack.clear()
+        # Save for undo (repeated nudges of one selection share an entry)
+        self._push_undo(coalesce=("nudge", frozenset(self.selected_indices)))
 
         # Move all selected elements (skip locked)
         for idx in self.selected_indices:
             if 0 <= idx < len(self.elements):
-                elem = self.elements[idx]
-                if elem.locked:
+                if self.elements[idx].locked:
                     continue
-                for p in elem.points:
-                    p.x += dx
-                    p.y += dy
+                elem = self._edit_element(idx)
+                elem.points.translate(dx, dy)
+                elem.touch()
 
         return True
 
@@ -826,17 +1395,15 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append(list(self.elements))
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Paste copies with offset
         new_indices = []
         for elem in self._clipboard:
             new_elem = copy.deepcopy(elem)
             # Apply offset to all points
-            for p in new_elem.points:
-                p.x += offset
-                p.y += offset
+            new_elem.points.translate(offset, offset)
+            new_elem.touch()
             self.elements.append(new_elem)
             new_indices.append(len(self.elements) - 1)
 
@@ -864,17 +1431,15 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append(list(self.elements))
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Duplicate selected elements with offset
         new_indices = []
         for idx in sorted(self.selected_indices):
             if 0 <= idx < len(self.elements):
                 new_elem = copy.deepcopy(self.elements[idx])
-                for p in new_elem.points:
-                    p.x += offset
-                    p.y += offset
+                new_elem.points.translate(offset, offset)
+                new_elem.touch()
                 self.elements.append(new_elem)
                 new_indices.append(len(self.elements) - 1)
 
@@ -893,8 +1458,7 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append(list(self.elements))
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Extract selected elements (in order)
         selected = []
@@ -924,8 +1488,7 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append(list(self.elements))
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Extract selected elements (in order)
         selected = []
@@ -973,8 +1536,7 @@ class EditorState:
         items.sort(key=lambda x: x[1])
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Calculate spacing
         first_center = items[0][1]
@@ -986,8 +1548,9 @@ class EditorState:
         for i, (idx, old_center, _bbox) in enumerate(items[1:-1], start=1):
             new_center = first_center + spacing * i
             dx = new_center - old_center
-            for p in self.elements[idx].points:
-                p.x += dx
+            elem = self._edit_element(idx)
+            elem.points.translate(dx, 0)
+            elem.touch()
 
         return True
 
@@ -1020,8 +1583,7 @@ class EditorState:
         items.sort(key=lambda x: x[1])
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Calculate spacing
         first_center = items[0][1]
@@ -1033,8 +1595,9 @@ class EditorState:
         for i, (idx, old_center, _bbox) in enumerate(items[1:-1], start=1):
             new_center = first_center + spacing * i
             dy = new_center - old_center
-            for p in self.elements[idx].points:
-                p.y += dy
+            elem = self._edit_element(idx)
+            elem.points.translate(0, dy)
+            elem.touch()
 
         return True
 
@@ -1059,8 +1622,7 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Move elements to align left edges
         for idx in self.selected_indices:
@@ -1069,8 +1631,9 @@ class EditorState:
                 if bbox:
                     dx = min_x - bbox[0]
                     if abs(dx) > 0.1:
-                        for p in self.elements[idx].points:
-                            p.x += dx
+                        elem = self._edit_element(idx)
+                        elem.points.translate(dx, 0)
+                        elem.touch()
 
         return True
 
@@ -1095,8 +1658,7 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Move elements to align right edges
         for idx in self.selected_indices:
@@ -1105,8 +1667,9 @@ class EditorState:
                 if bbox:
                     dx = max_x - bbox[2]
                     if abs(dx) > 0.1:
-                        for p in self.elements[idx].points:
-                            p.x += dx
+                        elem = self._edit_element(idx)
+                        elem.points.translate(dx, 0)
+                        elem.touch()
 
         return True
 
@@ -1131,8 +1694,7 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Move elements to align top edges
         for idx in self.selected_indices:
@@ -1141,8 +1703,9 @@ class EditorState:
                 if bbox:
                     dy = min_y - bbox[1]
                     if abs(dy) > 0.1:
-                        for p in self.elements[idx].points:
-                            p.y += dy
+                        elem = self._edit_element(idx)
+                        elem.points.translate(0, dy)
+                        elem.touch()
 
         return True
 
@@ -1167,8 +1730,7 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Move elements to align bottom edges
         for idx in self.selected_indices:
@@ -1177,8 +1739,9 @@ class EditorState:
                 if bbox:
                     dy = max_y - bbox[3]
                     if abs(dy) > 0.1:
-                        for p in self.elements[idx].points:
-                            p.y += dy
+                        elem = self._edit_element(idx)
+                        elem.points.translate(0, dy)
+                        elem.touch()
 
         return True
 
@@ -1205,8 +1768,7 @@ class EditorState:
         target_x = sum(centers) / len(centers)
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Move elements to align centers
         for idx in self.selected_indices:
@@ -1216,8 +1778,9 @@ class EditorState:
                     current_center = (bbox[0] + bbox[2]) / 2
                     dx = target_x - current_center
                     if abs(dx) > 0.1:
-                        for p in self.elements[idx].points:
-                            p.x += dx
+                        elem = self._edit_element(idx)
+                        elem.points.translate(dx, 0)
+                        elem.touch()
 
         return True
 
@@ -1244,8 +1807,7 @@ class EditorState:
         target_y = sum(centers) / len(centers)
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Move elements to align centers
         for idx in self.selected_indices:
@@ -1255,8 +1817,9 @@ class EditorState:
                     current_center = (bbox[1] + bbox[3]) / 2
                     dy = target_y - current_center
                     if abs(dy) > 0.1:
-                        for p in self.elements[idx].points:
-                            p.y += dy
+                        elem = self._edit_element(idx)
+                        elem.points.translate(0, dy)
+                        elem.touch()
 
         return True
 
@@ -1278,13 +1841,12 @@ class EditorState:
         group_id = str(uuid.uuid4())[:8]
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Assign group_id to all selected elements
         for idx in self.selected_indices:
             if 0 <= idx < len(self.elements):
-                self.elements[idx].group_id = group_id
+                self._edit_element(idx).group_id = group_id
 
         return True
 
@@ -1309,13 +1871,12 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Remove group_id from all selected elements
         for idx in self.selected_indices:
             if 0 <= idx < len(self.elements):
-                self.elements[idx].group_id = None
+                self._edit_element(idx).group_id = None
 
         return True
 
@@ -1361,15 +1922,14 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Resize other elements
         for idx in sorted_indices[1:]:
             if 0 <= idx < len(self.elements):
-                elem = self.elements[idx]
-                if elem.locked:
+                if self.elements[idx].locked:
                     continue
+                elem = self._edit_element(idx)
                 bbox = self._get_element_bbox(elem)
                 if bbox and len(elem.points) >= 2:
                     current_width = bbox[2] - bbox[0]
@@ -1377,8 +1937,8 @@ class EditorState:
                         scale = target_width / current_width
                         center_x = (bbox[0] + bbox[2]) / 2
                         # Scale points relative to center
-                        for p in elem.points:
-                            p.x = center_x + (p.x - center_x) * scale
+                        elem.points.scale(center_x, 0, scale, 1)
+                        elem.touch()
 
         return True
 
@@ -1403,15 +1963,14 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Resize other elements
         for idx in sorted_indices[1:]:
             if 0 <= idx < len(self.elements):
-                elem = self.elements[idx]
-                if elem.locked:
+                if self.elements[idx].locked:
                     continue
+                elem = self._edit_element(idx)
                 bbox = self._get_element_bbox(elem)
                 if bbox and len(elem.points) >= 2:
                     current_height = bbox[3] - bbox[1]
@@ -1419,8 +1978,8 @@ class EditorState:
                         scale = target_height / current_height
                         center_y = (bbox[1] + bbox[3]) / 2
                         # Scale points relative to center
-                        for p in elem.points:
-                            p.y = center_y + (p.y - center_y) * scale
+                        elem.points.scale(0, center_y, 1, scale)
+                        elem.touch()
 
         return True
 
@@ -1446,15 +2005,14 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Resize other elements
         for idx in sorted_indices[1:]:
             if 0 <= idx < len(self.elements):
-                elem = self.elements[idx]
-                if elem.locked:
+                if self.elements[idx].locked:
                     continue
+                elem = self._edit_element(idx)
                 bbox = self._get_element_bbox(elem)
                 if bbox and len(elem.points) >= 2:
                     current_width = bbox[2] - bbox[0]
@@ -1465,9 +2023,8 @@ class EditorState:
                         center_x = (bbox[0] + bbox[2]) / 2
                         center_y = (bbox[1] + bbox[3]) / 2
                         # Scale points relative to center
-                        for p in elem.points:
-                            p.x = center_x + (p.x - center_x) * scale_x
-                            p.y = center_y + (p.y - center_y) * scale_y
+                        elem.points.scale(center_x, center_y, scale_x, scale_y)
+                        elem.touch()
 
         return True
 
@@ -1481,32 +2038,32 @@ class EditorState:
             return False
 
         # Get bounding box of all selected elements
-        all_x = []
+        all_bounds = []
         for idx in self.selected_indices:
             if 0 <= idx < len(self.elements):
                 elem = self.elements[idx]
                 if elem.locked:
                     continue
-                for p in elem.points:
-                    all_x.append(p.x)
+                bounds = elem.points.bounds()
+                if bounds:
+                    all_bounds.append(bounds)
 
-        if not all_x:
+        if not all_bounds:
             return False
 
-        center_x = (min(all_x) + max(all_x)) / 2
+        center_x = (min(b[0] for b in all_bounds) + max(b[2] for b in all_bounds)) / 2
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Flip points around center
         for idx in self.selected_indices:
             if 0 <= idx < len(self.elements):
-                elem = self.elements[idx]
-                if elem.locked:
+                if self.elements[idx].locked:
                     continue
-                for p in elem.points:
-                    p.x = center_x + (center_x - p.x)
+                elem = self._edit_element(idx)
+                elem.points.scale(center_x, 0, -1, 1)
+                elem.touch()
 
         return True
 
@@ -1520,32 +2077,32 @@ class EditorState:
             return False
 
         # Get bounding box of all selected elements
-        all_y = []
+        all_bounds = []
         for idx in self.selected_indices:
             if 0 <= idx < len(self.elements):
                 elem = self.elements[idx]
                 if elem.locked:
                     continue
-                for p in elem.points:
-                    all_y.append(p.y)
+                bounds = elem.points.bounds()
+                if bounds:
+                    all_bounds.append(bounds)
 
-        if not all_y:
+        if not all_bounds:
             return False
 
-        center_y = (min(all_y) + max(all_y)) / 2
+        center_y = (min(b[1] for b in all_bounds) + max(b[3] for b in all_bounds)) / 2
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Flip points around center
         for idx in self.selected_indices:
             if 0 <= idx < len(self.elements):
-                elem = self.elements[idx]
-                if elem.locked:
+                if self.elements[idx].locked:
                     continue
-                for p in elem.points:
-                    p.y = center_y + (center_y - p.y)
+                elem = self._edit_element(idx)
+                elem.points.scale(0, center_y, 1, -1)
+                elem.touch()
 
         return True
 
@@ -1561,47 +2118,38 @@ class EditorState:
         if not self.selected_indices:
             return False
 
-        # Collect all points from non-locked selected elements
-        all_points = []
+        # Collect the point bounds of non-locked selected elements
+        all_bounds = []
         for idx in self.selected_indices:
             if 0 <= idx < len(self.elements):
                 elem = self.elements[idx]
                 if elem.locked:
                     continue
-                for p in elem.points:
-                    all_points.append((p.x, p.y))
+                bounds = elem.points.bounds()
+                if bounds:
+                    all_bounds.append(bounds)
 
-        if not all_points:
+        if not all_bounds:
             return False
 
         # Calculate center of all points
-        all_x = [p[0] for p in all_points]
-        all_y = [p[1] for p in all_points]
-        center_x = (min(all_x) + max(all_x)) / 2
-        center_y = (min(all_y) + max(all_y)) / 2
+        center_x = (min(b[0] for b in all_bounds) + max(b[2] for b in all_bounds)) / 2
+        center_y = (min(b[1] for b in all_bounds) + max(b[3] for b in all_bounds)) / 2
 
         # Convert angle to radians (negative because screen Y is inverted)
         angle_rad = math.radians(-angle_degrees)
-        cos_a = math.cos(angle_rad)
-        sin_a = math.sin(angle_rad)
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Rotate points around center
         for idx in self.selected_indices:
             if 0 <= idx < len(self.elements):
-                elem = self.elements[idx]
-                if elem.locked:
+                if self.elements[idx].locked:
                     continue
-                for p in elem.points:
-                    # Translate to origin
-                    dx = p.x - center_x
-                    dy = p.y - center_y
-                    # Rotate
-                    p.x = center_x + dx * cos_a - dy * sin_a
-                    p.y = center_y + dx * sin_a + dy * cos_a
+                elem = self._edit_element(idx)
+                elem.points.rotate(center_x, center_y, angle_rad)
+                elem.touch()
 
         return True
 
@@ -1628,12 +2176,11 @@ class EditorState:
         if not modifiable:
             return False
 
-        # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        # Save for undo (repeated opacity changes share an entry)
+        self._push_undo(coalesce=("opacity", frozenset(modifiable)))
 
         for idx in modifiable:
-            self.elements[idx].color.a = opacity
+            self._edit_element(idx).color.a = opacity
 
         return True
 
@@ -1658,12 +2205,11 @@ class EditorState:
         if not modifiable:
             return False
 
-        # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        # Save for undo (repeated opacity steps share an entry)
+        self._push_undo(coalesce=("opacity", frozenset(modifiable)))
 
         for idx in modifiable:
-            elem = self.elements[idx]
+            elem = self._edit_element(idx)
             new_opacity = max(0.0, min(1.0, elem.color.a + delta))
             elem.color.a = new_opacity
 
@@ -1693,8 +2239,7 @@ class EditorState:
             return False
 
         # Save for undo
-        self.undo_stack.append([copy.deepcopy(e) for e in self.elements])
-        self.redo_stack.clear()
+        self._push_undo()
 
         # Determine new lock state (if any unlocked, lock all; otherwise unlock all)
         any_unlocked = any(
@@ -1705,7 +2250,7 @@ class EditorState:
 
         for idx in self.selected_indices:
             if 0 <= idx < len(self.elements):
-                self.elements[idx].locked = new_state
+                self._edit_element(idx).locked = new_state
 
         return True
 
@@ -1790,32 +2335,25 @@ class EditorState:
         cx = (x1 + x2) / 2
         cy = (y1 + y2) / 2
 
-        h_lines, v_lines = self._get_snap_lines()
+        # Lines of the unmoved elements are fixed for the whole drag
+        if self._snap_lines is None:
+            self._snap_lines = SnapLines(*self._get_snap_lines())
+        lines = self._snap_lines
 
         snap_dx = 0.0
         snap_dy = 0.0
 
-        # Check horizontal snapping (y values)
-        elem_y_points = [y1, cy, y2]  # Top, center, bottom
-        for elem_y in elem_y_points:
-            for snap_y in h_lines:
-                if abs(elem_y - snap_y) < self.snap_threshold:
-                    snap_dy = snap_y - elem_y
-                    self.active_snap_guides.append(("h", snap_y))
-                    break
-            if snap_dy != 0:
-                break
+        # Snap the nearest of top, center, bottom to a horizontal line
+        snap = lines.snap_y((y1, cy, y2), self.snap_threshold)
+        if snap is not None:
+            snap_dy, snap_y = snap
+            self.active_snap_guides.append(("h", snap_y))
 
-        # Check vertical snapping (x values)
-        elem_x_points = [x1, cx, x2]  # Left, center, right
-        for elem_x in elem_x_points:
-            for snap_x in v_lines:
-                if abs(elem_x - snap_x) < self.snap_threshold:
-                    snap_dx = snap_x - elem_x
-                    self.active_snap_guides.append(("v", snap_x))
-                    break
-            if snap_dx != 0:
-                break
+        # Snap the nearest of left, center, right to a vertical line
+        snap = lines.snap_x((x1, cx, x2), self.snap_threshold)
+        if snap is not None:
+            snap_dx, snap_x = snap
+            self.active_snap_guides.append(("v", snap_x))
 
         return snap_dx, snap_dy
 
@@ -1829,7 +2367,13 @@ class EditorState:
             return False
 
         self.redo_stack.append(self.elements.copy())
+        self._redo_costs.append(self._undo_costs.pop())
+        self._history_bytes -= self._redo_costs[-1]
         self.elements = self.undo_stack.pop()
+        self._unshared = {}
+        self._coalesce_key = None
+        self._touch_all()
+        self.mark_modified()
         return True
 
     def redo(self) -> bool:
@@ -1842,14 +2386,27 @@ class EditorState:
             return False
 
         self.undo_stack.append(self.elements.copy())
+        self._undo_costs.append(self._redo_costs.pop())
+        self._history_bytes += self._undo_costs[-1]
+        self._trim_history()
         self.elements = self.redo_stack.pop()
+        self._unshared = {}
+        self._coalesce_key = None
+        self._touch_all()
+        self.mark_modified()
         return True
 
+    def _touch_all(self) -> None:
+        """Bump the version of every element, e.g. after restoring a snapshot."""
+        for elem in self.elements:
+            elem.touch()
+
     def clear(self) -> None:
         """Clear all drawing elements."""
         if self.elements:
-            self.undo_stack.append(self.elements.copy())
-            self.redo_stack.clear()
+            self._push_undo()
+            for elem in self.elements:
+                self._charge_history(elem)
         self.elements.clear()
 
     def get_elements(self) -> List[DrawingElement]:
@@ -1864,11 +2421,149 @@ class EditorState:
         return len(self.elements) > 0 or self.current_element is not None
 
 
+def _clamp_region(
+    x: int, y: int, width: int, height: int, img_width: int, img_height: int
+) -> Tuple[int, int, int, int]:
+    """Clamp a region to image bounds, returning (x1, y1, x2, y2)."""
+    x1 = max(0, x)
+    y1 = max(0, y)
+    x2 = min(img_width, x + width)
+    y2 = min(img_height, y + height)
+    return x1, y1, x2, y2
+
+
+def _pixel_array(pixbuf: Any) -> Any:
+    """Get the pixbuf's pixels as a (height, width, channels) numpy view.
+
+    The view follows the rowstride and is shared through pixel_view, so
+    repeated effects on one image don't copy it each time.
+    """
+    _ensure_numpy()  # Ensure numpy is loaded
+    return pixel_view(pixbuf).array()
+
+
+def _pixbuf_from_region(data: bytes, template: Any, width: int, height: int) -> Any:
+    """Create a tightly packed pixbuf with the same format as template."""
+    n_channels = template.get_n_channels()
+    return GdkPixbuf.Pixbuf.new_from_data(
+        data,
+        template.get_colorspace(),
+        template.get_has_alpha(),
+        template.get_bits_per_sample(),
+        width,
+        height,
+        width * n_channels,
+    )
+
+
+def _box_blur_numpy(src: Any, x1: int, y1: int, x2: int, y2: int, radius: int) -> Any:
+    """Box-blur src[y1:y2, x1:x2] with a separable summed-area pass.
+
+    Samples outside the image are clamped to the nearest edge pixel, which
+    matches the original per-pixel implementation exactly.
+
+    Returns:
+        A (y2 - y1, x2 - x1, channels) uint8 array.
+    """
+    _ensure_numpy()  # Ensure numpy is loaded
+    img_height, img_width, n_channels = src.shape
+    window = 2 * radius + 1
+
+    rows = np.clip(np.arange(y1 - radius, y2 + radius), 0, img_height - 1)
+    cols = np.clip(np.arange(x1 - radius, x2 + radius), 0, img_width - 1)
+    padded = src[np.ix_(rows, cols)].astype(np.uint32)
+
+    # Vertical then horizontal running sums over the RGB channels
+    rgb = padded[:, :, :3]
+    acc = np.zeros((rgb.shape[0] + 1,) + rgb.shape[1:], dtype=np.uint32)
+    np.cumsum(rgb, axis=0, out=acc[1:])
+    vertical = acc[window:] - acc[:-window]
+
+    acc = np.zeros((vertical.shape[0], vertical.shape[1] + 1, 3), dtype=np.uint32)
+    np.cumsum(vertical, axis=1, out=acc[:, 1:])
+    summed = acc[:, window:] - acc[:, :-window]
+
+    out = src[y1:y2, x1:x2].copy()
+    out[:, :, :3] = summed // (window * window)
+    return out
+
+
+def _box_blur_python(
+    pixels: bytes,
+    rowstride: int,
+    n_channels: int,
+    img_width: int,
+    img_height: int,
+    region: Tuple[int, int, int, int],
+    radius: int,
+) -> bytearray:
+    """Pure-Python separable box blur used when numpy is unavailable.
+
+    Returns:
+        Tightly packed pixel data for the region (alpha copied unchanged).
+    """
+    x1, y1, x2, y2 = region
+    out_width = x2 - x1
+    out_height = y2 - y1
+    window = 2 * radius + 1
+
+    def clamp_x(px: int) -> int:
+        return min(max(px, 0), img_width - 1) * n_channels
+
+    # Horizontal pass: running sums for every (clamped) source row we need
+    row_cache = {}
+    row_sums = []
+    for sample_y in range(y1 - radius, y2 + radius):
+        sy = min(max(sample_y, 0), img_height - 1)
+        if sy not in row_cache:
+            base = sy * rowstride
+            sums = [0] * (out_width * 3)
+            for c in range(3):
+                s = 0
+                for px in range(x1 - radius, x1 + radius + 1):
+                    s += pixels[base + clamp_x(px) + c]
+                sums[c] = s
+                for i in range(1, out_width):
+                    s += pixels[base + clamp_x(x1 + i + radius) + c]
+                    s -= pixels[base + clamp_x(x1 + i - 1 - radius) + c]
+                    sums[i * 3 + c] = s
+            row_cache[sy] = sums
+        row_sums.append(row_cache[sy])
+
+    # Vertical pass over the horizontal sums
+    area = window * window
+    out = bytearray(out_width * out_height * n_channels)
+    for i in range(out_width * 3):
+        s = 0
+        for j in range(window):
+            s += row_sums[j][i]
+        px, c = divmod(i, 3)
+        for row in range(out_height):
+            if row:
+                s += row_sums[row + window - 1][i] - row_sums[row - 1][i]
+            out[(row * out_width + px) * n_channels + c] = s // area
+
+    # Keep any extra channels (alpha) untouched
+    for ch in range(3, n_channels):
+        for row in range(out_height):
+            base = (y1 + row) * rowstride
+            for px in range(out_width):
+                out[(row * out_width + px) * n_channels + ch] = pixels[
+                    base + (x1 + px) * n_channels + ch
+                ]
+
+    return out
+
+
 def apply_blur_region(
     pixbuf: Any, x: int, y: int, width: int, height: int, radius: int = 10
-) -> Any:
+) -> Optional[Any]:
     """Apply blur effect to a region of the pixbuf.
 
+    Only the region (clamped to the image) is processed and returned, so the
+    cost scales with the region rather than the whole image. Uses a numpy
+    summed-area box blur when available and a pure-Python fallback otherwise.
+
     Args:
         pixbuf: Source GdkPixbuf.
         x, y: Top-left corner of region.
@@ -1876,71 +2571,183 @@ def apply_blur_region(
         radius: Blur radius.
 
     Returns:
-        Modified pixbuf with blur applied.
+        A pixbuf of the clamped region with blur applied (place it at
+        (max(0, x), max(0, y))), or None if the region is outside the image.
     """
-    # Simple box blur implementation
-    # Extract region
-    has_alpha = pixbuf.get_has_alpha()
-    n_channels = pixbuf.get_n_channels()
-    rowstride = pixbuf.get_rowstride()
-    pixels = pixbuf.get_pixels()
-
     img_width = pixbuf.get_width()
     img_height = pixbuf.get_height()
+    x1, y1, x2, y2 = _clamp_region(x, y, width, height, img_width, img_height)
+    if x2 <= x1 or y2 <= y1:
+        return None
 
-    # Clamp region to image bounds
-    x1 = max(0, x)
-    y1 = max(0, y)
-    x2 = min(img_width, x + width)
-    y2 = min(img_height, y + height)
+    radius = max(0, int(radius))
 
-    # Create a copy of the pixels array for the region
-    import array
-
-    new_pixels = array.array("B", pixels)
-
-    # Apply box blur
-    for py in range(y1, y2):
-        for px in range(x1, x2):
-            r_sum, g_sum, b_sum, count = 0, 0, 0, 0
-
-            # Average pixels in radius
-            for dy in range(-radius, radius + 1):
-                for dx in range(-radius, radius + 1):
-                    sample_x = max(0, min(img_width - 1, px + dx))
-                    sample_y = max(0, min(img_height - 1, py + dy))
-
-                    offset = sample_y * rowstride + sample_x * n_channels
-                    r_sum += pixels[offset]
-                    g_sum += pixels[offset + 1]
-                    b_sum += pixels[offset + 2]
-                    count += 1
-
-            # Write averaged color
-            offset = py * rowstride + px * n_channels
-            new_pixels[offset] = r_sum // count
-            new_pixels[offset + 1] = g_sum // count
-            new_pixels[offset + 2] = b_sum // count
-
-    # Create new pixbuf with blurred pixels
-    new_pixbuf = GdkPixbuf.Pixbuf.new_from_data(
-        new_pixels.tobytes(),
-        pixbuf.get_colorspace(),
-        has_alpha,
-        pixbuf.get_bits_per_sample(),
-        img_width,
-        img_height,
-        rowstride,
+    if _ensure_numpy():
+        blurred = _box_blur_numpy(_pixel_array(pixbuf), x1, y1, x2, y2, radius)
+        data = blurred.tobytes()
+    else:
+        data = bytes(
+            _box_blur_python(
+                pixel_view(pixbuf).data,
+                pixbuf.get_rowstride(),
+                pixbuf.get_n_channels(),
+                img_width,
+                img_height,
+                (x1, y1, x2, y2),
+                radius,
+            )
+        )
+
+    return _pixbuf_from_region(data, pixbuf, x2 - x1, y2 - y1)
+
+
+def _grid_spans(start: int, end: int, size: int) -> List[Tuple[int, int]]:
+    """Split [start, end) where it crosses a multiple of size."""
+    spans = []
+    while start < end:
+        stop = min(end, (start // size + 1) * size)
+        spans.append((start, stop))
+        start = stop
+    return spans
+
+
+def _block_means_numpy(src: Any, x1: int, y1: int, x2: int, y2: int, size: int) -> Any:
+    """Get the mean RGB of each pixelate block of src[y1:y2, x1:x2].
+
+    Blocks lie on a grid anchored at the image origin and only count the
+    pixels inside the region. The region is zero-padded out to whole
+    blocks, reshaped to (rows, size, cols, size, 3) and summed per block.
+
+    Returns:
+        A (rows, cols, 3) array; block (0, 0) is the one holding (x1, y1).
+    """
+    _ensure_numpy()  # Ensure numpy is loaded
+    region = src[y1:y2, x1:x2]
+    height, width = region.shape[:2]
+    top, left = y1 % size, x1 % size
+    block_rows = -(-(top + height) // size)
+    block_cols = -(-(left + width) // size)
+
+    padded = np.zeros((block_rows * size, block_cols * size, 3), dtype=np.uint32)
+    padded[top : top + height, left : left + width] = region[:, :, :3]
+    sums = padded.reshape(block_rows, size, block_cols, size, 3).sum(axis=(1, 3))
+
+    edges = np.arange(block_rows + 1) * size
+    row_counts = np.diff(np.clip(edges, top, top + height))
+    edges = np.arange(block_cols + 1) * size
+    col_counts = np.diff(np.clip(edges, left, left + width))
+    return sums // np.outer(row_counts, col_counts)[:, :, None]
+
+
+def _pixelate_numpy(src: Any, x1: int, y1: int, x2: int, y2: int, size: int) -> Any:
+    """Pixelate src[y1:y2, x1:x2] by block-mean reduction (see _block_means_numpy).
+
+    Returns:
+        A (y2 - y1, x2 - x1, channels) uint8 array.
+    """
+    means = _block_means_numpy(src, x1, y1, x2, y2, size)
+    block_rows, block_cols = means.shape[:2]
+    top, left = y1 % size, x1 % size
+
+    # Broadcast each block mean back over its pixels
+    blocks = np.broadcast_to(
+        means[:, None, :, None, :], (block_rows, size, block_cols, size, 3)
     )
+    out = src[y1:y2, x1:x2].copy()
+    out[:, :, :3] = blocks.reshape(block_rows * size, block_cols * size, 3)[
+        top : top + y2 - y1, left : left + x2 - x1
+    ]
+    return out
+
+
+def _block_means_python(
+    pixels: bytes,
+    rowstride: int,
+    n_channels: int,
+    region: Tuple[int, int, int, int],
+    size: int,
+) -> List[List[Tuple[int, int, int]]]:
+    """Pure-Python counterpart of _block_means_numpy (rows of RGB means)."""
+    x1, y1, x2, y2 = region
+    columns = _grid_spans(x1, x2, size)
+    means = []
+    for block_y, block_y2 in _grid_spans(y1, y2, size):
+        row = []
+        for block_x, block_x2 in columns:
+            sums = [0, 0, 0]
+            for py in range(block_y, block_y2):
+                base = py * rowstride
+                for px in range(block_x, block_x2):
+                    offset = base + px * n_channels
+                    sums[0] += pixels[offset]
+                    sums[1] += pixels[offset + 1]
+                    sums[2] += pixels[offset + 2]
+            count = (block_y2 - block_y) * (block_x2 - block_x)
+            row.append((sums[0] // count, sums[1] // count, sums[2] // count))
+        means.append(row)
+    return means
+
+
+def _pixelate_python(
+    pixels: bytes,
+    rowstride: int,
+    n_channels: int,
+    region: Tuple[int, int, int, int],
+    size: int,
+) -> bytearray:
+    """Pure-Python block-mean pixelation used when numpy is unavailable.
 
-    return new_pixbuf
+    Returns:
+        Tightly packed pixel data for the region (alpha copied unchanged).
+    """
+    x1, y1, x2, y2 = region
+    out_width = x2 - x1
+    out = bytearray(out_width * (y2 - y1) * n_channels)
+    means = _block_means_python(pixels, rowstride, n_channels, region, size)
+    columns = _grid_spans(x1, x2, size)
+
+    for (block_y, block_y2), row in zip(_grid_spans(y1, y2, size), means):
+        for (block_x, block_x2), avg in zip(columns, row):
+            color = bytes(avg)
+            for py in range(block_y, block_y2):
+                src_base = py * rowstride
+                dst_base = (py - y1) * out_width * n_channels
+                for px in range(block_x, block_x2):
+                    dst = dst_base + (px - x1) * n_channels
+                    out[dst : dst + 3] = color
+                    for ch in range(3, n_channels):
+                        out[dst + ch] = pixels[src_base + px * n_channels + ch]
+
+    return out
+
+
+def _pixelate_means(
+    pixbuf: Any, x1: int, y1: int, x2: int, y2: int, size: int
+) -> bytes:
+    """Get the block means of a clamped region as packed RGB rows."""
+    if _ensure_numpy():
+        means = _block_means_numpy(_pixel_array(pixbuf), x1, y1, x2, y2, size)
+        return means.astype(np.uint8).tobytes()
+    means = _block_means_python(
+        pixel_view(pixbuf).data,
+        pixbuf.get_rowstride(),
+        pixbuf.get_n_channels(),
+        (x1, y1, x2, y2),
+        size,
+    )
+    return bytes(value for row in means for avg in row for value in avg)
 
 
 def apply_pixelate_region(
-    pixbuf: Any, x: int, y: int, width: int, height: int, pixel_size: int = 10
-) -> Any:
+    pixbuf: Any, x: int, y: int, width: int, height: int, pixel_size: int = 15
+) -> Optional[Any]:
     """Apply pixelate effect to a region of the pixbuf.
 
+    Only the region (clamped to the image) is read and returned. Blocks lie
+    on a grid anchored at the image origin, so they don't move with the
+    region's corner; blocks cut by the region's edge average only the
+    pixels inside it.
+
     Args:
         pixbuf: Source GdkPixbuf.
         x, y: Top-left corner of region.
@@ -1948,71 +2755,41 @@ def apply_pixelate_region(
         pixel_size: Size of pixelation blocks.
 
     Returns:
-        Modified pixbuf with pixelation applied.
+        A pixbuf of the clamped region with pixelation applied (place it at
+        (max(0, x), max(0, y))), or None if the region is outside the image.
     """
-    has_alpha = pixbuf.get_has_alpha()
-    n_channels = pixbuf.get_n_channels()
-    rowstride = pixbuf.get_rowstride()
-    pixels = pixbuf.get_pixels()
-
-    img_width = pixbuf.get_width()
-    img_height = pixbuf.get_height()
+    x1, y1, x2, y2 = _clamp_region(
+        x, y, width, height, pixbuf.get_width(), pixbuf.get_height()
+    )
+    if x2 <= x1 or y2 <= y1:
+        return None
 
-    # Clamp region to image bounds
-    x1 = max(0, x)
-    y1 = max(0, y)
-    x2 = min(img_width, x + width)
-    y2 = min(img_height, y + height)
+    size = max(1, int(pixel_size))
 
-    import array
-
-    new_pixels = array.array("B", pixels)
-
-    # Process in blocks
-    for block_y in range(y1, y2, pixel_size):
-        for block_x in range(x1, x2, pixel_size):
-            # Calculate average color for this block
-            r_sum, g_sum, b_sum, count = 0, 0, 0, 0
-
-            for py in range(block_y, min(block_y + pixel_size, y2)):
-                for px in range(block_x, min(block_x + pixel_size, x2)):
-                    offset = py * rowstride + px * n_channels
-                    r_sum += pixels[offset]
-                    g_sum += pixels[offset + 1]
-                    b_sum += pixels[offset + 2]
-                    count += 1
-
-            if count > 0:
-                avg_r = r_sum // count
-                avg_g = g_sum // count
-                avg_b = b_sum // count
-
-                # Fill the block with average color
-                for py in range(block_y, min(block_y + pixel_size, y2)):
-                    for px in range(block_x, min(block_x + pixel_size, x2)):
-                        offset = py * rowstride + px * n_channels
-                        new_pixels[offset] = avg_r
-                        new_pixels[offset + 1] = avg_g
-                        new_pixels[offset + 2] = avg_b
-
-    # Create new pixbuf
-    new_pixbuf = GdkPixbuf.Pixbuf.new_from_data(
-        new_pixels.tobytes(),
-        pixbuf.get_colorspace(),
-        has_alpha,
-        pixbuf.get_bits_per_sample(),
-        img_width,
-        img_height,
-        rowstride,
-    )
+    if _ensure_numpy():
+        pixelated = _pixelate_numpy(_pixel_array(pixbuf), x1, y1, x2, y2, size)
+        data = pixelated.tobytes()
+    else:
+        data = bytes(
+            _pixelate_python(
+                pixel_view(pixbuf).data,
+                pixbuf.get_rowstride(),
+                pixbuf.get_n_channels(),
+                (x1, y1, x2, y2),
+                size,
+            )
+        )
 
-    return new_pixbuf
+    return _pixbuf_from_region(data, pixbuf, x2 - x1, y2 - y1)
 
 
 def render_elements(
     surface_or_ctx: Any,
     elements: List[DrawingElement],
     base_pixbuf: Optional[Any] = None,
+    cache: Optional[RenderCache] = None,
+    clip: Optional[Rect] = None,
+    preview: Optional[DrawingElement] = None,
 ) -> None:
     """Render drawing elements to a Cairo surface or context.
 
@@ -2020,6 +2797,11 @@ def render_elements(
         surface_or_ctx: Cairo surface or context to render to.
         elements: List of DrawingElement objects to render.
         base_pixbuf: Optional base pixbuf for blur/pixelate operations.
+        cache: Optional RenderCache used to reuse blur/pixelate rasters.
+        clip: Optional (x1, y1, x2, y2) area in element coordinates;
+            elements entirely outside it are skipped.
+        preview: Element still being drawn; if it is a blur or pixelate
+            region it gets a cheap low-resolution preview.
     """
     try:
         import cairo
@@ -2035,6 +2817,8 @@ def render_elements(
     for element in elements:
         if not element.points:
             continue
+        if clip is not None and not rects_intersect(get_element_extents(element), clip):
+            continue
 
         r, g, b, a = element.color.to_tuple()
         ctx.set_source_rgba(r, g, b, a)
@@ -2058,20 +2842,41 @@ def render_elements(
             _render_text(ctx, element)
         elif element.tool == ToolType.ERASER:
             _render_eraser(ctx, element)
+        elif element.tool in EFFECT_TOOLS and base_pixbuf and element is preview:
+            _render_effect_preview(ctx, element, base_pixbuf, cache)
         elif element.tool == ToolType.BLUR and base_pixbuf:
-            _render_blur(ctx, element, base_pixbuf)
+            _render_blur(ctx, element, base_pixbuf, cache)
         elif element.tool == ToolType.PIXELATE and base_pixbuf:
-            _render_pixelate(ctx, element, base_pixbuf)
+            _render_pixelate(ctx, element, base_pixbuf, cache)
         elif element.tool == ToolType.MEASURE:
             _render_measure(ctx, element)
         elif element.tool == ToolType.NUMBER:
-            _render_number(ctx, element)
+            _render_number(ctx, element, cache)
         elif element.tool == ToolType.STAMP:
-            _render_stamp(ctx, element)
+            _render_stamp(ctx, element, cache)
         elif element.tool == ToolType.CALLOUT:
             _render_callout(ctx, element)
 
 
+def _trace_polyline(ctx: Any, points: PointArray) -> None:
+    """Add a polyline through points to the current path.
+
+    A pending point transform is applied by cairo while the path is built
+    rather than baked into the samples; the CTM is restored before the
+    caller strokes, so line widths stay unscaled.
+    """
+    data, matrix = points.raw()
+    ctx.save()
+    if matrix is not None:
+        import cairo
+
+        ctx.transform(cairo.Matrix(*matrix))
+    ctx.move_to(data[0], data[1])
+    for i in range(2, len(data), 2):
+        ctx.line_to(data[i], data[i + 1])
+    ctx.restore()
+
+
 def _render_freehand(ctx: Any, element: DrawingElement) -> None:
     """Render a freehand drawing."""
     if len(element.points) < 2:
@@ -2080,9 +2885,7 @@ def _render_freehand(ctx: Any, element: DrawingElement) -> None:
     ctx.set_line_cap(1)  # Round caps
     ctx.set_line_join(1)  # Round joins
 
-    ctx.move_to(element.points[0].x, element.points[0].y)
-    for point in element.points[1:]:
-        ctx.line_to(point.x, point.y)
+    _trace_polyline(ctx, element.points)
     ctx.stroke()
 
 
@@ -2212,15 +3015,16 @@ def _render_text(ctx: Any, element: DrawingElement) -> None:
     if not element.points or not element.text:
         return
 
-    point = element.points[0]
-    # Cairo font slant: 0=normal, 1=italic, 2=oblique
-    # Cairo font weight: 0=normal, 1=bold
-    slant = 1 if element.font_italic else 0
-    weight = 1 if element.font_bold else 0
-    ctx.select_font_face(element.font_family, slant, weight)
-    ctx.set_font_size(element.font_size)
-    ctx.move_to(point.x, point.y)
-    ctx.show_text(element.text)
+    layout = get_layout(
+        element.text,
+        element.font_family,
+        element.font_size,
+        element.font_bold,
+        element.font_italic,
+    )
+    if layout is not None:
+        point = element.points[0]
+        layout.show(ctx, point.x, point.y)
 
 
 def _render_eraser(ctx: Any, element: DrawingElement) -> None:
@@ -2232,66 +3036,231 @@ def _render_eraser(ctx: Any, element: DrawingElement) -> None:
     ctx.set_line_width(element.stroke_width * 3)
     ctx.set_line_cap(1)  # Round
 
-    ctx.move_to(element.points[0].x, element.points[0].y)
-    for point in element.points[1:]:
-        ctx.line_to(point.x, point.y)
+    _trace_polyline(ctx, element.points)
     ctx.stroke()
 
 
-def _render_blur(ctx: Any, element: DrawingElement, base_pixbuf: Any) -> None:
-    """Render blur effect."""
-    if len(element.points) < 2:
-        return
+def _effect_cache_key(element: DrawingElement, base_pixbuf: Any, generation: int):
+    """Build the render cache key for a blur/pixelate element.
 
+    The key covers the element identity, its integer rect, the effect size
+    and the base image (object and cache generation), so any change to the
+    geometry or the image yields a different key.
+    """
     start = element.points[0]
     end = element.points[-1]
+    rect = (
+        int(min(start.x, end.x)),
+        int(min(start.y, end.y)),
+        int(abs(end.x - start.x)),
+        int(abs(end.y - start.y)),
+    )
+    size = element.blur_radius if element.tool == ToolType.BLUR else element.pixel_size
+    return (element.tool, id(element), rect, size, id(base_pixbuf), generation)
+
 
-    x = int(min(start.x, end.x))
-    y = int(min(start.y, end.y))
-    width = int(abs(end.x - start.x))
-    height = int(abs(end.y - start.y))
+def _render_effect(
+    ctx: Any,
+    element: DrawingElement,
+    base_pixbuf: Any,
+    cache: Optional[RenderCache],
+    apply_effect: Any,
+) -> None:
+    """Paint a blur/pixelate region, reusing a cached raster when possible."""
+    if len(element.points) < 2:
+        return
 
-    # Apply blur to base pixbuf region
-    blurred = apply_blur_region(base_pixbuf, x, y, width, height, radius=10)
+    key = _effect_cache_key(element, base_pixbuf, cache.generation if cache else 0)
+    _, _, (x, y, width, height), size, _, _ = key
 
-    # Draw blurred region
+    entry = cache.get(key) if cache is not None else None
     try:
         from gi.repository import Gdk
 
-        Gdk.cairo_set_source_pixbuf(ctx, blurred, 0, 0)
-        ctx.rectangle(x, y, width, height)
+        if entry is None:
+            processed = apply_effect(base_pixbuf, x, y, width, height, size)
+            if processed is None:
+                return
+            surface = Gdk.cairo_surface_create_from_pixbuf(processed, 1, None)
+            if cache is not None:
+                # Keep the element alive with its raster so id() stays unique
+                nbytes = surface.get_stride() * surface.get_height()
+                cache.put(key, (element, surface), nbytes)
+        else:
+            surface = entry[1]
+
+        # Draw processed region at its clamped origin
+        x1, y1 = max(0, x), max(0, y)
+        ctx.set_source_surface(surface, x1, y1)
+        ctx.rectangle(x1, y1, surface.get_width(), surface.get_height())
         ctx.fill()
     except Exception:
         pass
 
 
-def _render_pixelate(ctx: Any, element: DrawingElement, base_pixbuf: Any) -> None:
-    """Render pixelate effect."""
-    if len(element.points) < 2:
-        return
+def _preview_geometry(
+    element: DrawingElement, img_width: int, img_height: int
+) -> Optional[Tuple[int, int, int, int, int]]:
+    """Get how the live preview of a blur/pixelate region maps onto the image.
 
+    For pixelate, the blocks the region touches are reduced to one pixel
+    each, on the image-anchored grid apply_pixelate_region uses: the
+    region becomes low_width x low_height blocks, the first of which
+    starts at (origin_x, origin_y). For blur
+    the whole image is reduced to low_width x low_height and blurred with
+    low_radius, the blur radius scaled down with the image.
+
+    Returns:
+        (origin_x, origin_y, low_width, low_height, low_radius), or None if
+        nothing of the image is left to preview.
+    """
     start = element.points[0]
     end = element.points[-1]
+    if element.tool == ToolType.PIXELATE:
+        size = max(1, int(element.pixel_size))
+        x1, y1, x2, y2 = _clamp_region(
+            int(min(start.x, end.x)),
+            int(min(start.y, end.y)),
+            int(abs(end.x - start.x)),
+            int(abs(end.y - start.y)),
+            img_width,
+            img_height,
+        )
+        if x2 <= x1 or y2 <= y1:
+            return None
+        origin_x = x1 // size * size
+        origin_y = y1 // size * size
+        return (
+            origin_x,
+            origin_y,
+            -(-(x2 - origin_x) // size),
+            -(-(y2 - origin_y) // size),
+            0,
+        )
+
+    factor = max(1, -(-max(img_width, img_height) // PREVIEW_MAX_SIDE))
+    return (
+        0,
+        0,
+        -(-img_width // factor),
+        -(-img_height // factor),
+        max(1, round(element.blur_radius / factor)),
+    )
+
+
+def _render_effect_preview(
+    ctx: Any,
+    element: DrawingElement,
+    base_pixbuf: Any,
+    cache: Optional[RenderCache],
+) -> None:
+    """Paint a cheap stand-in for a blur/pixelate region being dragged out.
+
+    Instead of processing the region at full resolution on every motion
+    event, the image is reduced (see _preview_geometry), the effect is
+    applied to the small copy and the copy is scaled back up under a clip
+    to the region. Blur reduces the whole image once per drag and later
+    frames only repaint the cached copy. Pixelate computes the block means
+    of the region, exactly the colours the committed effect fills its
+    blocks with, and draws each as one scaled-up pixel.
+    """
+    if len(element.points) < 2:
+        return
 
-    x = int(min(start.x, end.x))
-    y = int(min(start.y, end.y))
-    width = int(abs(end.x - start.x))
-    height = int(abs(end.y - start.y))
+    img_width = base_pixbuf.get_width()
+    img_height = base_pixbuf.get_height()
+    geometry = _preview_geometry(element, img_width, img_height)
+    if geometry is None:
+        return
+    origin_x, origin_y, low_width, low_height, low_radius = geometry
 
-    # Apply pixelation to base pixbuf region
-    pixelated = apply_pixelate_region(base_pixbuf, x, y, width, height, pixel_size=15)
+    start = element.points[0]
+    end = element.points[-1]
+    x1, y1, x2, y2 = _clamp_region(
+        int(min(start.x, end.x)),
+        int(min(start.y, end.y)),
+        int(abs(end.x - start.x)),
+        int(abs(end.y - start.y)),
+        img_width,
+        img_height,
+    )
+    if x2 <= x1 or y2 <= y1:
+        return
 
-    # Draw pixelated region
     try:
+        import cairo
         from gi.repository import Gdk
 
-        Gdk.cairo_set_source_pixbuf(ctx, pixelated, 0, 0)
-        ctx.rectangle(x, y, width, height)
-        ctx.fill()
+        size = max(1, int(element.pixel_size))
+        if element.tool == ToolType.PIXELATE:
+            # Edge blocks average only the pixels inside the region
+            shape: Any = (x1, y1, x2, y2, size)
+        else:
+            shape = geometry
+        generation = cache.generation if cache is not None else 0
+        key = ("preview", element.tool, shape, id(base_pixbuf), generation)
+        surface = cache.get(key) if cache is not None else None
+        if surface is None:
+            if element.tool == ToolType.PIXELATE:
+                reduced = GdkPixbuf.Pixbuf.new_from_data(
+                    _pixelate_means(base_pixbuf, x1, y1, x2, y2, size),
+                    GdkPixbuf.Colorspace.RGB,
+                    False,
+                    8,
+                    low_width,
+                    low_height,
+                    low_width * 3,
+                )
+            else:
+                reduced = base_pixbuf.scale_simple(
+                    low_width, low_height, GdkPixbuf.InterpType.BILINEAR
+                )
+                reduced = apply_blur_region(
+                    reduced, 0, 0, low_width, low_height, low_radius
+                )
+            surface = Gdk.cairo_surface_create_from_pixbuf(reduced, 1, None)
+            if cache is not None:
+                nbytes = surface.get_stride() * surface.get_height()
+                cache.put(key, surface, nbytes)
+
+        ctx.save()
+        ctx.rectangle(x1, y1, x2 - x1, y2 - y1)
+        ctx.clip()
+        ctx.translate(origin_x, origin_y)
+        if element.tool == ToolType.PIXELATE:
+            ctx.scale(size, size)
+            filter_ = cairo.FILTER_NEAREST
+        else:
+            ctx.scale(img_width / low_width, img_height / low_height)
+            filter_ = cairo.FILTER_BILINEAR
+        ctx.set_source_surface(surface, 0, 0)
+        ctx.get_source().set_filter(filter_)
+        ctx.paint()
+        ctx.restore()
     except Exception:
         pass
 
 
+def _render_blur(
+    ctx: Any,
+    element: DrawingElement,
+    base_pixbuf: Any,
+    cache: Optional[RenderCache] = None,
+) -> None:
+    """Render blur effect."""
+    _render_effect(ctx, element, base_pixbuf, cache, apply_blur_region)
+
+
+def _render_pixelate(
+    ctx: Any,
+    element: DrawingElement,
+    base_pixbuf: Any,
+    cache: Optional[RenderCache] = None,
+) -> None:
+    """Render pixelate effect."""
+    _render_effect(ctx, element, base_pixbuf, cache, apply_pixelate_region)
+
+
 def _render_measure(ctx: Any, element: DrawingElement) -> None:
     """Render a measurement line with pixel distance, dimensions, and angle."""
     if len(element.points) < 2:
@@ -2361,9 +3330,7 @@ def _render_measure(ctx: Any, element: DrawingElement) -> None:
         ctx.stroke()
 
     # Prepare text label
-    ctx.select_font_face("Sans", 0, 1)  # Normal, Bold
     font_size = max(12, min(16, element.stroke_width * 4))
-    ctx.set_font_size(font_size)
 
     # Build label text with angle
     label = f"{distance:.0f}px"
@@ -2374,9 +3341,11 @@ def _render_measure(ctx: Any, element: DrawingElement) -> None:
         label += f" ∠{angle_degrees:.1f}°"
 
     # Get text extents for background
-    extents = ctx.text_extents(label)
-    text_width = extents.width
-    text_height = extents.height
+    layout = get_layout(label, "Sans", font_size, bold=True)
+    if layout is None:
+        return
+    text_width = layout.width
+    text_height = layout.height
 
     # Position label at midpoint of line
     mid_x = (start.x + end.x) / 2
@@ -2400,67 +3369,133 @@ def _render_measure(ctx: Any, element: DrawingElement) -> None:
 
     # Draw the text
     ctx.set_source_rgba(1, 1, 1, 1)  # White text
-    ctx.move_to(text_x, text_y)
-    ctx.show_text(label)
+    layout.show(ctx, text_x, text_y)
+
+
+def _paint_sprite(
+    ctx: Any,
+    cache: Optional[RenderCache],
+    key: Hashable,
+    point: Point,
+    extents: Rect,
+    draw: Any,
+) -> None:
+    """Paint a small marker at point from a cached raster.
 
+    draw(ctx) draws the marker around the origin within extents. The
+    raster is made at the context's scale, so repeated markers (stamps,
+    number badges) are shaped and filled once per zoom level and then
+    only blitted. Rotated or skewed contexts, and calls without a cache,
+    draw the vectors directly.
+    """
+    matrix = ctx.get_matrix()
+    xx, yx, xy, yy = matrix.xx, matrix.yx, matrix.xy, matrix.yy
+    if cache is None or yx or xy or xx <= 0 or yy <= 0:
+        ctx.save()
+        ctx.translate(point.x, point.y)
+        draw(ctx)
+        ctx.restore()
+        return
 
-def _render_number(ctx: Any, element: DrawingElement) -> None:
+    import cairo
+
+    key = ("sprite", key, xx, yy)
+    entry = cache.get(key)
+    if entry is None:
+        x1 = math.floor(extents[0] * xx) - 1
+        y1 = math.floor(extents[1] * yy) - 1
+        width = math.ceil(extents[2] * xx) + 1 - x1
+        height = math.ceil(extents[3] * yy) + 1 - y1
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+        sprite_ctx = cairo.Context(surface)
+        sprite_ctx.translate(-x1, -y1)
+        sprite_ctx.scale(xx, yy)
+        draw(sprite_ctx)
+        entry = (surface, x1, y1)
+        cache.put(key, entry, surface.get_stride() * height)
+    surface, x1, y1 = entry
+
+    # Blit on whole device pixels so the raster stays sharp
+    device_x, device_y = ctx.user_to_device(point.x, point.y)
+    ctx.save()
+    ctx.identity_matrix()
+    ctx.set_source_surface(surface, round(device_x) + x1, round(device_y) + y1)
+    ctx.paint()
+    ctx.restore()
+
+
+def _render_number(
+    ctx: Any, element: DrawingElement, cache: Optional[RenderCache] = None
+) -> None:
     """Render a numbered circle marker."""
     if not element.points:
         return
 
-    point = element.points[0]
-    r, g, b, a = element.color.to_tuple()
-
-    # Circle radius based on number of digits
+    color = element.color.to_tuple()
     num_str = str(element.number)
-    radius = max(14, 10 + len(num_str) * 4)
-
-    # Draw filled circle background
-    ctx.arc(point.x, point.y, radius, 0, 2 * math.pi)
-    ctx.set_source_rgba(r, g, b, a)
-    ctx.fill_preserve()
-
-    # Draw circle border (slightly darker)
-    ctx.set_source_rgba(r * 0.7, g * 0.7, b * 0.7, a)
-    ctx.set_line_width(2)
-    ctx.stroke()
-
-    # Draw the number text (white)
-    ctx.set_source_rgba(1, 1, 1, 1)
-    ctx.select_font_face("Sans", 0, 1)  # Normal, Bold
+    radius = _number_radius(element.number)
     font_size = max(12, radius - 2)
-    ctx.set_font_size(font_size)
+    layout = get_layout(num_str, "Sans", font_size, bold=True)
 
-    # Center the text
-    extents = ctx.text_extents(num_str)
-    text_x = point.x - extents.width / 2 - extents.x_bearing
-    text_y = point.y - extents.height / 2 - extents.y_bearing
+    def draw(ctx: Any) -> None:
+        r, g, b, a = color
+        # Draw filled circle background
+        ctx.arc(0, 0, radius, 0, 2 * math.pi)
+        ctx.set_source_rgba(r, g, b, a)
+        ctx.fill_preserve()
 
-    ctx.move_to(text_x, text_y)
-    ctx.show_text(num_str)
+        # Draw circle border (slightly darker)
+        ctx.set_source_rgba(r * 0.7, g * 0.7, b * 0.7, a)
+        ctx.set_line_width(2)
+        ctx.stroke()
+
+        # Draw the number text (white), centered
+        if layout is not None:
+            ctx.set_source_rgba(1, 1, 1, 1)
+            ink = layout.ink
+            layout.show(ctx, -(ink[0] + ink[2]) / 2, -(ink[1] + ink[3]) / 2)
+
+    pad = radius + 1  # Half the border width
+    _paint_sprite(
+        ctx,
+        cache,
+        ("number", num_str, color),
+        element.points[0],
+        (-pad, -pad, pad, pad),
+        draw,
+    )
 
 
-def _render_stamp(ctx: Any, element: DrawingElement) -> None:
+def _render_stamp(
+    ctx: Any, element: DrawingElement, cache: Optional[RenderCache] = None
+) -> None:
     """Render a stamp/emoji."""
     if not element.points or not element.stamp:
         return
 
-    point = element.points[0]
-
     # Use larger font size for stamps
-    font_size = max(24, element.font_size * 2)
-    ctx.select_font_face("Sans", 0, 0)  # Normal weight
-    ctx.set_font_size(font_size)
-
-    # Get text extents to center the stamp
-    extents = ctx.text_extents(element.stamp)
-    text_x = point.x - extents.width / 2 - extents.x_bearing
-    text_y = point.y - extents.height / 2 - extents.y_bearing
+    font_size = _stamp_font_size(element)
+    layout = get_layout(element.stamp, "Sans", font_size)
+    if layout is None:
+        return
 
-    # Draw the stamp
-    ctx.move_to(text_x, text_y)
-    ctx.show_text(element.stamp)
+    color = element.color.to_tuple()
+    ink = layout.ink
+    center_x, center_y = (ink[0] + ink[2]) / 2, (ink[1] + ink[3]) / 2
+
+    def draw(ctx: Any) -> None:
+        ctx.set_source_rgba(*color)
+        layout.show(ctx, -center_x, -center_y)
+
+    half_w, half_h = layout.width / 2, layout.height / 2
+    _paint_sprite(
+        ctx,
+        cache,
+        ("stamp", element.stamp, font_size, color),
+        element.points[0],
+        (-half_w, -half_h, half_w, half_h),
+        draw,
+    )
 
 
 def _render_callout(ctx: Any, element: DrawingElement) -> None:
@@ -2471,27 +3506,12 @@ def _render_callout(ctx: Any, element: DrawingElement) -> None:
     tail_tip = element.points[0]  # Where the pointer points
     box_pos = element.points[1]  # Box position
 
-    # Calculate text dimensions
-    ctx.select_font_face("Sans", 0, 0)
-    ctx.set_font_size(element.font_size)
-
-    # Split text into lines and calculate box size
-    lines = element.text.split("\n")
-    line_height = element.font_size * 1.3
-    max_width = 0
-    for line in lines:
-        extents = ctx.text_extents(line)
-        max_width = max(max_width, extents.width)
-
-    padding = 10
-    box_width = max_width + padding * 2
-    box_height = len(lines) * line_height + padding * 2
+    # Box sized to the (cached) line layouts, centered on box_pos
+    (box_x, box_y, box_width, box_height), layouts = _callout_box(element)
+    line_height = element.font_size * CALLOUT_LINE_SPACING
+    padding = CALLOUT_PADDING
     corner_radius = 8
 
-    # Box position (centered on box_pos)
-    box_x = box_pos.x - box_width / 2
-    box_y = box_pos.y - box_height / 2
-
     # Draw rounded rectangle with tail
     ctx.new_path()
 
@@ -2592,7 +3612,7 @@ def _render_callout(ctx: Any, element: DrawingElement) -> None:
     text_x = box_x + padding
     text_y = box_y + padding + element.font_size
 
-    for line in lines:
-        ctx.move_to(text_x, text_y)
-        ctx.show_text(line)
+    for layout in layouts:
+        if layout is not None:
+            layout.show(ctx, text_x, text_y)
         text_y += line_height
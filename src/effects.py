@@ -11,6 +11,9 @@ try:
 except (ImportError, ValueError):
     GTK_AVAILABLE = False
 
+from .image import pixbuf_from_surface
+from .pixels import pixel_bytes
+
 
 def add_shadow(pixbuf, shadow_size: int = 10, opacity: float = 0.5):
     """Add drop shadow to image."""
@@ -43,16 +46,7 @@ def add_shadow(pixbuf, shadow_size: int = 10, opacity: float = 0.5):
         ctx.paint()
 
         # Convert back to pixbuf
-        data = surface.get_data()
-        new_pixbuf = GdkPixbuf.Pixbuf.new_from_data(
-            data,
-            GdkPixbuf.Colorspace.RGB,
-            True,
-            8,
-            new_width,
-            new_height,
-            cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, new_width),
-        )
+        new_pixbuf = pixbuf_from_surface(surface)
 
         return new_pixbuf
     except Exception as e:
@@ -82,16 +76,7 @@ def add_border(pixbuf, border_width: int = 5, color: tuple = (0, 0, 0, 1)):
         Gdk.cairo_set_source_pixbuf(ctx, pixbuf, border_width, border_width)
         ctx.paint()
 
-        data = surface.get_data()
-        new_pixbuf = GdkPixbuf.Pixbuf.new_from_data(
-            data,
-            GdkPixbuf.Colorspace.RGB,
-            True,
-            8,
-            new_width,
-            new_height,
-            cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, new_width),
-        )
+        new_pixbuf = pixbuf_from_surface(surface)
 
         return new_pixbuf
     except Exception as e:
@@ -121,16 +106,7 @@ def add_background(pixbuf, bg_color: tuple = (1, 1, 1, 1), padding: int = 20):
         Gdk.cairo_set_source_pixbuf(ctx, pixbuf, padding, padding)
         ctx.paint()
 
-        data = surface.get_data()
-        new_pixbuf = GdkPixbuf.Pixbuf.new_from_data(
-            data,
-            GdkPixbuf.Colorspace.RGB,
-            True,
-            8,
-            new_width,
-            new_height,
-            cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, new_width),
-        )
+        new_pixbuf = pixbuf_from_surface(surface)
 
         return new_pixbuf
     except Exception as e:
@@ -166,16 +142,7 @@ def round_corners(pixbuf, radius: int = 10):
         Gdk.cairo_set_source_pixbuf(ctx, pixbuf, 0, 0)
         ctx.paint()
 
-        data = surface.get_data()
-        new_pixbuf = GdkPixbuf.Pixbuf.new_from_data(
-            data,
-            GdkPixbuf.Colorspace.RGB,
-            True,
-            8,
-            width,
-            height,
-            cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, width),
-        )
+        new_pixbuf = pixbuf_from_surface(surface)
 
         return new_pixbuf
     except Exception as e:
@@ -202,7 +169,7 @@ def adjust_brightness_contrast(pixbuf, brightness: float = 0.0, contrast: float
         has_alpha = pixbuf.get_has_alpha()
         n_channels = pixbuf.get_n_channels()
         rowstride = pixbuf.get_rowstride()
-        pixels = pixbuf.get_pixels()
+        pixels = pixel_bytes(pixbuf)
 
         new_pixels = array.array("B", pixels)
 
@@ -255,7 +222,7 @@ def invert_colors(pixbuf):
         has_alpha = pixbuf.get_has_alpha()
         n_channels = pixbuf.get_n_channels()
         rowstride = pixbuf.get_rowstride()
-        pixels = pixbuf.get_pixels()
+        pixels = pixel_bytes(pixbuf)
 
         new_pixels = array.array("B", pixels)
 
@@ -292,7 +259,7 @@ def grayscale(pixbuf):
         has_alpha = pixbuf.get_has_alpha()
         n_channels = pixbuf.get_n_channels()
         rowstride = pixbuf.get_rowstride()
-        pixels = pixbuf.get_pixels()
+        pixels = pixel_bytes(pixbuf)
 
         new_pixels = array.array("B", pixels)
 
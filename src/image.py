@@ -0,0 +1,377 @@
+"""Pixel buffers shared by GdkPixbuf, cairo and numpy for LikX."""
+
+import sys
+from typing import Any, Optional, Tuple
+
+try:
+    import gi
+
+    gi.require_version("GdkPixbuf", "2.0")
+    from gi.repository import GdkPixbuf, GLib
+
+    GTK_AVAILABLE = True
+except (ImportError, ValueError):
+    GTK_AVAILABLE = False
+
+from .pixels import pixel_bytes
+
+# Byte offsets of R, G, B and A inside one of cairo's native-endian ARGB32
+# pixels: B, G, R, A in memory on little-endian machines, A, R, G, B on
+# big-endian ones
+if sys.byteorder == "little":
+    ARGB32_ORDER = (2, 1, 0, 3)
+else:
+    ARGB32_ORDER = (1, 2, 3, 0)
+
+
+def _numpy() -> Any:
+    """Get numpy, or None if it isn't installed."""
+    try:
+        import numpy
+
+        return numpy
+    except ImportError:
+        return None
+
+
+def to_argb32(
+    data: Any, width: int, height: int, rowstride: int, n_channels: int
+) -> bytearray:
+    """Convert RGB or straight-alpha RGBA rows to cairo's ARGB32 layout.
+
+    Colour channels are premultiplied by alpha, as cairo expects. The
+    result is tightly packed (stride ``width * 4``, which is what cairo
+    uses for ARGB32 and RGB24).
+
+    Args:
+        data: Pixel rows, rowstride bytes apart.
+        width: Image width in pixels.
+        height: Image height in pixels.
+        rowstride: Bytes between the starts of two rows.
+        n_channels: 3 for RGB, 4 for RGBA.
+
+    Returns:
+        The converted pixels.
+    """
+    out = bytearray(width * height * 4)
+    np = _numpy()
+    if np is not None and width and height:
+        src = np.ndarray(
+            (height, width, n_channels),
+            dtype=np.uint8,
+            buffer=data,
+            strides=(rowstride, n_channels, 1),
+        )
+        dst = np.frombuffer(out, dtype=np.uint8).reshape(height, width, 4)
+        r, g, b, a = ARGB32_ORDER
+        if n_channels == 3:
+            dst[..., [r, g, b]] = src
+            dst[..., a] = 255
+        else:
+            alpha = src[..., 3:4].astype(np.uint16)
+            dst[..., [r, g, b]] = (src[..., :3] * alpha + 127) // 255
+            dst[..., a] = src[..., 3]
+        return out
+
+    _to_argb32_rows(memoryview(data), out, width, height, rowstride, n_channels)
+    return out
+
+
+def _to_argb32_rows(
+    src: memoryview, out: bytearray, width: int, height: int, rowstride: int, n: int
+) -> None:
+    """Pure-Python to_argb32: whole rows at once unless they're translucent."""
+    r, g, b, a = ARGB32_ORDER
+    opaque = b"\xff" * width
+    for y in range(height):
+        row = bytes(src[y * rowstride : y * rowstride + width * n])
+        start = y * width * 4
+        end = start + width * 4
+        alpha = row[3::4] if n == 4 else opaque
+        if alpha == opaque:
+            out[start + r : end : 4] = row[0::n]
+            out[start + g : end : 4] = row[1::n]
+            out[start + b : end : 4] = row[2::n]
+            out[start + a : end : 4] = opaque
+            continue
+        for x in range(width):
+            i = x * 4
+            alpha_x = row[i + 3]
+            out[start + i + r] = (row[i] * alpha_x + 127) // 255
+            out[start + i + g] = (row[i + 1] * alpha_x + 127) // 255
+            out[start + i + b] = (row[i + 2] * alpha_x + 127) // 255
+            out[start + i + a] = alpha_x
+
+
+def from_argb32(
+    data: Any, width: int, height: int, stride: int, has_alpha: bool = True
+) -> Tuple[bytes, int]:
+    """Convert cairo ARGB32/RGB24 pixels to tightly packed RGB or RGBA.
+
+    Premultiplied colour is divided back out. Images whose alpha is 255
+    everywhere (or RGB24 surfaces, has_alpha=False) come back as RGB,
+    a quarter smaller than RGBA.
+
+    Args:
+        data: Surface pixels, stride bytes apart.
+        width: Image width in pixels.
+        height: Image height in pixels.
+        stride: Bytes between the starts of two rows.
+        has_alpha: False for RGB24 surfaces, whose alpha byte is undefined.
+
+    Returns:
+        (pixels, n_channels) with n_channels 3 or 4.
+    """
+    np = _numpy()
+    if np is not None and width and height:
+        src = np.ndarray(
+            (height, width, 4), dtype=np.uint8, buffer=data, strides=(stride, 4, 1)
+        )
+        rgb = src[..., list(ARGB32_ORDER[:3])]
+        alpha = src[..., ARGB32_ORDER[3]]
+        if not has_alpha or alpha.min() == 255:
+            return rgb.tobytes(), 3
+
+        out = np.empty((height, width, 4), dtype=np.uint8)
+        a16 = alpha[..., None].astype(np.uint16)
+        straight = (rgb.astype(np.uint16) * 255 + a16 // 2) // np.maximum(a16, 1)
+        out[..., :3] = np.where(a16 > 0, np.minimum(straight, 255), 0)
+        out[..., 3] = alpha
+        return out.tobytes(), 4
+
+    return _from_argb32_rows(memoryview(data), width, height, stride, has_alpha)
+
+
+def _from_argb32_rows(
+    src: memoryview, width: int, height: int, stride: int, has_alpha: bool
+) -> Tuple[bytes, int]:
+    """Pure-Python from_argb32."""
+    r, g, b, a = ARGB32_ORDER
+    rows = [bytes(src[y * stride : y * stride + width * 4]) for y in range(height)]
+    opaque = b"\xff" * width
+    n = 4 if has_alpha and any(row[a::4] != opaque for row in rows) else 3
+
+    out = bytearray(width * height * n)
+    for y, row in enumerate(rows):
+        start = y * width * n
+        end = start + width * n
+        if n == 3 or row[a::4] == opaque:
+            out[start:end:n] = row[r::4]
+            out[start + 1 : end : n] = row[g::4]
+            out[start + 2 : end : n] = row[b::4]
+            if n == 4:
+                out[start + 3 : end : n] = opaque
+            continue
+        for x in range(width):
+            i = x * 4
+            o = start + x * 4
+            alpha = row[i + a]
+            if alpha:
+                half = alpha // 2
+                out[o] = min(255, (row[i + r] * 255 + half) // alpha)
+                out[o + 1] = min(255, (row[i + g] * 255 + half) // alpha)
+                out[o + 2] = min(255, (row[i + b] * 255 + half) // alpha)
+            out[o + 3] = alpha
+    return bytes(out), n
+
+
+def _drop_opaque_alpha(
+    data: Any, width: int, height: int, rowstride: int
+) -> Optional[bytes]:
+    """Get RGBA rows as packed RGB if every pixel is opaque, else None."""
+    np = _numpy()
+    if np is not None and width and height:
+        src = np.ndarray(
+            (height, width, 4), dtype=np.uint8, buffer=data, strides=(rowstride, 4, 1)
+        )
+        if src[..., 3].min() != 255:
+            return None
+        return src[..., :3].tobytes()
+
+    src = memoryview(data)
+    opaque = b"\xff" * width
+    out = bytearray(width * height * 3)
+    for y in range(height):
+        row = bytes(src[y * rowstride : y * rowstride + width * 4])
+        if row[3::4] != opaque:
+            return None
+        start = y * width * 3
+        end = start + width * 3
+        out[start:end:3] = row[0::4]
+        out[start + 1 : end : 3] = row[1::4]
+        out[start + 2 : end : 3] = row[2::4]
+    return bytes(out)
+
+
+class LikxImage:
+    """An 8-bit RGB or RGBA image that owns its pixel memory.
+
+    Pixels are stored with straight (not premultiplied) alpha in GdkPixbuf
+    channel order. Opaque images are kept as RGB, which is a quarter
+    smaller than RGBA. :meth:`pixbuf`, :meth:`surface` and :meth:`array`
+    convert on first use and cache the result, so code that moves an
+    image between GTK, cairo and numpy pays for each conversion once.
+
+    The pixels are immutable; build a new LikxImage for edited pixels.
+    """
+
+    __slots__ = (
+        "width",
+        "height",
+        "n_channels",
+        "rowstride",
+        "data",
+        "_pixbuf",
+        "_surface",
+        "_array",
+    )
+
+    def __init__(
+        self,
+        data: bytes,
+        width: int,
+        height: int,
+        n_channels: int,
+        rowstride: Optional[int] = None,
+    ):
+        """Wrap pixel rows.
+
+        Args:
+            data: RGB or straight-alpha RGBA rows.
+            width: Image width in pixels.
+            height: Image height in pixels.
+            n_channels: 3 (RGB) or 4 (RGBA).
+            rowstride: Bytes between rows (default: tightly packed).
+        """
+        if n_channels not in (3, 4):
+            raise ValueError("n_channels must be 3 or 4")
+        self.width = width
+        self.height = height
+        self.n_channels = n_channels
+        self.rowstride = rowstride or width * n_channels
+        self.data = data
+        self._pixbuf: Any = None
+        self._surface: Any = None
+        self._array: Any = None
+
+    @property
+    def has_alpha(self) -> bool:
+        """Whether the pixels carry an alpha channel."""
+        return self.n_channels == 4
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the pixel data in bytes."""
+        return len(self.data)
+
+    @classmethod
+    def from_pixbuf(cls, pixbuf: Any) -> "LikxImage":
+        """Copy a pixbuf's pixels, dropping alpha if it is opaque everywhere.
+
+        When the pixels are kept as they are, the pixbuf itself is reused
+        for :meth:`pixbuf`.
+        """
+        width = pixbuf.get_width()
+        height = pixbuf.get_height()
+        rowstride = pixbuf.get_rowstride()
+        n_channels = pixbuf.get_n_channels()
+        data = pixel_bytes(pixbuf)
+
+        if n_channels == 4:
+            rgb = _drop_opaque_alpha(data, width, height, rowstride)
+            if rgb is not None:
+                return cls(rgb, width, height, 3)
+
+        image = cls(data, width, height, n_channels, rowstride)
+        image._pixbuf = pixbuf
+        return image
+
+    @classmethod
+    def from_surface(cls, surface: Any) -> "LikxImage":
+        """Copy a cairo ARGB32 or RGB24 image surface's pixels."""
+        import cairo
+
+        surface.flush()
+        data, n_channels = from_argb32(
+            surface.get_data(),
+            surface.get_width(),
+            surface.get_height(),
+            surface.get_stride(),
+            has_alpha=surface.get_format() != cairo.FORMAT_RGB24,
+        )
+        return cls(data, surface.get_width(), surface.get_height(), n_channels)
+
+    @classmethod
+    def from_array(cls, array: Any) -> "LikxImage":
+        """Copy a (height, width, 3 or 4) uint8 numpy array."""
+        height, width, n_channels = array.shape
+        data = array.astype("uint8", copy=False).tobytes()
+        return cls(data, width, height, n_channels)
+
+    def pixbuf(self) -> Any:
+        """Get a GdkPixbuf of the image (shares the pixel data)."""
+        if self._pixbuf is None:
+            self._pixbuf = GdkPixbuf.Pixbuf.new_from_bytes(
+                GLib.Bytes.new(self.data),
+                GdkPixbuf.Colorspace.RGB,
+                self.has_alpha,
+                8,
+                self.width,
+                self.height,
+                self.rowstride,
+            )
+        return self._pixbuf
+
+    def surface(self) -> Any:
+        """Get a cairo image surface of the image.
+
+        RGB images become RGB24 surfaces, RGBA images premultiplied ARGB32
+        ones. Callers must not draw on the surface: it is cached.
+        """
+        if self._surface is None:
+            import cairo
+
+            fmt = cairo.FORMAT_ARGB32 if self.has_alpha else cairo.FORMAT_RGB24
+            self._surface = cairo.ImageSurface.create_for_data(
+                self.argb32(), fmt, self.width, self.height, self.width * 4
+            )
+        return self._surface
+
+    def argb32(self) -> bytearray:
+        """Get the pixels in cairo's premultiplied ARGB32 layout (a new copy)."""
+        return to_argb32(
+            self.data, self.width, self.height, self.rowstride, self.n_channels
+        )
+
+    def array(self) -> Any:
+        """Get a read-only (height, width, channels) uint8 numpy view.
+
+        Requires numpy.
+        """
+        if self._array is None:
+            import numpy as np
+
+            self._array = np.ndarray(
+                (self.height, self.width, self.n_channels),
+                dtype=np.uint8,
+                buffer=self.data,
+                strides=(self.rowstride, self.n_channels, 1),
+            )
+        return self._array
+
+
+def pixbuf_from_surface(surface: Any) -> Any:
+    """Convert a cairo image surface to a GdkPixbuf with straight alpha."""
+    return LikxImage.from_surface(surface).pixbuf()
+
+
+def compact_pixbuf(pixbuf: Any) -> Any:
+    """Get an RGB copy of an RGBA pixbuf that is opaque everywhere.
+
+    Screenshots loaded from PNG files often carry an alpha channel that is
+    255 throughout; dropping it saves a quarter of the image's memory.
+    Other pixbufs are returned unchanged.
+    """
+    if pixbuf.get_n_channels() != 4:
+        return pixbuf
+    return LikxImage.from_pixbuf(pixbuf).pixbuf()
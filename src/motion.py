@@ -0,0 +1,45 @@
+"""Pointer motion batching for the LikX editor canvas."""
+
+from typing import Any, List, Tuple
+
+# (x, y, modifier state) in image coordinates
+MotionEvent = Tuple[float, float, Any]
+
+
+class MotionQueue:
+    """Pointer motion gathered between frames.
+
+    High-rate mice deliver far more motion events than the screen can
+    show. The canvas pushes each event here and drains the queue once per
+    frame (from a frame-clock tick), so selection drags, marquees and
+    previews update once per refresh. Freehand strokes take every queued
+    sample so no input is lost; everything else only needs the latest
+    position.
+    """
+
+    def __init__(self):
+        self._events: List[MotionEvent] = []
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def push(self, x: float, y: float, state: Any = 0) -> None:
+        """Queue a motion event."""
+        self._events.append((x, y, state))
+
+    def take(self, keep_all: bool = False) -> List[MotionEvent]:
+        """Remove and return the queued events.
+
+        Args:
+            keep_all: Return every event in order rather than just the
+                latest one.
+        """
+        events = self._events
+        self._events = []
+        if keep_all or not events:
+            return events
+        return events[-1:]
+
+    def clear(self) -> None:
+        """Drop queued events (e.g. when the canvas changes)."""
+        self._events = []
@@ -71,11 +71,17 @@ def show_notification(
     return False
 
 
-def show_screenshot_saved(filepath: str) -> None:
-    """Show notification that screenshot was saved."""
-    show_notification(
-        _("Screenshot Saved"), _("Saved to") + f" {filepath}", icon="document-save"
-    )
+def show_screenshot_saved(filepath: str, saved_bytes: int = 0) -> None:
+    """Show notification that screenshot was saved.
+
+    Args:
+        filepath: Where the screenshot was written.
+        saved_bytes: Bytes the PNG optimizer saved, mentioned if any.
+    """
+    message = _("Saved to") + f" {filepath}"
+    if saved_bytes > 0:
+        message += " " + _("({} KB smaller)").format(max(1, saved_bytes // 1024))
+    show_notification(_("Screenshot Saved"), message, icon="document-save")
 
 
 def show_screenshot_copied() -> None:
@@ -0,0 +1,160 @@
+"""Shared read access to pixbuf pixels for LikX."""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+# Pixbufs whose pixel data is kept for repeated reads
+MAX_VIEWS = 3
+
+
+def pixel_bytes(pixbuf: Any) -> bytes:
+    """Get a pixbuf's pixel data (rows rowstride apart) with a single copy.
+
+    ``read_pixel_bytes`` hands out the pixbuf's own buffer, where
+    ``get_pixels`` first makes read-only pixbufs (e.g. loaded from files)
+    mutable and so copies the image twice.
+    """
+    read = getattr(pixbuf, "read_pixel_bytes", None)
+    if read is not None:
+        return read().get_data()
+    return pixbuf.get_pixels()
+
+
+class PixelView:
+    """Read-only pixel access to one pixbuf.
+
+    The pixel data is fetched once and shared by every read, so picking a
+    colour or reading a region costs O(1) or O(region) instead of a copy
+    of the whole image per call. Use :func:`pixel_view` to get the cached
+    view of a pixbuf.
+    """
+
+    __slots__ = (
+        "pixbuf",
+        "generation",
+        "width",
+        "height",
+        "rowstride",
+        "n_channels",
+        "data",
+        "_array",
+    )
+
+    def __init__(self, pixbuf: Any, generation: int = 0):
+        """Read the pixels of pixbuf.
+
+        Args:
+            pixbuf: A GdkPixbuf (8 bits per sample).
+            generation: Image generation the pixels were read at.
+        """
+        self.pixbuf = pixbuf
+        self.generation = generation
+        self.width = pixbuf.get_width()
+        self.height = pixbuf.get_height()
+        self.rowstride = pixbuf.get_rowstride()
+        self.n_channels = pixbuf.get_n_channels()
+        self.data = memoryview(pixel_bytes(pixbuf))
+        self._array: Any = None
+
+    def contains(self, x: int, y: int) -> bool:
+        """Check whether (x, y) is a pixel of the image."""
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def pixel(self, x: int, y: int) -> Tuple[int, ...]:
+        """Get the channel values (0-255) of the pixel at (x, y)."""
+        if not self.contains(x, y):
+            raise IndexError("pixel outside the image")
+        offset = y * self.rowstride + x * self.n_channels
+        return tuple(self.data[offset : offset + self.n_channels])
+
+    def average(
+        self, x: int, y: int, size: int = 1
+    ) -> Optional[Tuple[float, float, float]]:
+        """Get the mean RGB (0-255) of a size x size square centred on (x, y).
+
+        The square is clipped to the image.
+
+        Returns:
+            The mean colour, or None if (x, y) is outside the image.
+        """
+        if not self.contains(x, y):
+            return None
+        half = max(1, size) // 2
+        x1, x2 = max(0, x - half), min(self.width, x + half + 1)
+        y1, y2 = max(0, y - half), min(self.height, y + half + 1)
+
+        n = self.n_channels
+        sums = [0, 0, 0]
+        for row in range(y1, y2):
+            start = row * self.rowstride
+            line = self.data[start + x1 * n : start + x2 * n]
+            sums[0] += sum(line[0::n])
+            sums[1] += sum(line[1::n])
+            sums[2] += sum(line[2::n])
+        count = (x2 - x1) * (y2 - y1)
+        return (sums[0] / count, sums[1] / count, sums[2] / count)
+
+    def array(self) -> Any:
+        """Get a (height, width, channels) uint8 numpy view of the pixels.
+
+        The view follows the rowstride and shares the data, so nothing is
+        copied. Requires numpy.
+        """
+        if self._array is None:
+            import numpy as np
+
+            self._array = np.ndarray(
+                shape=(self.height, self.width, self.n_channels),
+                dtype=np.uint8,
+                buffer=self.data,
+                strides=(self.rowstride, self.n_channels, 1),
+            )
+        return self._array
+
+
+_views: "OrderedDict[int, PixelView]" = OrderedDict()
+# Exports may read pixels off the GTK thread
+_views_lock = threading.Lock()
+
+
+def pixel_view(pixbuf: Any, generation: Optional[int] = None) -> PixelView:
+    """Get the shared PixelView of a pixbuf.
+
+    Each pixbuf has at most one view. Callers that track the image's
+    generation (bumped whenever the editor changes the image) pass it,
+    and a view read at another generation is read again; None takes the
+    cached view as it is. The last few views are kept (they hold a
+    reference, so ids can't be reused); :func:`release_views` drops the
+    view of an image that has been replaced.
+    """
+    key = id(pixbuf)
+    with _views_lock:
+        view = _views.get(key)
+        if (
+            view is None
+            or view.pixbuf is not pixbuf
+            or (generation is not None and view.generation != generation)
+        ):
+            view = PixelView(pixbuf, generation or 0)
+            _views[key] = view
+            _views.move_to_end(key)
+            while len(_views) > MAX_VIEWS:
+                _views.popitem(last=False)
+        else:
+            _views.move_to_end(key)
+        return view
+
+
+def release_views(pixbuf: Any) -> None:
+    """Drop the cached view of pixbuf, freeing its copy of the pixels."""
+    with _views_lock:
+        view = _views.get(id(pixbuf))
+        if view is not None and view.pixbuf is pixbuf:
+            del _views[id(pixbuf)]
+
+
+def clear_views() -> None:
+    """Drop every cached view."""
+    with _views_lock:
+        _views.clear()
@@ -0,0 +1,271 @@
+"""Screenshot-aware PNG encoding for LikX.
+
+GdkPixbuf writes every image as 8-bit truecolour PNG at one compression
+setting. Screenshots are mostly flat UI colours: many use a few dozen
+distinct colours and are fully opaque, so an indexed PNG (1-8 bits per
+pixel) or dropping the alpha channel makes them much smaller. This
+encoder picks the smallest colour type for the pixels and a filter and
+zlib setup for the user's speed/size preset.
+"""
+
+import struct
+import zlib
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from .image import LikxImage
+
+# Largest palette a PNG can hold
+MAX_PALETTE = 256
+# Every nth pixel is checked first, so images with many colours are
+# rejected for a palette without counting all of them
+COLOR_SAMPLE_STEP = 16
+# Rows filtered at a time (bounds the temporaries for tall captures)
+FILTER_ROWS = 256
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG colour types
+COLOR_RGB = 2
+COLOR_INDEXED = 3
+COLOR_RGBA = 6
+
+
+class PngPreset(NamedTuple):
+    """How hard to work on a PNG.
+
+    ``filters`` lists the PNG row filters to try for truecolour images:
+    one is used for every row, several are chosen between per row by the
+    usual minimum-sum-of-absolute-differences heuristic. Indexed images
+    are always unfiltered, as the PNG specification recommends.
+    """
+
+    level: int
+    strategy: int
+    filters: Tuple[int, ...]
+
+
+PRESETS: Dict[str, PngPreset] = {
+    # Sub turns flat runs into zeros, which run-length coding packs fast
+    "fast": PngPreset(1, zlib.Z_RLE, (1,)),
+    "balanced": PngPreset(6, zlib.Z_DEFAULT_STRATEGY, (1, 2)),
+    "small": PngPreset(9, zlib.Z_DEFAULT_STRATEGY, (0, 1, 2, 3, 4)),
+}
+DEFAULT_PRESET = "balanced"
+
+
+class OptimizedPng(NamedTuple):
+    """Result of :func:`optimize_png`."""
+
+    data: bytes
+    saved: int  # Bytes smaller than the GdkPixbuf encoding
+    colors: Optional[int]  # Palette size, or None for truecolour
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+
+        return numpy
+    except ImportError:
+        return None
+
+
+def configured_preset(cfg: Dict[str, Any]) -> Optional[str]:
+    """Get the preset automatic saves should optimize with, or None if off."""
+    if not cfg.get("png_optimize", False):
+        return None
+    preset = cfg.get("png_preset", DEFAULT_PRESET)
+    return preset if preset in PRESETS else DEFAULT_PRESET
+
+
+def _chunk(tag: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + tag
+        + data
+        + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    )
+
+
+def _palette(pixels: Any) -> Optional[Tuple[Any, Any]]:
+    """Get (indices, entries) if pixels use at most MAX_PALETTE colours.
+
+    Colours are packed with alpha in the top byte, so the sorted palette
+    lists translucent entries first and the tRNS chunk stays short.
+    """
+    np = _numpy()
+    height, width, channels = pixels.shape
+    wide = pixels.astype(np.uint32)
+    packed = (wide[..., 0] << 16) | (wide[..., 1] << 8) | wide[..., 2]
+    if channels == 4:
+        packed |= wide[..., 3] << 24
+
+    if np.unique(packed.ravel()[::COLOR_SAMPLE_STEP]).size > MAX_PALETTE:
+        return None
+    colors, inverse = np.unique(packed, return_inverse=True)
+    if colors.size > MAX_PALETTE:
+        return None
+
+    shifts = (16, 8, 0, 24)[:channels]
+    entries = np.stack([(colors >> s) & 0xFF for s in shifts], axis=1)
+    return inverse.reshape(height, width).astype(np.uint8), entries.astype(np.uint8)
+
+
+def _bit_depth(colors: int) -> int:
+    for depth in (1, 2, 4):
+        if colors <= 1 << depth:
+            return depth
+    return 8
+
+
+def _pack_indices(indices: Any, depth: int) -> Any:
+    """Pack palette indices into rows of depth-bit samples, high bits first."""
+    np = _numpy()
+    if depth == 8:
+        return indices
+    per_byte = 8 // depth
+    height, width = indices.shape
+    pad = -width % per_byte
+    if pad:
+        indices = np.pad(indices, ((0, 0), (0, pad)))
+    groups = indices.reshape(height, -1, per_byte)
+    packed = np.zeros(groups.shape[:2], dtype=np.uint8)
+    for k in range(per_byte):
+        packed |= groups[..., k] << (8 - depth * (k + 1))
+    return packed
+
+
+def _filter_rows(rows: Any, prior: Any, bpp: int, filters: Tuple[int, ...]) -> Any:
+    """Apply PNG row filters, returning rows prefixed by their filter type.
+
+    Args:
+        rows: (n, stride) uint8 scanlines.
+        prior: The scanline above rows[0] (zeros for the first one).
+        bpp: Bytes per complete pixel (at least 1).
+        filters: Candidate filter types (see PngPreset).
+    """
+    np = _numpy()
+    up = np.vstack((prior[None], rows[:-1]))
+    left = np.zeros_like(rows)
+    left[:, bpp:] = rows[:, :-bpp]
+
+    def filtered(kind: int) -> Any:
+        if kind == 0:
+            return rows
+        if kind == 1:
+            return rows - left
+        if kind == 2:
+            return rows - up
+        if kind == 3:
+            return rows - ((left.astype(np.uint16) + up) >> 1).astype(np.uint8)
+        upleft = np.zeros_like(rows)
+        upleft[:, bpp:] = up[:, :-bpp]
+        a = left.astype(np.int16)
+        b = up.astype(np.int16)
+        c = upleft.astype(np.int16)
+        pa = np.abs(b - c)
+        pb = np.abs(a - c)
+        pc = np.abs(a + b - 2 * c)
+        predictor = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+        return rows - predictor.astype(np.uint8)
+
+    out = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    if len(filters) == 1:
+        out[:, 0] = filters[0]
+        out[:, 1:] = filtered(filters[0])
+        return out
+
+    best_score = None
+    for kind in filters:
+        candidate = filtered(kind)
+        # Bytes read as signed: small magnitudes compress best
+        score = np.abs(candidate.view(np.int8).astype(np.int32)).sum(axis=1)
+        if best_score is None:
+            best_score = score
+            out[:, 0] = kind
+            out[:, 1:] = candidate
+            continue
+        better = score < best_score
+        best_score = np.where(better, score, best_score)
+        out[better, 0] = kind
+        out[better, 1:] = candidate[better]
+    return out
+
+
+def encode_png(pixels: Any, preset: PngPreset) -> Tuple[bytes, Optional[int]]:
+    """Encode pixels as the smallest PNG colour type that holds them.
+
+    Requires numpy.
+
+    Args:
+        pixels: (height, width, 3 or 4) uint8 array, straight alpha.
+        preset: Filter and compression settings.
+
+    Returns:
+        (png file data, palette size or None for truecolour).
+    """
+    np = _numpy()
+    height, width, channels = pixels.shape
+    chunks = []
+    palette = _palette(pixels)
+    if palette is not None:
+        indices, entries = palette
+        depth = _bit_depth(len(entries))
+        rows = _pack_indices(indices, depth)
+        color_type, bpp, filters = COLOR_INDEXED, 1, (0,)
+        chunks.append(_chunk(b"PLTE", entries[:, :3].tobytes()))
+        if channels == 4:
+            translucent = int(np.count_nonzero(entries[:, 3] < 255))
+            if translucent:
+                chunks.append(_chunk(b"tRNS", entries[:translucent, 3].tobytes()))
+    else:
+        depth = 8
+        rows = np.ascontiguousarray(pixels).reshape(height, width * channels)
+        color_type = COLOR_RGB if channels == 3 else COLOR_RGBA
+        bpp, filters = channels, preset.filters
+
+    compressor = zlib.compressobj(
+        preset.level, zlib.DEFLATED, zlib.MAX_WBITS, 9, preset.strategy
+    )
+    idat = []
+    prior = np.zeros(rows.shape[1], dtype=np.uint8)
+    for start in range(0, height, FILTER_ROWS):
+        block = rows[start : start + FILTER_ROWS]
+        idat.append(compressor.compress(_filter_rows(block, prior, bpp, filters)))
+        prior = block[-1]
+    idat.append(compressor.flush())
+
+    header = struct.pack(">IIBBBBB", width, height, depth, color_type, 0, 0, 0)
+    data = b"".join(
+        [PNG_SIGNATURE, _chunk(b"IHDR", header)]
+        + chunks
+        + [_chunk(b"IDAT", b"".join(idat)), _chunk(b"IEND", b"")]
+    )
+    return data, (len(palette[1]) if palette is not None else None)
+
+
+def optimize_png(
+    pixbuf: Any, baseline: bytes, preset: str = DEFAULT_PRESET
+) -> OptimizedPng:
+    """Re-encode a pixbuf if that beats GdkPixbuf's PNG.
+
+    Opaque RGBA pixbufs lose their alpha channel (see LikxImage), images
+    with few colours become indexed. The result is never larger than
+    baseline; without numpy baseline is returned as it is.
+
+    Args:
+        pixbuf: Image to encode.
+        baseline: The pixbuf as encoded by GdkPixbuf.
+        preset: Key of PRESETS.
+
+    Returns:
+        The smaller encoding and how many bytes it saved.
+    """
+    if _numpy() is None or pixbuf.get_width() == 0 or pixbuf.get_height() == 0:
+        return OptimizedPng(baseline, 0, None)
+
+    pixels = LikxImage.from_pixbuf(pixbuf).array()
+    data, colors = encode_png(pixels, PRESETS.get(preset, PRESETS[DEFAULT_PRESET]))
+    if len(data) >= len(baseline):
+        return OptimizedPng(baseline, 0, colors)
+    return OptimizedPng(data, len(baseline) - len(data), colors)
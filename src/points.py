@@ -0,0 +1,361 @@
+"""Compact point storage for LikX annotations."""
+
+import math
+from array import array
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+# 2D affine matrix in cairo order (xx, yx, xy, yy, x0, y0):
+# x' = xx * x + xy * y + x0, y' = yx * x + yy * y + y0
+Matrix = Tuple[float, float, float, float, float, float]
+
+
+def multiply(first: Matrix, then: Matrix) -> Matrix:
+    """Get the matrix applying first and then then."""
+    a1, b1, c1, d1, e1, f1 = first
+    a2, b2, c2, d2, e2, f2 = then
+    return (
+        a2 * a1 + c2 * b1,
+        b2 * a1 + d2 * b1,
+        a2 * c1 + c2 * d1,
+        b2 * c1 + d2 * d1,
+        a2 * e1 + c2 * f1 + e2,
+        b2 * e1 + d2 * f1 + f2,
+    )
+
+
+class PointRef:
+    """Live view of one point inside a PointArray.
+
+    Reading or assigning x and y goes straight to the array, so code that
+    edits points in place (``p.x += dx``) keeps working without a Python
+    object being stored per sample.
+    """
+
+    __slots__ = ("_owner", "_offset")
+
+    def __init__(self, owner: "PointArray", index: int):
+        self._owner = owner
+        self._offset = index * 2
+
+    @property
+    def x(self) -> float:
+        return self._owner.baked()[self._offset]
+
+    @x.setter
+    def x(self, value: float) -> None:
+        self._owner.data[self._offset] = value
+
+    @property
+    def y(self) -> float:
+        return self._owner.baked()[self._offset + 1]
+
+    @y.setter
+    def y(self, value: float) -> None:
+        self._owner.data[self._offset + 1] = value
+
+    def __eq__(self, other: Any) -> bool:
+        if not (hasattr(other, "x") and hasattr(other, "y")):
+            return NotImplemented
+        return self.x == other.x and self.y == other.y
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Point(x={self.x!r}, y={self.y!r})"
+
+
+class PointArray:
+    """A sequence of points stored as interleaved doubles (x0, y0, x1, ...).
+
+    A list of Point dataclasses costs a list slot, an instance and two
+    float objects per sample; here a sample is 16 bytes in one buffer, and
+    copying a stroke for undo is a single buffer copy. Indexing and
+    iteration return PointRef views so existing Point-style code works,
+    while renderers and transforms use :meth:`coords` and the bulk
+    helpers to avoid per-point objects altogether.
+
+    :meth:`translate`, :meth:`scale` and :meth:`rotate` don't touch the
+    samples: they fold into a pending affine matrix, so moving a long
+    stroke is O(1). The matrix is baked into the samples the first time
+    they are read (:attr:`data`, indexing, iteration); renderers that can
+    apply it themselves use :meth:`raw` instead. :meth:`bounds` doesn't
+    bake either: it transforms the cached raw bounds while the matrix
+    keeps axes aligned, and otherwise the cached convex hull of the raw
+    samples, whose extremes are those of the whole stroke.
+    """
+
+    __slots__ = ("_data", "_matrix", "_raw_bounds", "_hull")
+
+    def __init__(self, points: Iterable[Any] = ()):
+        """Initialize from objects with x and y attributes.
+
+        Args:
+            points: Points (or PointRefs) to copy in.
+        """
+        self._data = array("d")
+        self._matrix: Optional[Matrix] = None
+        self._raw_bounds: Optional[Tuple[float, float, float, float]] = None
+        self._hull: Optional[array] = None
+        for point in points:
+            self._data.append(point.x)
+            self._data.append(point.y)
+
+    @classmethod
+    def from_coords(cls, coords: Iterable[float]) -> "PointArray":
+        """Build from a flat x0, y0, x1, y1, ... sequence."""
+        points = cls()
+        points._data.extend(coords)
+        if len(points._data) % 2:
+            raise ValueError("coordinate sequence has odd length")
+        return points
+
+    @property
+    def data(self) -> array:
+        """The coordinate buffer, with any pending transform applied.
+
+        Callers may write to it; cached bounds are dropped.
+        """
+        if self._matrix is not None:
+            self._bake()
+        self._raw_bounds = None
+        self._hull = None
+        return self._data
+
+    @property
+    def matrix(self) -> Optional[Matrix]:
+        """The pending transform, or None for identity."""
+        return self._matrix
+
+    def baked(self) -> array:
+        """Get the coordinate buffer with any pending transform applied.
+
+        Unlike :attr:`data` the buffer must not be written to.
+        """
+        if self._matrix is not None:
+            self._bake()
+        return self._data
+
+    def raw(self) -> Tuple[array, Optional[Matrix]]:
+        """Get the untransformed buffer and the pending matrix (read only)."""
+        return self._data, self._matrix
+
+    def _bake(self) -> None:
+        xx, yx, xy, yy, x0, y0 = self._matrix
+        data = self._data
+        for i in range(0, len(data), 2):
+            x, y = data[i], data[i + 1]
+            data[i] = xx * x + xy * y + x0
+            data[i + 1] = yx * x + yy * y + y0
+        self._matrix = None
+        self._raw_bounds = None
+        self._hull = None
+
+    def __len__(self) -> int:
+        return len(self._data) // 2
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            indices = range(len(self))[index]
+            if indices.step == 1:
+                data = self.baked()
+                return self.from_coords(data[indices.start * 2 : indices.stop * 2])
+            return PointArray(self[i] for i in indices)
+        return PointRef(self, self._check_index(index))
+
+    def __setitem__(self, index: int, point: Any) -> None:
+        offset = self._check_index(index) * 2
+        data = self.data
+        data[offset] = point.x
+        data[offset + 1] = point.y
+
+    def __iter__(self) -> Iterator[PointRef]:
+        for i in range(len(self)):
+            yield PointRef(self, i)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, PointArray):
+            return self.baked() == other.baked()
+        if isinstance(other, (list, tuple)):
+            return len(other) == len(self) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"PointArray([{', '.join(repr(p) for p in self)}])"
+
+    def __copy__(self) -> "PointArray":
+        clone = self.from_coords(self._data)
+        clone._matrix = self._matrix
+        clone._raw_bounds = self._raw_bounds
+        clone._hull = self._hull
+        return clone
+
+    def __deepcopy__(self, memo: dict) -> "PointArray":
+        return self.__copy__()
+
+    def _check_index(self, index: int) -> int:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("point index out of range")
+        return index
+
+    def append(self, point: Any) -> None:
+        """Add a point (anything with x and y) at the end."""
+        data = self.data
+        data.append(point.x)
+        data.append(point.y)
+
+    def extend(self, points: Iterable[Any]) -> None:
+        """Add several points at the end."""
+        for point in points:
+            self.append(point)
+
+    def coords(self) -> Iterator[Tuple[float, float]]:
+        """Iterate over (x, y) tuples without creating PointRefs."""
+        it = iter(self.baked())
+        return zip(it, it)
+
+    def bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        """Get (min_x, min_y, max_x, max_y), or None if empty."""
+        if not self._data:
+            return None
+        if self._raw_bounds is None:
+            xs = self._data[0::2]
+            ys = self._data[1::2]
+            self._raw_bounds = (min(xs), min(ys), max(xs), max(ys))
+        matrix = self._matrix
+        if matrix is None:
+            return self._raw_bounds
+
+        xx, yx, xy, yy, x0, y0 = matrix
+        if yx or xy:
+            # Rotated - the corners of the raw bounds would be too loose
+            it = iter(self._convex_hull())
+            corners = list(zip(it, it))
+        else:
+            x1, y1, x2, y2 = self._raw_bounds
+            corners = [(x1, y1), (x2, y2)]
+        xs = [xx * x + xy * y + x0 for x, y in corners]
+        ys = [yx * x + yy * y + y0 for x, y in corners]
+        return (min(xs), min(ys), max(xs), max(ys))
+
+    def _convex_hull(self) -> array:
+        """Get the convex hull of the raw samples (cached, interleaved).
+
+        An affine transform keeps hull vertices on the hull, so the bounds
+        of a transformed stroke are the bounds of its transformed hull.
+        """
+        if self._hull is None:
+            it = iter(self._data)
+            samples = sorted(set(zip(it, it)))
+
+            def half(points: Iterable[Tuple[float, float]]) -> list:
+                chain: list = []
+                for p in points:
+                    while len(chain) >= 2:
+                        (ax, ay), (bx, by) = chain[-2], chain[-1]
+                        if (bx - ax) * (p[1] - ay) - (by - ay) * (p[0] - ax) > 0:
+                            break
+                        chain.pop()
+                    chain.append(p)
+                return chain
+
+            if len(samples) > 2:
+                samples = half(samples)[:-1] + half(reversed(samples))[:-1]
+            self._hull = array("d", [v for point in samples for v in point])
+        return self._hull
+
+    def nbytes(self) -> int:
+        """Get the size of the coordinate buffer in bytes."""
+        return len(self._data) * self._data.itemsize
+
+    def transform(self, matrix: Matrix) -> None:
+        """Apply an affine matrix after any pending one (O(1))."""
+        if self._matrix is None:
+            self._matrix = matrix
+        else:
+            self._matrix = multiply(self._matrix, matrix)
+
+    def translate(self, dx: float, dy: float) -> None:
+        """Move every point by (dx, dy)."""
+        self.transform((1.0, 0.0, 0.0, 1.0, dx, dy))
+
+    def scale(self, cx: float, cy: float, sx: float, sy: float) -> None:
+        """Scale every point about (cx, cy); negative factors mirror."""
+        self.transform((sx, 0.0, 0.0, sy, cx - cx * sx, cy - cy * sy))
+
+    def rotate(self, cx: float, cy: float, angle: float) -> None:
+        """Rotate every point about (cx, cy) by angle radians."""
+        cos_a = math.cos(angle)
+        sin_a = math.sin(angle)
+        self.transform(
+            (
+                cos_a,
+                sin_a,
+                -sin_a,
+                cos_a,
+                cx - cx * cos_a + cy * sin_a,
+                cy - cx * sin_a - cy * cos_a,
+            )
+        )
+
+
+def simplify(points: PointArray, tolerance: float) -> PointArray:
+    """Simplify a polyline with the Ramer-Douglas-Peucker algorithm.
+
+    Drops every point that lies within tolerance of the chord between the
+    points kept on either side of it, so near-collinear runs of input
+    samples collapse to their end points. The first and last points are
+    always kept.
+
+    Args:
+        points: Polyline to simplify.
+        tolerance: Maximum distance a dropped point may be from the result.
+
+    Returns:
+        A new PointArray (a copy if nothing could be dropped).
+    """
+    count = len(points)
+    if count < 3 or tolerance <= 0:
+        return PointArray.from_coords(points.baked())
+
+    data = points.baked()
+    keep = bytearray(count)
+    keep[0] = keep[-1] = 1
+    tolerance_sq = tolerance * tolerance
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = data[first * 2], data[first * 2 + 1]
+        x2, y2 = data[last * 2], data[last * 2 + 1]
+        dx, dy = x2 - x1, y2 - y1
+        length_sq = dx * dx + dy * dy
+
+        farthest, farthest_sq = -1, tolerance_sq
+        for i in range(first + 1, last):
+            px, py = data[i * 2] - x1, data[i * 2 + 1] - y1
+            if length_sq == 0:
+                dist_sq = px * px + py * py
+            else:
+                # Distance to the chord segment, not the infinite line, so
+                # strokes that double back are kept
+                t = max(0.0, min(1.0, (px * dx + py * dy) / length_sq))
+                ex, ey = px - t * dx, py - t * dy
+                dist_sq = ex * ex + ey * ey
+            if dist_sq > farthest_sq:
+                farthest, farthest_sq = i, dist_sq
+
+        if farthest >= 0:
+            keep[farthest] = 1
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    return PointArray.from_coords(
+        coord
+        for i in range(count)
+        if keep[i]
+        for coord in (data[i * 2], data[i * 2 + 1])
+    )
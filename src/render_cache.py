@@ -0,0 +1,78 @@
+"""Byte-budgeted LRU cache for rendered rasters in LikX."""
+
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+# Default budget for cached rasters (blurred/pixelated regions etc.)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class RenderCache:
+    """LRU cache of rendered rasters bounded by a total byte budget.
+
+    Entries are evicted least-recently-used first once the sum of their
+    reported sizes exceeds ``max_bytes``. ``generation`` is bumped by
+    :meth:`invalidate`, so callers can fold it into their keys to tell
+    rasters made from a replaced base image apart.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Maximum total size of cached values in bytes.
+        """
+        self.max_bytes = max_bytes
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    @property
+    def total_bytes(self) -> int:
+        """Total size of all cached values in bytes."""
+        return self._bytes
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value for key and mark it most recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, nbytes: int) -> None:
+        """Store a value, evicting least recently used entries to fit.
+
+        Values larger than the whole budget are not cached.
+        """
+        self.discard(key)
+        if nbytes > self.max_bytes:
+            return
+
+        self._entries[key] = (value, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+
+    def discard(self, key: Hashable) -> None:
+        """Remove a single entry if present."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def invalidate(self) -> None:
+        """Drop every entry and start a new generation."""
+        self._entries.clear()
+        self._bytes = 0
+        self.generation += 1
@@ -0,0 +1,286 @@
+"""Background image saving for LikX."""
+
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+try:
+    import gi
+
+    gi.require_version("GLib", "2.0")
+    from gi.repository import GLib
+
+    GLIB_AVAILABLE = True
+except (ImportError, ValueError):
+    GLIB_AVAILABLE = False
+
+# GdkPixbuf format names by file extension
+FORMATS = {
+    "jpg": "jpeg",
+    "jpeg": "jpeg",
+    "png": "png",
+    "bmp": "bmp",
+    "gif": "gif",
+}
+# Images encoded at the same time; further saves wait in a queue
+DEFAULT_MAX_WORKERS = 2
+# Bytes written between progress reports
+WRITE_CHUNK = 1024 * 1024
+
+# Progress at the end of each stage; writing fills the rest up to 1.0
+RENDERED_PROGRESS = 0.2
+ENCODED_PROGRESS = 0.6
+
+
+def run_on_main_loop(func: Callable[..., Any], *args: Any) -> None:
+    """Call func(*args) from the GTK main loop (directly without GLib)."""
+    if not GLIB_AVAILABLE:
+        func(*args)
+        return
+
+    def call() -> bool:
+        func(*args)
+        return False
+
+    GLib.idle_add(call)
+
+
+def pixbuf_format(format_str: str) -> str:
+    """Get the GdkPixbuf format name for an extension (png if unknown)."""
+    return FORMATS.get(format_str.lower(), "png")
+
+
+def _file_mode(filepath: Path) -> int:
+    """Get the permissions a file written to filepath should have."""
+    try:
+        return os.stat(filepath).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def write_atomic(
+    filepath: Path, data: bytes, progress: Optional[Callable[[int], None]] = None
+) -> None:
+    """Write data to filepath so readers never see a partial file.
+
+    The data goes to a temporary file in the same directory, which is
+    synced and then renamed over filepath. The file gets the mode of the
+    file it replaces, or the umask's default for a new file (mkstemp
+    alone would leave it readable by the owner only).
+
+    Args:
+        filepath: Destination; its directory is created if needed.
+        data: File contents.
+        progress: Optional callback with the bytes written so far.
+    """
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(
+        dir=str(filepath.parent), prefix=f".{filepath.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            view = memoryview(data)
+            for start in range(0, len(view), WRITE_CHUNK):
+                f.write(view[start : start + WRITE_CHUNK])
+                if progress is not None:
+                    progress(min(len(view), start + WRITE_CHUNK))
+            f.flush()
+            os.fchmod(f.fileno(), _file_mode(filepath))
+            os.fsync(f.fileno())
+        os.replace(temp, filepath)
+    except BaseException:
+        if os.path.exists(temp):
+            os.unlink(temp)
+        raise
+
+
+class SaveJob:
+    """One queued or running save.
+
+    ``stage`` goes queued -> rendering -> encoding (-> optimizing) ->
+    writing -> done (or failed, or superseded when a later save to the
+    same file made this one pointless) and ``progress`` from 0.0 to 1.0
+    along with it. ``saved_bytes`` is what the PNG optimizer saved.
+    """
+
+    def __init__(self, filepath: Path, format_name: str):
+        self.filepath = filepath
+        self.format = format_name
+        self.stage = "queued"
+        self.progress = 0.0
+        self.size = 0
+        self.saved_bytes = 0
+        self.error: Optional[Exception] = None
+        self._done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job has stopped (successfully or not)."""
+        return self._done.is_set()
+
+    @property
+    def succeeded(self) -> bool:
+        """Whether the file was written."""
+        return self.stage == "done"
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job stops; False if timeout expired first."""
+        return self._done.wait(timeout)
+
+
+class SaveService:
+    """Encodes and writes images on worker threads.
+
+    PNG-encoding a tall scroll capture takes seconds, so saves run off the
+    GTK thread: the image source (a pixbuf, or a callable producing one
+    such as an export composite) is resolved on a worker, encoded in
+    memory and written with :func:`write_atomic`. Progress and completion
+    callbacks run on the GTK main loop.
+
+    At most ``max_workers`` saves run at once; the rest wait their turn.
+    A save to a file that a newer queued save will overwrite is skipped.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        """Initialize the service.
+
+        Args:
+            max_workers: Number of saves encoding at the same time.
+        """
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="likx-save"
+        )
+        self._lock = threading.Lock()
+        self._latest: Dict[Path, SaveJob] = {}
+        self._jobs: List[SaveJob] = []
+
+    @property
+    def pending(self) -> List[SaveJob]:
+        """Jobs that haven't finished yet, oldest first."""
+        with self._lock:
+            self._jobs = [job for job in self._jobs if not job.finished]
+            return list(self._jobs)
+
+    def save(
+        self,
+        source: Union[Any, Callable[[], Any]],
+        filepath: Path,
+        format_str: Optional[str] = None,
+        on_done: Optional[Callable[[SaveJob], None]] = None,
+        on_progress: Optional[Callable[[SaveJob], None]] = None,
+        options: Optional[Dict[str, str]] = None,
+        optimize: Optional[str] = None,
+    ) -> SaveJob:
+        """Queue a save.
+
+        Args:
+            source: Pixbuf to save, or a callable returning it (run on the
+                worker, so it must not touch GTK widgets).
+            filepath: Destination file.
+            format_str: File extension naming the format (default: from
+                filepath).
+            on_done: Called with the job once it has stopped.
+            on_progress: Called with the job as it advances.
+            options: GdkPixbuf saver options (e.g. {"quality": "90"}).
+            optimize: PNG optimizer preset (see png_optimizer.PRESETS);
+                PNGs are re-encoded with it when that makes them smaller.
+
+        Returns:
+            The job, which can be polled or waited on.
+        """
+        filepath = Path(filepath)
+        if format_str is None:
+            format_str = filepath.suffix.lstrip(".") or "png"
+        job = SaveJob(filepath, pixbuf_format(format_str))
+        key = filepath.resolve()
+        with self._lock:
+            self._latest[key] = job
+            self._jobs.append(job)
+        self._executor.submit(
+            self._run, job, key, source, options or {}, optimize, on_done, on_progress
+        )
+        return job
+
+    def _superseded(self, job: SaveJob, key: Path) -> bool:
+        with self._lock:
+            return self._latest.get(key) is not job
+
+    def _run(
+        self,
+        job: SaveJob,
+        key: Path,
+        source: Any,
+        options: Dict[str, str],
+        optimize: Optional[str],
+        on_done: Optional[Callable[[SaveJob], None]],
+        on_progress: Optional[Callable[[SaveJob], None]],
+    ) -> None:
+        def advance(stage: str, progress: float) -> None:
+            job.stage = stage
+            job.progress = progress
+            if on_progress is not None:
+                run_on_main_loop(on_progress, job)
+
+        try:
+            if self._superseded(job, key):
+                job.stage = "superseded"
+            else:
+                advance("rendering", 0.0)
+                pixbuf = source() if callable(source) else source
+                advance("encoding", RENDERED_PROGRESS)
+                _, data = pixbuf.save_to_bufferv(
+                    job.format, list(options), list(options.values())
+                )
+                if optimize is not None and job.format == "png":
+                    from .png_optimizer import optimize_png
+
+                    advance("optimizing", (RENDERED_PROGRESS + ENCODED_PROGRESS) / 2)
+                    optimized = optimize_png(pixbuf, data, optimize)
+                    data = optimized.data
+                    job.saved_bytes = optimized.saved
+                job.size = len(data)
+                advance("writing", ENCODED_PROGRESS)
+
+                def written(count: int) -> None:
+                    share = count / max(1, job.size)
+                    remaining = 1.0 - ENCODED_PROGRESS
+                    advance("writing", ENCODED_PROGRESS + remaining * share)
+
+                if self._superseded(job, key):
+                    job.stage = "superseded"
+                else:
+                    write_atomic(job.filepath, data, written)
+                    job.stage = "done"
+                    job.progress = 1.0
+        except Exception as e:
+            job.error = e
+            job.stage = "failed"
+        finally:
+            with self._lock:
+                if self._latest.get(key) is job:
+                    del self._latest[key]
+            job._done.set()
+            if on_done is not None:
+                run_on_main_loop(on_done, job)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting saves; with wait, finish the queued ones first."""
+        self._executor.shutdown(wait=wait)
+
+
+_service: Optional[SaveService] = None
+_service_lock = threading.Lock()
+
+
+def save_service() -> SaveService:
+    """Get the service shared by every editor window and the tray."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = SaveService()
+        return _service
@@ -29,10 +29,8 @@ def _ensure_opencv():
 try:
     import gi
 
-    gi.require_version("Gdk", "3.0")
     gi.require_version("GdkPixbuf", "2.0")
-    import cairo
-    from gi.repository import Gdk, GdkPixbuf
+    from gi.repository import GdkPixbuf
 
     GTK_AVAILABLE = True
 except (ImportError, ValueError):
@@ -40,6 +38,7 @@ except (ImportError, ValueError):
 
 from . import config  # noqa: E402
 from .capture import DisplayServer, capture_region, detect_display_server  # noqa: E402
+from .image import LikxImage  # noqa: E402
 
 
 class ScrollState(Enum):
@@ -396,28 +395,11 @@ class ScrollCaptureManager:
         return 0
 
     def _pixbuf_to_numpy(self, pixbuf):
-        """Convert GdkPixbuf to numpy array."""
+        """Convert GdkPixbuf to a contiguous RGB numpy array."""
         _ensure_opencv()  # Ensure numpy is loaded
-        width = pixbuf.get_width()
-        height = pixbuf.get_height()
-        rowstride = pixbuf.get_rowstride()
-        n_channels = pixbuf.get_n_channels()
-
-        # Get pixel data
-        pixels = pixbuf.get_pixels()
-        arr = np.frombuffer(pixels, dtype=np.uint8)
-
-        # Reshape accounting for rowstride padding
-        if rowstride == width * n_channels:
-            arr = arr.reshape((height, width, n_channels))
-        else:
-            # Handle rowstride padding
-            arr = arr.reshape((height, rowstride))
-            arr = arr[:, : width * n_channels]
-            arr = arr.reshape((height, width, n_channels))
-
-        # Return RGB (drop alpha if present)
-        return arr[:, :, :3].copy()
+        # Opaque frames come back as packed RGB already, so this is one copy
+        arr = LikxImage.from_pixbuf(pixbuf).array()
+        return np.ascontiguousarray(arr[:, :, :3])
 
     def _stitch_frames(self) -> object:
         """Stitch all frames together into one tall image.
@@ -438,50 +420,27 @@ class ScrollCaptureManager:
             overlap = self.overlaps[i] if i < len(self.overlaps) else 0
             total_height += frame.get_height() - overlap
 
-        # Create cairo surface
-        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, total_height)
-        ctx = cairo.Context(surface)
-
-        # Draw first frame
-        Gdk.cairo_set_source_pixbuf(ctx, self.frames[0], 0, 0)
-        ctx.paint()
-
-        # Draw subsequent frames with overlap offset
-        y_offset = self.frames[0].get_height()
-        for i, frame in enumerate(self.frames[1:]):
-            overlap = self.overlaps[i] if i < len(self.overlaps) else 0
-            y_offset -= overlap
-            Gdk.cairo_set_source_pixbuf(ctx, frame, 0, y_offset)
-            ctx.paint()
+        # Paste frames straight into one pixbuf - unlike a cairo surface it
+        # has no 32767px limit and needs no BGRA conversion afterwards
+        has_alpha = any(frame.get_has_alpha() for frame in self.frames)
+        stitched = GdkPixbuf.Pixbuf.new(
+            GdkPixbuf.Colorspace.RGB, has_alpha, 8, width, total_height
+        )
+        if has_alpha:
+            stitched.fill(0)
+
+        # Later frames are pasted over the overlap of the previous one
+        y_offset = 0
+        for i, frame in enumerate(self.frames):
+            if i > 0:
+                y_offset -= self.overlaps[i - 1] if i - 1 < len(self.overlaps) else 0
+            copy_width = min(frame.get_width(), width)
+            copy_height = min(frame.get_height(), total_height - y_offset)
+            if copy_height > 0:
+                frame.copy_area(0, 0, copy_width, copy_height, stitched, 0, y_offset)
             y_offset += frame.get_height()
 
-        # Convert surface to pixbuf
-        return self._surface_to_pixbuf(surface)
-
-    def _surface_to_pixbuf(self, surface: cairo.ImageSurface) -> object:
-        """Convert cairo surface to GdkPixbuf."""
-        _ensure_opencv()  # Ensure numpy is loaded
-        width = surface.get_width()
-        height = surface.get_height()
-
-        # Get surface data
-        data = bytes(surface.get_data())
-
-        # Cairo uses BGRA, GdkPixbuf uses RGBA - need to swap channels
-        arr = np.frombuffer(data, dtype=np.uint8).reshape((height, width, 4)).copy()
-        # Swap B and R channels (BGRA -> RGBA)
-        arr[:, :, [0, 2]] = arr[:, :, [2, 0]]
-
-        # Create pixbuf from data
-        return GdkPixbuf.Pixbuf.new_from_data(
-            arr.tobytes(),
-            GdkPixbuf.Colorspace.RGB,
-            True,  # has_alpha
-            8,  # bits_per_sample
-            width,
-            height,
-            width * 4,  # rowstride
-        )
+        return stitched
 
     def _estimate_total_height(self) -> int:
         """Estimate total height based on captured frames."""
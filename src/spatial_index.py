@@ -0,0 +1,111 @@
+"""Uniform-grid spatial index for LikX annotations."""
+
+import math
+from typing import Dict, Hashable, Iterator, Optional, Set, Tuple
+
+# Grid cell edge length in image pixels
+DEFAULT_CELL_SIZE = 256
+
+BBox = Tuple[float, float, float, float]  # (x1, y1, x2, y2)
+
+
+class SpatialIndex:
+    """Bounding boxes bucketed into a uniform grid.
+
+    Every key is registered in each grid cell its bbox overlaps, so point
+    and area queries only look at the keys in the cells they touch rather
+    than at every stored bbox. Entries are inserted, moved and removed
+    individually.
+    """
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        """Initialize an empty index.
+
+        Args:
+            cell_size: Grid cell edge length.
+        """
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self._bboxes: Dict[Hashable, BBox] = {}
+
+    def __len__(self) -> int:
+        return len(self._bboxes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._bboxes
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._bboxes))
+
+    def bbox(self, key: Hashable) -> Optional[BBox]:
+        """Get the stored bbox for key, or None."""
+        return self._bboxes.get(key)
+
+    def insert(self, key: Hashable, bbox: BBox) -> None:
+        """Add key with bbox, replacing any previous entry for it."""
+        self.remove(key)
+        self._bboxes[key] = bbox
+        for cell in self._cells_for(bbox):
+            self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key: Hashable) -> None:
+        """Remove key if present."""
+        bbox = self._bboxes.pop(key, None)
+        if bbox is None:
+            return
+        for cell in self._cells_for(bbox):
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._cells[cell]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._cells.clear()
+        self._bboxes.clear()
+
+    def query_point(self, x: float, y: float) -> Set[Hashable]:
+        """Get the keys whose bbox contains (x, y)."""
+        bucket = self._cells.get(self._cell(x, y), ())
+        result = set()
+        for key in bucket:
+            x1, y1, x2, y2 = self._bboxes[key]
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                result.add(key)
+        return result
+
+    def query_rect(self, rect: BBox) -> Set[Hashable]:
+        """Get the keys whose bbox intersects rect."""
+        rx1, ry1, rx2, ry2 = rect
+        col1, row1 = self._cell(rx1, ry1)
+        col2, row2 = self._cell(rx2, ry2)
+        if (col2 - col1 + 1) * (row2 - row1 + 1) > len(self._cells):
+            # Large rect over a sparse grid - cheaper to check every bbox
+            candidates = self._bboxes.keys()
+        else:
+            candidates = {
+                key
+                for cell in self._cells_for(rect)
+                for key in self._cells.get(cell, ())
+            }
+
+        result = set()
+        for key in candidates:
+            x1, y1, x2, y2 = self._bboxes[key]
+            if x1 <= rx2 and rx1 <= x2 and y1 <= ry2 and ry1 <= y2:
+                result.add(key)
+        return result
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return (
+            int(math.floor(x / self.cell_size)),
+            int(math.floor(y / self.cell_size)),
+        )
+
+    def _cells_for(self, bbox: BBox) -> Iterator[Tuple[int, int]]:
+        col1, row1 = self._cell(bbox[0], bbox[1])
+        col2, row2 = self._cell(bbox[2], bbox[3])
+        for row in range(row1, row2 + 1):
+            for col in range(col1, col2 + 1):
+                yield (col, row)
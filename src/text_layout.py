@@ -0,0 +1,244 @@
+"""Cached text layouts for LikX annotations."""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+try:
+    import gi
+
+    gi.require_version("Pango", "1.0")
+    gi.require_version("PangoCairo", "1.0")
+    from gi.repository import Pango, PangoCairo
+
+    PANGO_AVAILABLE = True
+except (ImportError, ValueError):
+    PANGO_AVAILABLE = False
+
+# Default number of layouts kept by a TextLayoutCache
+DEFAULT_MAX_LAYOUTS = 512
+# Line advance used by the cairo toy-font fallback, as a factor of the size
+TOY_LINE_SPACING = 1.3
+
+Box = Tuple[float, float, float, float]
+
+
+class TextLayout:
+    """Measured text ready to be drawn at any pen position.
+
+    ``ink`` and ``logical`` are (x1, y1, x2, y2) boxes relative to the pen
+    on the first line's baseline. With Pango the layout is shaped once and
+    replayed with ``PangoCairo.show_layout``; without it the text is drawn
+    with cairo's toy font API, one line at a time.
+    """
+
+    __slots__ = ("ink", "logical", "_layout", "_baseline", "_font", "_lines")
+
+    def __init__(
+        self,
+        ink: Box,
+        logical: Box,
+        layout: Any = None,
+        baseline: float = 0.0,
+        font: Optional[tuple] = None,
+        lines: Tuple[str, ...] = (),
+    ):
+        self.ink = ink
+        self.logical = logical
+        self._layout = layout
+        self._baseline = baseline
+        self._font = font
+        self._lines = lines
+
+    @property
+    def width(self) -> float:
+        """Width of the inked area."""
+        return self.ink[2] - self.ink[0]
+
+    @property
+    def height(self) -> float:
+        """Height of the inked area."""
+        return self.ink[3] - self.ink[1]
+
+    def show(self, ctx: Any, x: float, y: float) -> None:
+        """Draw the text with the pen on the first baseline at (x, y)."""
+        if self._layout is not None:
+            ctx.move_to(x, y - self._baseline)
+            PangoCairo.show_layout(ctx, self._layout)
+            return
+
+        family, slant, weight, size = self._font
+        ctx.select_font_face(family, slant, weight)
+        ctx.set_font_size(size)
+        for line in self._lines:
+            ctx.move_to(x, y)
+            ctx.show_text(line)
+            y += size * TOY_LINE_SPACING
+
+
+class TextLayoutCache:
+    """LRU cache of TextLayouts keyed by (text, family, size, bold, italic).
+
+    Renderers and bounding-box code share one cache, so a label is shaped
+    and measured once rather than on every frame, and selection boxes use
+    the same metrics the text is drawn with.
+    """
+
+    def __init__(self, max_layouts: int = DEFAULT_MAX_LAYOUTS):
+        """Initialize the cache.
+
+        Args:
+            max_layouts: Number of layouts to keep before evicting.
+        """
+        self.max_layouts = max_layouts
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, TextLayout]" = OrderedDict()
+        self._pango_context: Any = None
+        self._toy_context: Any = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Drop every cached layout."""
+        self._entries.clear()
+
+    def get(
+        self,
+        text: str,
+        family: str,
+        size: float,
+        bold: bool = False,
+        italic: bool = False,
+    ) -> Optional[TextLayout]:
+        """Get the layout for text in the given font.
+
+        Returns:
+            The cached or newly built layout, or None if neither Pango nor
+            cairo is available to measure it.
+        """
+        key = (text, family, size, bold, italic)
+        layout = self._entries.get(key)
+        if layout is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return layout
+
+        self.misses += 1
+        layout = self._build(text, family, size, bold, italic)
+        if layout is not None:
+            self._entries[key] = layout
+            if len(self._entries) > self.max_layouts:
+                self._entries.popitem(last=False)
+        return layout
+
+    def _build(
+        self, text: str, family: str, size: float, bold: bool, italic: bool
+    ) -> Optional[TextLayout]:
+        """Shape and measure text, preferring Pango."""
+        if PANGO_AVAILABLE:
+            return self._build_pango(text, family, size, bold, italic)
+        return self._build_toy(text, family, size, bold, italic)
+
+    def _build_pango(
+        self, text: str, family: str, size: float, bold: bool, italic: bool
+    ) -> TextLayout:
+        if self._pango_context is None:
+            import cairo
+
+            context = PangoCairo.FontMap.get_default().create_context()
+            # Unhinted metrics keep layouts valid at every zoom level
+            options = cairo.FontOptions()
+            options.set_hint_metrics(cairo.HINT_METRICS_OFF)
+            PangoCairo.context_set_font_options(context, options)
+            self._pango_context = context
+
+        desc = Pango.FontDescription()
+        desc.set_family(family)
+        desc.set_absolute_size(size * Pango.SCALE)
+        desc.set_weight(Pango.Weight.BOLD if bold else Pango.Weight.NORMAL)
+        desc.set_style(Pango.Style.ITALIC if italic else Pango.Style.NORMAL)
+
+        layout = Pango.Layout.new(self._pango_context)
+        layout.set_font_description(desc)
+        layout.set_text(text, -1)
+
+        ink_rect, logical_rect = layout.get_extents()
+        baseline = layout.get_baseline() / Pango.SCALE
+
+        def to_box(rect: Any) -> Box:
+            return (
+                rect.x / Pango.SCALE,
+                rect.y / Pango.SCALE - baseline,
+                (rect.x + rect.width) / Pango.SCALE,
+                (rect.y + rect.height) / Pango.SCALE - baseline,
+            )
+
+        return TextLayout(
+            to_box(ink_rect), to_box(logical_rect), layout=layout, baseline=baseline
+        )
+
+    def _build_toy(
+        self, text: str, family: str, size: float, bold: bool, italic: bool
+    ) -> Optional[TextLayout]:
+        if self._toy_context is None:
+            try:
+                import cairo
+
+                surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
+                self._toy_context = cairo.Context(surface)
+            except ImportError:
+                self._toy_context = False
+        if self._toy_context is False:
+            return None
+
+        ctx = self._toy_context
+        # Cairo font slant: 0=normal, 1=italic; weight: 0=normal, 1=bold
+        font = (family, 1 if italic else 0, 1 if bold else 0, size)
+        ctx.select_font_face(*font[:3])
+        ctx.set_font_size(size)
+        ascent, descent = ctx.font_extents()[:2]
+
+        lines = tuple(text.split("\n"))
+        ink: Optional[Box] = None
+        right = 0.0
+        for i, line in enumerate(lines):
+            x_bearing, y_bearing, width, height, x_advance, _ = ctx.text_extents(line)
+            right = max(right, x_advance)
+            if not width and not height:
+                continue
+            offset = i * size * TOY_LINE_SPACING
+            box = (
+                x_bearing,
+                y_bearing + offset,
+                x_bearing + width,
+                y_bearing + height + offset,
+            )
+            ink = box if ink is None else _union(ink, box)
+
+        bottom = (len(lines) - 1) * size * TOY_LINE_SPACING + descent
+        logical = (0.0, -ascent, right, bottom)
+        return TextLayout(ink or (0.0, 0.0, 0.0, 0.0), logical, font=font, lines=lines)
+
+
+def _union(a: Box, b: Box) -> Box:
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+class _ThreadLayouts(threading.local):
+    """One TextLayoutCache per thread: Pango layouts aren't thread-safe."""
+
+    def __init__(self) -> None:
+        self.cache = TextLayoutCache()
+
+
+# Shared by the renderers and bounding-box code of each thread
+_layouts = _ThreadLayouts()
+
+
+def get_layout(
+    text: str, family: str, size: float, bold: bool = False, italic: bool = False
+) -> Optional[TextLayout]:
+    """Get a layout from the shared cache (None if text can't be measured)."""
+    return _layouts.cache.get(text, family, size, bold, italic)
@@ -0,0 +1,170 @@
+"""Tiled access to large images for LikX.
+
+Cairo image surfaces are limited to 32767 pixels per side, which tall
+scroll captures easily exceed. GdkPixbufs have no such limit, so the
+image itself stays a single pixbuf and :class:`TiledImage` exposes it as
+a grid of fixed-size tiles (zero-copy sub-pixbufs, created on first use)
+that can each be handed to cairo on its own.
+"""
+
+import math
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import gi
+
+    gi.require_version("Gdk", "3.0")
+    gi.require_version("GdkPixbuf", "2.0")
+    from gi.repository import Gdk, GdkPixbuf
+
+    GTK_AVAILABLE = True
+except (ImportError, ValueError):
+    GTK_AVAILABLE = False
+
+from .editor import DrawingElement, Rect, render_elements
+from .render_cache import RenderCache
+
+# Edge length of a tile in pixels
+TILE_SIZE = 1024
+
+
+def iter_tiles(
+    width: int,
+    height: int,
+    tile_size: int = TILE_SIZE,
+    region: Optional[Rect] = None,
+) -> Iterator[Tuple[int, int, int, int]]:
+    """Yield (x, y, width, height) of the tiles covering an image.
+
+    Args:
+        width: Image width.
+        height: Image height.
+        tile_size: Tile edge length.
+        region: Optional (x1, y1, x2, y2) area; only tiles touching it
+            are yielded.
+    """
+    x1, y1, x2, y2 = region if region is not None else (0, 0, width, height)
+    first_col = max(0, int(math.floor(x1 / tile_size)))
+    first_row = max(0, int(math.floor(y1 / tile_size)))
+    last_col = min(math.ceil(width / tile_size), math.ceil(x2 / tile_size))
+    last_row = min(math.ceil(height / tile_size), math.ceil(y2 / tile_size))
+
+    for row in range(first_row, last_row):
+        y = row * tile_size
+        for col in range(first_col, last_col):
+            x = col * tile_size
+            yield (x, y, min(tile_size, width - x), min(tile_size, height - y))
+
+
+class TiledImage:
+    """A pixbuf viewed as a grid of fixed-size tiles.
+
+    Tiles are sub-pixbufs sharing the parent's pixel memory, created the
+    first time they are needed, so wrapping even a very tall image is
+    cheap and no cairo surface larger than a tile is ever required.
+    """
+
+    def __init__(self, pixbuf: Any, tile_size: int = TILE_SIZE):
+        """Wrap a pixbuf.
+
+        Args:
+            pixbuf: The image to tile.
+            tile_size: Tile edge length in pixels.
+        """
+        self.pixbuf = pixbuf
+        self.tile_size = tile_size
+        self._tiles: Dict[Tuple[int, int], Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    def get_width(self) -> int:
+        """Get the image width."""
+        return self.pixbuf.get_width()
+
+    def get_height(self) -> int:
+        """Get the image height."""
+        return self.pixbuf.get_height()
+
+    def get_tile(self, x: int, y: int, width: int, height: int) -> Any:
+        """Get the tile whose top-left corner is (x, y)."""
+        key = (x, y)
+        tile = self._tiles.get(key)
+        if tile is None:
+            tile = self.pixbuf.new_subpixbuf(x, y, width, height)
+            self._tiles[key] = tile
+        return tile
+
+    def tiles(self, region: Optional[Rect] = None) -> Iterator[Tuple[int, int, Any]]:
+        """Yield (x, y, tile) for the tiles touching region (default all)."""
+        for x, y, width, height in iter_tiles(
+            self.get_width(), self.get_height(), self.tile_size, region
+        ):
+            yield x, y, self.get_tile(x, y, width, height)
+
+    def paint(
+        self, ctx: Any, region: Optional[Rect] = None, filter: Optional[int] = None
+    ) -> None:
+        """Paint the tiles touching region into ctx (in image coordinates).
+
+        Args:
+            ctx: Cairo context.
+            region: Optional (x1, y1, x2, y2) area; defaults to all tiles.
+            filter: Optional cairo filter for scaling the tiles.
+        """
+        import cairo
+
+        ctx.save()
+        # Tiles must butt exactly when scaled, so no antialiased edges and
+        # padded sources that don't fade out at the tile border
+        ctx.set_antialias(cairo.ANTIALIAS_NONE)
+        for x, y, tile in self.tiles(region):
+            Gdk.cairo_set_source_pixbuf(ctx, tile, x, y)
+            ctx.get_source().set_extend(cairo.EXTEND_PAD)
+            if filter is not None:
+                ctx.get_source().set_filter(filter)
+            ctx.rectangle(x, y, tile.get_width(), tile.get_height())
+            ctx.fill()
+        ctx.restore()
+
+
+def render_annotated(
+    pixbuf: Any,
+    elements: List[DrawingElement],
+    cache: Optional[RenderCache] = None,
+    tile_size: int = TILE_SIZE,
+) -> Any:
+    """Flatten an image and its annotations into a new pixbuf.
+
+    Works one tile at a time, so images beyond cairo's surface size limit
+    can be exported and only a tile-sized surface is alive at once.
+
+    Args:
+        pixbuf: Base image.
+        elements: Annotations to draw on top.
+        cache: Optional RenderCache for blur/pixelate rasters.
+        tile_size: Tile edge length in pixels.
+
+    Returns:
+        A new RGBA GdkPixbuf of the same size as pixbuf.
+    """
+    import cairo
+
+    width, height = pixbuf.get_width(), pixbuf.get_height()
+    output = GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB, True, 8, width, height)
+    image = TiledImage(pixbuf, tile_size)
+
+    for x, y, tile_width, tile_height in iter_tiles(width, height, tile_size):
+        region = (x, y, x + tile_width, y + tile_height)
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, tile_width, tile_height)
+        ctx = cairo.Context(surface)
+        ctx.translate(-x, -y)
+        image.paint(ctx, region)
+        if elements:
+            render_elements(ctx, elements, pixbuf, cache=cache, clip=region)
+        surface.flush()
+
+        tile = Gdk.pixbuf_get_from_surface(surface, 0, 0, tile_width, tile_height)
+        tile.copy_area(0, 0, tile_width, tile_height, output, x, y)
+
+    return output
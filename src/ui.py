@@ -1,9 +1,9 @@
 """Enhanced user interface module for LikX with full features."""
 
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Callable, List, Optional, Union
+from typing import Any, Callable, List, Optional, Union
 
 try:
     import gi
@@ -18,8 +18,27 @@ except (ImportError, ValueError):
 
 from . import capture as capture_module
 from . import config
-from .capture import CaptureMode, CaptureResult, capture, save_capture
-from .editor import ArrowStyle, Color, EditorState, ToolType, render_elements
+from .canvas import (
+    AnnotationLayer,
+    DamageTracker,
+    DragSprites,
+    ImagePyramid,
+    PixelGrid,
+    ZoomedView,
+    intersect_rects,
+    to_device_rect,
+    uses_nearest,
+)
+from .capture import CaptureMode, CaptureResult, capture, save_capture_async
+from .compositor import ExportCompositor
+from .editor import (
+    FREEHAND_TOOLS,
+    ArrowStyle,
+    Color,
+    EditorState,
+    ToolType,
+    render_elements,
+)
 from .effects import (
     add_background,
     add_border,
@@ -32,6 +51,7 @@ from .effects import (
 from .history import HistoryManager
 from .hotkeys import HotkeyManager
 from .i18n import _
+from .motion import MotionQueue
 from .notification import (
     show_notification,
     show_screenshot_copied,
@@ -41,9 +61,15 @@ from .notification import (
 )
 from .ocr import OCREngine
 from .pinned import PinnedWindow
+from .png_optimizer import (
+    DEFAULT_PRESET as DEFAULT_PNG_PRESET,
+    PRESETS as PNG_PRESETS,
+    configured_preset,
+)
 from .queue import CaptureQueue
 from .recorder import GifRecorder, RecordingState
 from .recording_overlay import RecordingOverlay
+from .saving import SaveJob, save_service
 from .scroll_capture import ScrollCaptureManager, ScrollCaptureResult
 from .scroll_overlay import ScrollCaptureOverlay
 from .tray import SystemTray
@@ -325,6 +351,12 @@ class TabContent:
     tab_label: object  # Gtk.Box
     modified: bool = False
     filepath: Optional[Path] = None
+    layer: AnnotationLayer = field(default_factory=AnnotationLayer)
+    damage: DamageTracker = field(default_factory=DamageTracker)
+    pyramid: ImagePyramid = field(default_factory=ImagePyramid)
+    sprites: DragSprites = field(default_factory=DragSprites)
+    view: ZoomedView = field(default_factory=ZoomedView)
+    compositor: ExportCompositor = field(default_factory=ExportCompositor)
 
 
 class EditorWindow:
@@ -353,6 +385,11 @@ class EditorWindow:
         self.uploader = Uploader()
         self._crosshair_cursor = None
         self._arrow_cursor = None
+        # Pointer motion applied once per frame from a frame-clock tick
+        self._motion = MotionQueue()
+        self._motion_tick: Optional[int] = None
+        self._motion_widget: Optional[Gtk.Widget] = None
+        self._pixel_grid = PixelGrid()
 
         self.window = Gtk.Window(title="LikX - Editor")
         self.window.set_default_size(900, 700)
@@ -531,6 +568,7 @@ class EditorWindow:
                 return False
 
         # Remove tab
+        self._cancel_motion()
         self.notebook.remove_page(index)
         self.tabs.pop(index)
 
@@ -573,6 +611,7 @@ class EditorWindow:
 
         self.current_tab_index = page_num
         tab = self.tabs[page_num]
+        self._cancel_motion()
 
         # Update drawing_area reference for legacy compatibility
         self.drawing_area = tab.drawing_area
@@ -615,6 +654,10 @@ class EditorWindow:
         cfg = config.load_config()
         editor_state.grid_snap_enabled = cfg.get("snap_to_grid", False)
         editor_state.grid_size = cfg.get("grid_size", 20)
+        editor_state.set_pixel_size(cfg.get("pixelate_size", 15))
+        editor_state.set_stroke_tolerance(cfg.get("stroke_tolerance", 0.5))
+        editor_state.set_history_limit(cfg.get("undo_memory_mb", 64))
+        editor_state.set_pick_sample_size(cfg.get("picker_sample_size", 1))
 
     def _on_editor_delete_event(self, widget: Gtk.Widget, event) -> bool:
         """Handle editor window close - check for unsaved changes."""
@@ -1405,38 +1448,34 @@ class EditorWindow:
             if hasattr(self, "tool_buttons") and tool_type in self.tool_buttons:
                 self.tool_buttons[tool_type].set_active(True)
 
-    def _save_with_annotations(self, filepath: Path) -> bool:
-        """Save the image with annotations rendered."""
-        try:
-            import cairo
-
-            # Create surface
-            width = self.result.pixbuf.get_width()
-            height = self.result.pixbuf.get_height()
+    def _composite(self) -> Any:
+        """Get the current tab flattened with its annotations.
 
-            surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
-            ctx = cairo.Context(surface)
+        The composite is reused by every export until the next edit.
+        """
+        return self.current_tab.compositor.composite(
+            self.result.pixbuf,
+            self.editor_state.elements,
+            self.editor_state.edit_generation,
+        )
 
-            # Draw original image
-            Gdk.cairo_set_source_pixbuf(ctx, self.result.pixbuf, 0, 0)
-            ctx.paint()
+    def _composite_async(
+        self, callback: Callable[[Any], None], on_error: Callable[[Exception], None]
+    ) -> None:
+        """Flatten the current tab off the GTK thread, then call callback."""
+        tab = self.current_tab
+        tab.compositor.composite_async(
+            tab.result.pixbuf,
+            tab.editor_state.export_snapshot(),
+            tab.editor_state.edit_generation,
+            callback,
+            on_error,
+        )
 
-            # Render annotations
-            elements = self.editor_state.elements
-            if elements:
-                render_elements(surface, elements, self.result.pixbuf)
-
-            # Convert to pixbuf and save
-            data = surface.get_data()
-            new_pixbuf = GdkPixbuf.Pixbuf.new_from_data(
-                data,
-                GdkPixbuf.Colorspace.RGB,
-                True,
-                8,
-                width,
-                height,
-                cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, width),
-            )
+    def _save_with_annotations(self, filepath: Path) -> bool:
+        """Save the image with annotations rendered."""
+        try:
+            new_pixbuf = self._composite()
 
             # Determine format
             format_str = filepath.suffix.lstrip(".").lower()
@@ -1491,14 +1530,37 @@ class EditorWindow:
 
         response = dialog.run()
         if response == Gtk.ResponseType.OK:
-            filepath = Path(dialog.get_filename())
-            if self._save_with_annotations(filepath):
+            self._save_in_background(Path(dialog.get_filename()))
+
+        dialog.destroy()
+
+    def _save_in_background(self, filepath: Path) -> None:
+        """Flatten, encode and write the current tab on a worker thread."""
+        tab = self.current_tab
+        compositor = tab.compositor
+        pixbuf = tab.result.pixbuf
+        elements = tab.editor_state.export_snapshot()
+        generation = tab.editor_state.edit_generation
+
+        def render() -> Any:
+            return compositor.composite(pixbuf, elements, generation)
+
+        def progress(job: SaveJob) -> None:
+            self.statusbar.push(
+                self.statusbar_context,
+                f"Saving {filepath.name}... {int(job.progress * 100)}%",
+            )
+
+        def done(job: SaveJob) -> None:
+            if job.succeeded:
                 self.statusbar.push(self.statusbar_context, f"Saved to {filepath.name}")
                 cfg = config.load_config()
                 if cfg.get("show_notification", True):
                     show_screenshot_saved(str(filepath))
+            elif job.error is not None:
+                self.statusbar.push(self.statusbar_context, f"Save failed: {job.error}")
 
-        dialog.destroy()
+        save_service().save(render, filepath, on_done=done, on_progress=progress)
 
     def _upload(self) -> None:
         """Upload the screenshot to cloud service."""
@@ -1531,71 +1593,119 @@ class EditorWindow:
 
     def _copy_to_clipboard(self) -> None:
         """Copy the edited screenshot to clipboard."""
-        try:
-            import cairo
-
-            # Create surface with annotations
-            width = self.result.pixbuf.get_width()
-            height = self.result.pixbuf.get_height()
-
-            surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
-            ctx = cairo.Context(surface)
-
-            Gdk.cairo_set_source_pixbuf(ctx, self.result.pixbuf, 0, 0)
-            ctx.paint()
-
-            if self.editor_state.elements:
-                render_elements(surface, self.editor_state.elements, self.result.pixbuf)
-
-            # Convert to pixbuf
-            data = surface.get_data()
-            new_pixbuf = GdkPixbuf.Pixbuf.new_from_data(
-                data,
-                GdkPixbuf.Colorspace.RGB,
-                True,
-                8,
-                width,
-                height,
-                cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, width),
-            )
 
-            # Copy to clipboard
-            clipboard = Gtk.Clipboard.get(Gdk.SELECTION_CLIPBOARD)
-            clipboard.set_image(new_pixbuf)
-            clipboard.store()
+        def copy(new_pixbuf: Any) -> None:
+            try:
+                clipboard = Gtk.Clipboard.get(Gdk.SELECTION_CLIPBOARD)
+                clipboard.set_image(new_pixbuf)
+                clipboard.store()
+            except Exception as e:
+                failed(e)
+                return
 
             self.statusbar.push(self.statusbar_context, "Copied to clipboard")
             cfg = config.load_config()
             if cfg.get("show_notification", True):
                 show_screenshot_copied()
-        except Exception as e:
+
+        def failed(e: Exception) -> None:
             self.statusbar.push(self.statusbar_context, f"Copy failed: {e}")
 
+        self._composite_async(copy, failed)
+
     def _on_draw(self, widget: Gtk.Widget, cr) -> bool:
         """Draw the screenshot and annotations with zoom support."""
         zoom = self.editor_state.zoom_level
-
-        # Update drawing area size based on zoom
         base_width = self.result.pixbuf.get_width()
         base_height = self.result.pixbuf.get_height()
-        new_width = int(base_width * zoom)
-        new_height = int(base_height * zoom)
-        self.drawing_area.set_size_request(new_width, new_height)
-
-        # Apply zoom transform
-        cr.scale(zoom, zoom)
-
-        # Draw the image
-        Gdk.cairo_set_source_pixbuf(cr, self.result.pixbuf, 0, 0)
-        cr.paint()
-
-        # Draw grid overlay if enabled (drawn before elements)
-        self._draw_grid(cr)
 
-        # Draw annotations (also scaled)
-        elements = self.editor_state.get_elements()
-        if elements:
-            render_elements(cr, elements, self.result.pixbuf)
+        layer = self.current_tab.layer
+        pyramid = self.current_tab.pyramid
+        sprites = self.current_tab.sprites
+        if layer.fits(self.result.pixbuf, zoom):
+            # Image, grid and committed annotations come from the cached layer
+            grid_key = (
+                self.editor_state.grid_snap_enabled,
+                self.editor_state.grid_size,
+            )
+            elements = self.editor_state.elements
+            generation = self.editor_state.edit_generation
+            drag_offset = self.editor_state.drag_offset
+            selection = frozenset(self.editor_state.selected_indices)
+            dragging = (
+                drag_offset is not None
+                and selection
+                and (sprites.active or drag_offset != (0.0, 0.0))
+                and sprites.begin(
+                    self.result.pixbuf,
+                    [elements[i] for i in sorted(selection) if i < len(elements)],
+                    generation,
+                    drag_offset,
+                    scale=zoom,
+                    render_cache=self.editor_state.render_cache,
+                    key=selection,
+                )
+            )
+            if dragging:
+                # The moved elements come from their sprites; the layer holds
+                # the rest as of the start of the drag
+                elements = [e for i, e in enumerate(elements) if i not in selection]
+                generation = sprites.generation
+                grid_key += (selection,)
+            else:
+                sprites.end()
+            surface = layer.get_surface(
+                self.result.pixbuf,
+                elements,
+                generation,
+                scale=zoom,
+                render_cache=self.editor_state.render_cache,
+                underlay=self._draw_grid,
+                extra_key=grid_key,
+                pyramid=pyramid,
+            )
+            cr.set_source_surface(surface, 0, 0)
+            cr.paint()
+            if dragging:
+                sprites.paint(cr, drag_offset, scale=zoom)
+            cr.scale(zoom, zoom)
+            pending = [self.editor_state.current_element]
+        else:
+            # Too large to cache - draw everything directly
+            layer.invalidate()
+            sprites.end()
+            generation = self.editor_state.render_cache.generation
+            if uses_nearest(zoom):
+                # Pixel inspection: blit the visible area, scaled once
+                self.current_tab.view.paint(
+                    cr,
+                    self.result.pixbuf,
+                    zoom,
+                    self._get_visible_rect(),
+                    pyramid,
+                    generation,
+                )
+                cr.scale(zoom, zoom)
+            else:
+                self.current_tab.view.invalidate()
+                cr.scale(zoom, zoom)
+                pyramid.paint(cr, self.result.pixbuf, zoom, generation)
+            self._draw_grid(cr)
+            pending = self.editor_state.get_elements()
+
+        # Draw the in-progress element (or everything, uncached) on top,
+        # skipping anything outside the visible part of the repainted area
+        clip = intersect_rects(cr.clip_extents(), self._get_visible_rect())
+        elements = [e for e in pending if e is not None]
+        if elements and clip:
+            render_elements(
+                cr,
+                elements,
+                self.result.pixbuf,
+                cache=self.editor_state.render_cache,
+                clip=clip,
+                preview=self.editor_state.current_element,
+            )
 
         # Draw callout preview during drag
         if (
@@ -1615,13 +1725,54 @@ class EditorWindow:
         ):
             self._draw_crop_preview(cr)
 
-        # Draw selection handles if an element is selected
-        if self.editor_state.selected_index is not None:
+        # Draw selection handles if any elements are selected
+        if self.editor_state.selected_indices:
             self._draw_selection_handles(cr)
             self._draw_snap_guides(cr)
 
+        # Draw rubber-band selection rectangle
+        if self.editor_state.marquee is not None:
+            self._draw_marquee(cr)
+
+        self.current_tab.damage.drawn(
+            self.editor_state.get_damage_rects(base_width, base_height)
+        )
         return True
 
+    def _get_visible_rect(self) -> tuple:
+        """Get the scrolled viewport as (x1, y1, x2, y2) in image coordinates."""
+        zoom = self.editor_state.zoom_level
+        hadj = self.current_tab.scrolled_window.get_hadjustment()
+        vadj = self.current_tab.scrolled_window.get_vadjustment()
+        x, y = hadj.get_value(), vadj.get_value()
+        return (
+            x / zoom,
+            y / zoom,
+            (x + hadj.get_page_size()) / zoom,
+            (y + vadj.get_page_size()) / zoom,
+        )
+
+    def _update_canvas_size(self) -> None:
+        """Size the drawing area to the image at the current zoom."""
+        zoom = self.editor_state.zoom_level
+        self.drawing_area.set_size_request(
+            int(self.result.pixbuf.get_width() * zoom),
+            int(self.result.pixbuf.get_height() * zoom),
+        )
+
+    def _queue_overlay_redraw(self) -> None:
+        """Repaint only where the drawn element, selection or guides changed."""
+        pixbuf = self.result.pixbuf
+        rects = self.current_tab.damage.damage(
+            self.editor_state.get_damage_rects(pixbuf.get_width(), pixbuf.get_height())
+        )
+        width = self.drawing_area.get_allocated_width()
+        height = self.drawing_area.get_allocated_height()
+        for rect in rects:
+            area = to_device_rect(rect, self.editor_state.zoom_level, width, height)
+            if area:
+                self.drawing_area.queue_draw_area(*area)
+
     def _draw_callout_preview(self, cr) -> None:
         """Draw a preview of the callout being created."""
         tail_x, tail_y = self._callout_tail
@@ -1834,6 +1985,18 @@ class EditorWindow:
                     cr.set_line_width(1)
                     cr.stroke()
 
+    def _draw_marquee(self, cr) -> None:
+        """Draw the rubber-band selection rectangle."""
+        x1, y1, x2, y2 = self.editor_state.marquee
+        cr.rectangle(min(x1, x2), min(y1, y2), abs(x2 - x1), abs(y2 - y1))
+        cr.set_source_rgba(0.2, 0.5, 1.0, 0.15)
+        cr.fill_preserve()
+        cr.set_source_rgba(0.2, 0.5, 1.0, 0.8)
+        cr.set_line_width(1)
+        cr.set_dash([4, 4])
+        cr.stroke()
+        cr.set_dash([])  # Reset dash
+
     def _draw_snap_guides(self, cr) -> None:
         """Draw visual snap guides when dragging an element."""
         if not self.editor_state.active_snap_guides:
@@ -1863,31 +2026,38 @@ class EditorWindow:
         cr.set_dash([])  # Reset dash
 
     def _draw_grid(self, cr) -> None:
-        """Draw grid overlay when grid snap is enabled."""
+        """Draw the pixel grid at high zoom and the snap grid when enabled."""
+        width = self.result.pixbuf.get_width()
+        height = self.result.pixbuf.get_height()
+        self._pixel_grid.paint(cr, self.editor_state.zoom_level, width, height)
+
         if not self.editor_state.grid_snap_enabled:
             return
 
         grid_size = self.editor_state.grid_size
-        width = self.result.pixbuf.get_width()
-        height = self.result.pixbuf.get_height()
+
+        # Only lay out lines inside the area being repainted
+        clip_x1, clip_y1, clip_x2, clip_y2 = cr.clip_extents()
+        top, bottom = max(0, clip_y1), min(height, clip_y2)
+        left, right = max(0, clip_x1), min(width, clip_x2)
 
         # Light gray grid lines
         cr.set_source_rgba(0.5, 0.5, 0.5, 0.3)
         cr.set_line_width(0.5)
 
         # Vertical lines
-        x = grid_size
-        while x < width:
-            cr.move_to(x, 0)
-            cr.line_to(x, height)
+        x = max(1, int(left // grid_size)) * grid_size
+        while x < right:
+            cr.move_to(x, top)
+            cr.line_to(x, bottom)
             x += grid_size
         cr.stroke()
 
         # Horizontal lines
-        y = grid_size
-        while y < height:
-            cr.move_to(0, y)
-            cr.line_to(width, y)
+        y = max(1, int(top // grid_size)) * grid_size
+        while y < bottom:
+            cr.move_to(left, y)
+            cr.line_to(right, y)
             y += grid_size
         cr.stroke()
 
@@ -1960,6 +2130,8 @@ class EditorWindow:
         )
         self.result.pixbuf.copy_area(left, top, width, height, cropped, 0, 0)
         self.result.pixbuf = cropped
+        self.editor_state.replace_pixbuf(cropped)
+        self._update_canvas_size()
 
         # Clear annotations (they're now outside the image)
         self.editor_state.clear()
@@ -2007,6 +2179,7 @@ class EditorWindow:
 
     def _on_button_press(self, widget: Gtk.Widget, event: Gdk.EventButton) -> bool:
         """Handle mouse button press."""
+        self._flush_motion()
         # Convert screen coords to image coords
         img_x, img_y = self._screen_to_image(event.x, event.y)
 
@@ -2015,10 +2188,12 @@ class EditorWindow:
                 # Try to select an element at this position
                 # Shift+click adds to selection (multi-select)
                 shift_held = event.state & Gdk.ModifierType.SHIFT_MASK
-                self.editor_state.select_at(
+                if not self.editor_state.select_at(
                     img_x, img_y, add_to_selection=bool(shift_held)
-                )
-                self.drawing_area.queue_draw()
+                ):
+                    # Empty space - drag out a rubber-band selection
+                    self.editor_state.start_marquee(img_x, img_y)
+                self._queue_overlay_redraw()
             elif self.editor_state.current_tool == ToolType.TEXT:
                 # Show text input dialog
                 self._show_text_dialog(img_x, img_y)
@@ -2053,12 +2228,18 @@ class EditorWindow:
 
     def _on_button_release(self, widget: Gtk.Widget, event: Gdk.EventButton) -> bool:
         """Handle mouse button release."""
+        # Apply motion still waiting for the next frame first
+        self._flush_motion()
         img_x, img_y = self._screen_to_image(event.x, event.y)
         if event.button == 1:
             if self.editor_state.current_tool == ToolType.SELECT:
+                if self.editor_state.marquee is not None:
+                    shift_held = event.state & Gdk.ModifierType.SHIFT_MASK
+                    self.editor_state.update_marquee(img_x, img_y)
+                    self.editor_state.finish_marquee(add_to_selection=bool(shift_held))
                 # Finish moving/resizing
                 self.editor_state.finish_move()
-                self.drawing_area.queue_draw()
+                self._queue_overlay_redraw()
             elif self.editor_state.current_tool == ToolType.CALLOUT:
                 # Finish callout: show text dialog
                 if hasattr(self, "_callout_tail"):
@@ -2072,24 +2253,66 @@ class EditorWindow:
                     self._apply_crop()
             elif self.editor_state.current_tool != ToolType.TEXT:
                 self.editor_state.finish_drawing(img_x, img_y)
-                self.drawing_area.queue_draw()
+                self._queue_overlay_redraw()
         return True
 
     def _on_motion(self, widget: Gtk.Widget, event: Gdk.EventMotion) -> bool:
-        """Handle mouse motion."""
+        """Queue mouse motion to be applied on the next frame."""
         img_x, img_y = self._screen_to_image(event.x, event.y)
+        self._motion.push(img_x, img_y, event.state)
+        if self._motion_tick is None:
+            self._motion_tick = widget.add_tick_callback(self._on_motion_tick)
+            self._motion_widget = widget
+        return True
+
+    def _on_motion_tick(self, widget: Gtk.Widget, frame_clock: Gdk.FrameClock) -> bool:
+        """Apply the motion gathered since the last frame."""
+        self._motion_tick = None
+        self._motion_widget = None
+        self._flush_motion()
+        return GLib.SOURCE_REMOVE
+
+    def _cancel_motion(self) -> None:
+        """Drop queued motion and its pending tick (the tab is going away).
+
+        A tick on a drawing area that is no longer shown never fires, which
+        would leave _motion_tick set and stop motion being scheduled.
+        """
+        if self._motion_tick is not None and self._motion_widget is not None:
+            self._motion_widget.remove_tick_callback(self._motion_tick)
+        self._motion_tick = None
+        self._motion_widget = None
+        self._motion.clear()
+
+    def _flush_motion(self) -> None:
+        """Apply queued motion: every sample for freehand strokes, else the latest."""
+        freehand = (
+            self.editor_state.is_drawing
+            and self.editor_state.current_tool in FREEHAND_TOOLS
+        )
+        events = self._motion.take(keep_all=freehand)
+        if not events:
+            return
+        for img_x, img_y, _state in events[:-1]:
+            self.editor_state.continue_drawing(img_x, img_y)
+        self._apply_motion(*events[-1])
 
+    def _apply_motion(self, img_x: float, img_y: float, state: Any) -> None:
+        """Update the editor for the pointer at (img_x, img_y)."""
         # Handle SELECT tool dragging (move/resize)
         if self.editor_state.current_tool == ToolType.SELECT:
-            if self.editor_state._drag_start is not None:
+            if self.editor_state.marquee is not None:
+                self.editor_state.update_marquee(img_x, img_y)
+                self._queue_overlay_redraw()
+            elif self.editor_state._drag_start is not None:
                 # Shift locks aspect ratio during resize
-                shift = bool(event.state & Gdk.ModifierType.SHIFT_MASK)
+                shift = bool(state & Gdk.ModifierType.SHIFT_MASK)
                 if self.editor_state.move_selected(img_x, img_y, aspect_locked=shift):
-                    self.drawing_area.queue_draw()
+                    self._queue_overlay_redraw()
             else:
                 # Update cursor based on hover position
                 self._update_resize_cursor(img_x, img_y)
-            return True
+            return
 
         if self.editor_state.is_drawing:
             if self.editor_state.current_tool == ToolType.CALLOUT:
@@ -2101,7 +2324,7 @@ class EditorWindow:
                 # Update crop selection with aspect ratio lock
                 if hasattr(self, "_crop_start"):
                     # Check if shift is held for 1:1 aspect ratio
-                    shift = event.state & Gdk.ModifierType.SHIFT_MASK
+                    shift = state & Gdk.ModifierType.SHIFT_MASK
                     if shift:
                         # Lock to 1:1 (square)
                         dx = img_x - self._crop_start[0]
@@ -2116,8 +2339,7 @@ class EditorWindow:
                     self.drawing_area.queue_draw()
             elif self.editor_state.current_tool != ToolType.TEXT:
                 self.editor_state.continue_drawing(img_x, img_y)
-                self.drawing_area.queue_draw()
-        return True
+                self._queue_overlay_redraw()
 
     def _on_scroll(self, widget: Gtk.Widget, event: Gdk.EventScroll) -> bool:
         """Handle scroll events for zooming."""
@@ -2139,6 +2361,7 @@ class EditorWindow:
                     self.editor_state.zoom_out(1.1)
 
             self._update_zoom_label()
+            self._update_canvas_size()
             self.drawing_area.queue_draw()
             return True
         return False
@@ -2538,16 +2761,19 @@ class EditorWindow:
         if event.keyval in (Gdk.KEY_plus, Gdk.KEY_equal, Gdk.KEY_KP_Add):
             self.editor_state.zoom_in()
             self._update_zoom_label()
+            self._update_canvas_size()
             self.drawing_area.queue_draw()
             return True
         if event.keyval in (Gdk.KEY_minus, Gdk.KEY_KP_Subtract):
             self.editor_state.zoom_out()
             self._update_zoom_label()
+            self._update_canvas_size()
             self.drawing_area.queue_draw()
             return True
         if event.keyval == Gdk.KEY_0:
             self.editor_state.reset_zoom()
             self._update_zoom_label()
+            self._update_canvas_size()
             self.drawing_area.queue_draw()
             return True
 
@@ -2952,9 +3178,12 @@ class MainWindow:
                     "destroy", lambda w: setattr(self, "active_editor", None)
                 )
         else:
-            filepath = save_capture(result)
-            if filepath.success and cfg.get("show_notification", True):
-                show_screenshot_saved(str(filepath.filepath))
+
+            def saved(filepath: CaptureResult) -> None:
+                if filepath.success and cfg.get("show_notification", True):
+                    show_screenshot_saved(str(filepath.filepath), filepath.saved_bytes)
+
+            save_capture_async(result, saved, optimize=configured_preset(cfg))
 
     def _register_global_hotkeys(self) -> None:
         """Register global keyboard shortcuts."""
@@ -3308,11 +3537,14 @@ class MainWindow:
             if cfg.get("editor_enabled", True):
                 EditorWindow(capture_result)
             else:
-                from .capture import save_capture
 
-                saved = save_capture(capture_result)
-                if saved.success:
-                    show_screenshot_saved(str(saved.filepath))
+                def saved(saved: CaptureResult) -> None:
+                    if saved.success:
+                        show_screenshot_saved(str(saved.filepath), saved.saved_bytes)
+
+                save_capture_async(
+                    capture_result, saved, optimize=configured_preset(cfg)
+                )
         else:
             show_notification(
                 "Scroll Capture Failed", result.error, icon="dialog-error"
@@ -3608,6 +3840,19 @@ class SettingsDialog:
         self.auto_save_check.set_active(self.cfg.get("auto_save", False))
         box.pack_start(self.auto_save_check, False, False, 0)
 
+        png_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        self.png_optimize_check = Gtk.CheckButton(label=_("Optimize auto-saved PNGs:"))
+        self.png_optimize_check.set_active(self.cfg.get("png_optimize", False))
+        self.png_preset_combo = Gtk.ComboBoxText()
+        for preset in PNG_PRESETS:
+            self.png_preset_combo.append(preset, _(preset.capitalize()))
+        self.png_preset_combo.set_active_id(
+            self.cfg.get("png_preset", DEFAULT_PNG_PRESET)
+        )
+        png_box.pack_start(self.png_optimize_check, False, False, 0)
+        png_box.pack_start(self.png_preset_combo, False, False, 0)
+        box.pack_start(png_box, False, False, 0)
+
         self.clipboard_check = Gtk.CheckButton(
             label=_("Copy to clipboard automatically")
         )
@@ -3979,6 +4224,29 @@ class SettingsDialog:
         self.snap_grid_check.set_active(self.cfg.get("snap_to_grid", False))
         box.pack_start(self.snap_grid_check, False, False, 0)
 
+        # Pixelate block size slider
+        pixel_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        pixel_label = Gtk.Label(label=_("Pixelate block size:"), xalign=0)
+        pixel_label.set_size_request(150, -1)
+        self.pixelate_size_value = Gtk.Label(
+            label=f"{self.cfg.get('pixelate_size', 15)}px"
+        )
+        self.pixelate_size_value.set_size_request(50, -1)
+        self.pixelate_size_scale = Gtk.Scale.new_with_range(
+            Gtk.Orientation.HORIZONTAL, 2, 100, 1
+        )
+        self.pixelate_size_scale.set_value(self.cfg.get("pixelate_size", 15))
+        self.pixelate_size_scale.set_draw_value(False)
+        self.pixelate_size_scale.set_hexpand(True)
+        self.pixelate_size_scale.connect(
+            "value-changed",
+            lambda s: self.pixelate_size_value.set_text(f"{int(s.get_value())}px"),
+        )
+        pixel_box.pack_start(pixel_label, False, False, 0)
+        pixel_box.pack_start(self.pixelate_size_scale, True, True, 0)
+        pixel_box.pack_start(self.pixelate_size_value, False, False, 0)
+        box.pack_start(pixel_box, False, False, 0)
+
         box.pack_start(Gtk.Separator(), False, False, 10)
 
         # Grid info
@@ -4178,6 +4446,10 @@ class SettingsDialog:
         self.cfg["save_directory"] = self.dir_entry.get_text()
         self.cfg["default_format"] = self.format_combo.get_active_text() or "png"
         self.cfg["auto_save"] = self.auto_save_check.get_active()
+        self.cfg["png_optimize"] = self.png_optimize_check.get_active()
+        self.cfg["png_preset"] = (
+            self.png_preset_combo.get_active_id() or DEFAULT_PNG_PRESET
+        )
         self.cfg["copy_to_clipboard"] = self.clipboard_check.get_active()
         self.cfg["show_notification"] = self.notification_check.get_active()
         self.cfg["editor_enabled"] = self.editor_check.get_active()
@@ -4196,6 +4468,7 @@ class SettingsDialog:
         # Editor settings
         self.cfg["grid_size"] = int(self.grid_size_scale.get_value())
         self.cfg["snap_to_grid"] = self.snap_grid_check.get_active()
+        self.cfg["pixelate_size"] = int(self.pixelate_size_scale.get_value())
         # GIF settings
         self.cfg["gif_quality"] = self.gif_quality_combo.get_active_id() or "medium"
         self.cfg["gif_fps"] = int(self.gif_fps_spin.get_value())
@@ -4383,55 +4656,32 @@ def _extract_text(self):
 
 def _pin_to_desktop(self):
     """Pin screenshot to desktop."""
-    try:
-        import cairo
-
-        width = self.result.pixbuf.get_width()
-        height = self.result.pixbuf.get_height()
-
-        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
-        ctx = cairo.Context(surface)
-
-        Gdk.cairo_set_source_pixbuf(ctx, self.result.pixbuf, 0, 0)
-        ctx.paint()
-
-        if self.editor_state.elements:
-            from .editor import render_elements
-
-            render_elements(surface, self.editor_state.elements, self.result.pixbuf)
 
-        from gi.repository import GdkPixbuf
-
-        data = surface.get_data()
-        pinned_pixbuf = GdkPixbuf.Pixbuf.new_from_data(
-            data,
-            GdkPixbuf.Colorspace.RGB,
-            True,
-            8,
-            width,
-            height,
-            cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, width),
-        )
+    def pin(pinned_pixbuf):
+        try:
+            PinnedWindow(pinned_pixbuf, "Pinned Screenshot")
+        except Exception as e:
+            failed(e)
+            return
 
-        PinnedWindow(pinned_pixbuf, "Pinned Screenshot")
         self.statusbar.push(self.statusbar_context, "Pinned to desktop")
         show_notification(
             "Pinned to Desktop",
             "Screenshot is now always on top. Use controls to adjust.",
         )
 
-    except Exception as e:
+    def failed(e):
         self.statusbar.push(self.statusbar_context, f"Pin failed: {e}")
         show_notification(_("Pin Failed"), str(e), icon="dialog-error")
 
+    self._composite_async(pin, failed)
+
 
 def _apply_shadow(self):
     """Apply shadow effect."""
     self.result.pixbuf = add_shadow(self.result.pixbuf, shadow_size=15, opacity=0.3)
     self.editor_state.set_pixbuf(self.result.pixbuf)
-    self.drawing_area.set_size_request(
-        self.result.pixbuf.get_width(), self.result.pixbuf.get_height()
-    )
+    self._update_canvas_size()
     self.drawing_area.queue_draw()
     self.statusbar.push(self.statusbar_context, "Shadow effect applied")
 
@@ -4449,9 +4699,7 @@ def _apply_border(self):
         color = (rgba.red, rgba.green, rgba.blue, rgba.alpha)
         self.result.pixbuf = add_border(self.result.pixbuf, border_width=8, color=color)
         self.editor_state.set_pixbuf(self.result.pixbuf)
-        self.drawing_area.set_size_request(
-            self.result.pixbuf.get_width(), self.result.pixbuf.get_height()
-        )
+        self._update_canvas_size()
         self.drawing_area.queue_draw()
         self.statusbar.push(self.statusbar_context, "Border added")
 
@@ -4473,9 +4721,7 @@ def _apply_background(self):
             self.result.pixbuf, bg_color=color, padding=25
         )
         self.editor_state.set_pixbuf(self.result.pixbuf)
-        self.drawing_area.set_size_request(
-            self.result.pixbuf.get_width(), self.result.pixbuf.get_height()
-        )
+        self._update_canvas_size()
         self.drawing_area.queue_draw()
         self.statusbar.push(self.statusbar_context, "Background added")
 
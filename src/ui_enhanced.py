@@ -156,18 +156,9 @@ class EditorWindowEnhancements:
                 render_elements(surface, self.editor_state.elements, self.result.pixbuf)
 
             # Convert to pixbuf
-            from gi.repository import GdkPixbuf
-
-            data = surface.get_data()
-            pinned_pixbuf = GdkPixbuf.Pixbuf.new_from_data(
-                data,
-                GdkPixbuf.Colorspace.RGB,
-                True,
-                8,
-                width,
-                height,
-                cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, width),
-            )
+            from .image import pixbuf_from_surface
+
+            pinned_pixbuf = pixbuf_from_surface(surface)
 
             # Create pinned window
             PinnedWindow(pinned_pixbuf, "Pinned Screenshot")
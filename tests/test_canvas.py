@@ -0,0 +1,328 @@
+"""Tests for the editor canvas layer caches."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from src import canvas
+from src.canvas import (
+    CAIRO_MAX_DIMENSION,
+    AnnotationLayer,
+    DamageTracker,
+    DragSprites,
+    ImagePyramid,
+    PixelGrid,
+    ZoomedView,
+    intersect_rects,
+    merge_rects,
+    rects_intersect,
+    to_device_rect,
+    uses_nearest,
+    view_rect,
+)
+from src.editor import DrawingElement, Point, ToolType
+
+
+def _pixbuf(width, height):
+    pixbuf = MagicMock()
+    pixbuf.get_width.return_value = width
+    pixbuf.get_height.return_value = height
+    return pixbuf
+
+
+@pytest.fixture
+def layer(monkeypatch):
+    """AnnotationLayer whose rendering is replaced by a sentinel factory."""
+    layer = AnnotationLayer()
+    monkeypatch.setattr(layer, "_render", lambda *args: object())
+    return layer
+
+
+class TestAnnotationLayer:
+    """Test AnnotationLayer rebuild logic."""
+
+    def test_layer_size_scales(self):
+        assert AnnotationLayer.layer_size(_pixbuf(100, 50), 2.0) == (200, 100)
+        assert AnnotationLayer.layer_size(_pixbuf(100, 50), 0.001) == (1, 1)
+
+    def test_fits_within_budget(self):
+        layer = AnnotationLayer(max_pixels=10_000)
+        assert layer.fits(_pixbuf(100, 100), 1.0)
+        assert not layer.fits(_pixbuf(100, 100), 2.0)
+
+    def test_does_not_fit_beyond_cairo_limit(self):
+        layer = AnnotationLayer(max_pixels=10**12)
+        assert not layer.fits(_pixbuf(10, CAIRO_MAX_DIMENSION + 1), 1.0)
+
+    def test_reuses_surface_when_unchanged(self, layer):
+        pixbuf = _pixbuf(10, 10)
+        first = layer.get_surface(pixbuf, [], generation=1)
+        second = layer.get_surface(pixbuf, [], generation=1)
+        assert first is second
+        assert layer.rebuilds == 1
+
+    def test_rebuilds_on_generation_change(self, layer):
+        pixbuf = _pixbuf(10, 10)
+        first = layer.get_surface(pixbuf, [], generation=1)
+        second = layer.get_surface(pixbuf, [], generation=2)
+        assert first is not second
+        assert layer.rebuilds == 2
+
+    def test_rebuilds_on_zoom_or_extra_key(self, layer):
+        pixbuf = _pixbuf(10, 10)
+        layer.get_surface(pixbuf, [], 1, scale=1.0)
+        layer.get_surface(pixbuf, [], 1, scale=2.0)
+        layer.get_surface(pixbuf, [], 1, scale=2.0, extra_key=(True, 20))
+        assert layer.rebuilds == 3
+
+    def test_rebuilds_on_new_pixbuf(self, layer):
+        layer.get_surface(_pixbuf(10, 10), [], 1)
+        layer.get_surface(_pixbuf(10, 10), [], 1)
+        assert layer.rebuilds == 2
+
+    def test_rebuilds_on_render_cache_invalidation(self, layer):
+        from src.render_cache import RenderCache
+
+        cache = RenderCache()
+        pixbuf = _pixbuf(10, 10)
+        layer.get_surface(pixbuf, [], 1, render_cache=cache)
+        cache.invalidate()
+        layer.get_surface(pixbuf, [], 1, render_cache=cache)
+        assert layer.rebuilds == 2
+
+    def test_invalidate(self, layer):
+        pixbuf = _pixbuf(10, 10)
+        layer.get_surface(pixbuf, [], 1)
+        layer.invalidate()
+        layer.get_surface(pixbuf, [], 1)
+        assert layer.rebuilds == 2
+
+
+class TestRects:
+    """Test damage rectangle helpers."""
+
+    def test_rects_intersect(self):
+        assert rects_intersect((0, 0, 10, 10), (5, 5, 15, 15))
+        assert not rects_intersect((0, 0, 10, 10), (10, 0, 20, 10))
+
+    def test_intersect_rects(self):
+        assert intersect_rects((0, 0, 10, 10), (5, -5, 20, 5)) == (5, 0, 10, 5)
+        assert intersect_rects((0, 0, 10, 10), (20, 20, 30, 30)) is None
+
+    def test_merge_overlapping(self):
+        merged = merge_rects([(0, 0, 10, 10), (5, 5, 15, 15)])
+        assert merged == [(0, 0, 15, 15)]
+
+    def test_merge_keeps_disjoint(self):
+        rects = [(0, 0, 10, 10), (100, 100, 110, 110)]
+        assert merge_rects(rects) == rects
+
+    def test_merge_chains(self):
+        # The third rect bridges the first two
+        merged = merge_rects([(0, 0, 10, 10), (20, 0, 30, 10), (8, 0, 22, 10)])
+        assert merged == [(0, 0, 30, 10)]
+
+    def test_to_device_rect_scales_and_pads(self):
+        assert to_device_rect((10, 10, 20, 20), 2.0, 1000, 1000) == (19, 19, 22, 22)
+
+    def test_to_device_rect_clamps(self):
+        assert to_device_rect((-50, -50, 20, 20), 1.0, 10, 10) == (0, 0, 10, 10)
+        assert to_device_rect((50, 50, 60, 60), 1.0, 10, 10) is None
+
+
+class TestDamageTracker:
+    """Test DamageTracker old/new area bookkeeping."""
+
+    def test_initial_damage_is_new_area(self):
+        tracker = DamageTracker()
+        assert tracker.damage([(0, 0, 10, 10)]) == [(0, 0, 10, 10)]
+
+    def test_damage_includes_drawn_area(self):
+        tracker = DamageTracker()
+        tracker.drawn([(0, 0, 10, 10)])
+        assert tracker.damage([(5, 0, 15, 10)]) == [(0, 0, 15, 10)]
+
+    def test_cleared_overlay_repaints_old_area(self):
+        tracker = DamageTracker()
+        tracker.drawn([(0, 0, 10, 10)])
+        assert tracker.damage([]) == [(0, 0, 10, 10)]
+
+
+class _FakeSurface:
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+
+    def get_width(self):
+        return self.width
+
+    def get_height(self):
+        return self.height
+
+
+@pytest.fixture
+def pyramid(monkeypatch):
+    """ImagePyramid with cairo conversions replaced by fake surfaces."""
+    monkeypatch.setattr(
+        canvas,
+        "_surface_from_pixbuf",
+        lambda pb: _FakeSurface(pb.get_width(), pb.get_height()),
+    )
+    monkeypatch.setattr(
+        canvas,
+        "_downscale_half",
+        lambda s: _FakeSurface(max(1, (s.width + 1) // 2), max(1, (s.height + 1) // 2)),
+    )
+    return ImagePyramid()
+
+
+class TestImagePyramid:
+    """Test ImagePyramid level selection and caching."""
+
+    def test_level_for(self):
+        assert ImagePyramid.level_for(2.0) == 0
+        assert ImagePyramid.level_for(1.0) == 0
+        assert ImagePyramid.level_for(0.75) == 0
+        assert ImagePyramid.level_for(0.5) == 1
+        assert ImagePyramid.level_for(0.3) == 1
+        assert ImagePyramid.level_for(0.25) == 2
+
+    def test_levels_built_lazily(self, pyramid):
+        pixbuf = _pixbuf(1000, 600)
+        full = pyramid.get_level(pixbuf, 0)
+        assert (full.width, full.height) == (1000, 600)
+        assert len(pyramid) == 1
+        quarter = pyramid.get_level(pixbuf, 2)
+        assert (quarter.width, quarter.height) == (250, 150)
+        assert len(pyramid) == 3
+
+    def test_levels_are_reused(self, pyramid):
+        pixbuf = _pixbuf(100, 100)
+        assert pyramid.get_level(pixbuf, 1) is pyramid.get_level(pixbuf, 1)
+
+    def test_stops_at_one_pixel(self, pyramid):
+        surface = pyramid.get_level(_pixbuf(4, 2), 10)
+        assert (surface.width, surface.height) == (1, 1)
+
+    def test_generation_invalidates(self, pyramid):
+        pixbuf = _pixbuf(100, 100)
+        first = pyramid.get_level(pixbuf, 0, generation=1)
+        assert pyramid.get_level(pixbuf, 0, generation=2) is not first
+
+    def test_new_pixbuf_invalidates(self, pyramid):
+        first = pyramid.get_level(_pixbuf(100, 100), 0)
+        assert pyramid.get_level(_pixbuf(100, 100), 0) is not first
+
+    def test_too_large_for_cairo(self, pyramid):
+        assert pyramid.get_level(_pixbuf(10, CAIRO_MAX_DIMENSION + 1), 0) is None
+
+
+@pytest.fixture
+def sprites(monkeypatch):
+    """DragSprites whose rendering is replaced by a sentinel factory."""
+    sprites = DragSprites()
+    monkeypatch.setattr(sprites, "_render", lambda *args: object())
+    return sprites
+
+
+def _rect_element(x1, y1, x2, y2):
+    return DrawingElement(
+        tool=ToolType.RECTANGLE, points=[Point(x1, y1), Point(x2, y2)], stroke_width=0
+    )
+
+
+class TestDragSprites:
+    """Test DragSprites caching and compositing."""
+
+    def test_sprite_rect_covers_extents(self):
+        x, y, width, height = DragSprites.sprite_rect(_rect_element(10, 10, 20, 30), 2.0)
+        assert (x, y) == (16, 16)
+        assert (x + width, y + height) == (44, 64)
+
+    def test_renders_once_per_drag(self, sprites):
+        pixbuf = _pixbuf(100, 100)
+        elements = [_rect_element(0, 0, 10, 10), _rect_element(20, 20, 30, 30)]
+        assert sprites.begin(pixbuf, elements, 5, (1.0, 0.0), key=frozenset({0, 1}))
+        assert sprites.begin(pixbuf, elements, 6, (2.0, 0.0), key=frozenset({0, 1}))
+        assert sprites.renders == 1
+        assert sprites.generation == 5
+        assert sprites.active
+
+    def test_rerenders_on_zoom_or_selection(self, sprites):
+        pixbuf = _pixbuf(100, 100)
+        elements = [_rect_element(0, 0, 10, 10)]
+        sprites.begin(pixbuf, elements, 1, (0.0, 0.0), key=frozenset({0}))
+        sprites.begin(pixbuf, elements, 1, (0.0, 0.0), scale=2.0, key=frozenset({0}))
+        sprites.begin(pixbuf, elements, 1, (0.0, 0.0), scale=2.0, key=frozenset({1}))
+        assert sprites.renders == 3
+
+    def test_end_drops_sprites(self, sprites):
+        sprites.begin(_pixbuf(10, 10), [_rect_element(0, 0, 1, 1)], 1, (0.0, 0.0))
+        sprites.end()
+        assert not sprites.active
+
+    def test_too_large_is_refused(self, sprites):
+        sprites.max_pixels = 100
+        assert not sprites.begin(
+            _pixbuf(100, 100), [_rect_element(0, 0, 50, 50)], 1, (0.0, 0.0)
+        )
+        assert not sprites.active
+
+    def test_paint_offsets_by_drag_since_begin(self, sprites):
+        element = _rect_element(10, 10, 20, 20)
+        sprites.begin(_pixbuf(100, 100), [element], 1, (5.0, 5.0), scale=2.0)
+        ctx = MagicMock()
+        sprites.paint(ctx, (8.0, 4.0), scale=2.0)
+        surface, x, y = ctx.set_source_surface.call_args[0]
+        assert (x, y) == (16 + 6, 16 - 2)
+        ctx.paint.assert_called_once()
+
+
+@pytest.fixture
+def view(monkeypatch):
+    """ZoomedView whose rendering is replaced by a sentinel factory."""
+    view = ZoomedView()
+    monkeypatch.setattr(view, "_render", lambda *args: (object(), (0, 0)))
+    return view
+
+
+class TestPixelInspection:
+    """Test nearest-neighbour zoom and the pixel grid."""
+
+    def test_nearest_only_beyond_200_percent(self):
+        assert not uses_nearest(1.0)
+        assert not uses_nearest(2.0)
+        assert uses_nearest(2.5)
+
+    def test_view_rect_aligns_and_clamps(self):
+        assert view_rect((40, 70, 100.5, 130), 1000, 1000) == (32, 64, 128, 160)
+        assert view_rect((-10, -10, 50, 50), 40, 1000) == (0, 0, 40, 64)
+        assert view_rect((500, 500, 600, 600), 100, 100) is None
+
+    def test_view_reused_for_small_scrolls(self, view):
+        pixbuf = _pixbuf(1000, 1000)
+        ctx = MagicMock()
+        view.paint(ctx, pixbuf, 4.0, (40, 40, 100, 100), MagicMock())
+        view.paint(ctx, pixbuf, 4.0, (45, 50, 105, 110), MagicMock())
+        assert view.rebuilds == 1
+        view.paint(ctx, pixbuf, 4.0, (90, 50, 150, 110), MagicMock())
+        assert view.rebuilds == 2
+        assert ctx.paint.call_count == 3
+
+    def test_view_rebuilds_on_zoom_or_generation(self, view):
+        pixbuf = _pixbuf(1000, 1000)
+        visible = (0, 0, 100, 100)
+        view.paint(MagicMock(), pixbuf, 4.0, visible, MagicMock())
+        view.paint(MagicMock(), pixbuf, 5.0, visible, MagicMock())
+        view.paint(MagicMock(), pixbuf, 5.0, visible, MagicMock(), generation=1)
+        assert view.rebuilds == 3
+        view.invalidate()
+        view.paint(MagicMock(), pixbuf, 5.0, visible, MagicMock(), generation=1)
+        assert view.rebuilds == 4
+
+    def test_pixel_grid_threshold(self):
+        grid = PixelGrid()
+        assert not grid.visible(4.0)
+        assert grid.visible(8.0)
+        ctx = MagicMock()
+        grid.paint(ctx, 4.0, 100, 100)
+        ctx.paint.assert_not_called()
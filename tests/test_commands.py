@@ -296,6 +296,20 @@ class TestCommandCallbacks:
         redo_cmd.callback()
         mock_editor._redo.assert_called_once()
 
+    def test_zoom_commands_resize_canvas(self):
+        from src.commands import build_command_registry
+
+        mock_editor = MagicMock()
+        commands = build_command_registry(mock_editor)
+
+        for name in ("Zoom In", "Zoom Out", "Reset Zoom"):
+            mock_editor.reset_mock()
+            cmd = next(c for c in commands if c.name == name)
+            cmd.callback()
+            mock_editor._update_zoom_label.assert_called_once()
+            mock_editor._update_canvas_size.assert_called_once()
+            mock_editor.drawing_area.queue_draw.assert_called_once()
+
 
 class TestCommandEdgeCases:
     """Test edge cases for Command class."""
@@ -0,0 +1,132 @@
+"""Tests for the shared export compositor."""
+
+import threading
+
+import pytest
+
+from src import compositor, saving
+from src.compositor import ExportCompositor
+from src.editor import EditorState, ToolType
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Replace the tile renderer with one recording its calls."""
+    calls = []
+
+    def fake_render(pixbuf, elements, cache=None):
+        calls.append((pixbuf, list(elements), threading.current_thread()))
+        return ("composite", len(calls))
+
+    monkeypatch.setattr(compositor, "render_annotated", fake_render)
+    monkeypatch.setattr(saving, "GLIB_AVAILABLE", False)
+    return calls
+
+
+class TestExportCompositor:
+    """Test reuse of the flattened image."""
+
+    def test_unchanged_document_renders_once(self, renders):
+        comp = ExportCompositor()
+        base = object()
+        first = comp.composite(base, [], 3)
+        assert comp.composite(base, [], 3) is first
+        assert comp.renders == 1
+        assert comp.cached(base, 3) is first
+
+    def test_new_generation_or_image_renders_again(self, renders):
+        comp = ExportCompositor()
+        base = object()
+        comp.composite(base, [], 1)
+        comp.composite(base, [], 2)
+        comp.composite(object(), [], 2)
+        assert comp.renders == 3
+        assert comp.cached(base, 2) is None
+
+    def test_new_image_drops_effect_rasters(self, renders):
+        comp = ExportCompositor()
+        base = object()
+        comp.composite(base, [], 1)
+        comp.cache.put(("blur", id(base)), "raster", 10)
+        comp.composite(base, [], 2)
+        assert comp.cache.get(("blur", id(base))) == "raster"
+        comp.composite(object(), [], 2)
+        assert comp.cache.get(("blur", id(base))) is None
+
+    def test_invalidate(self, renders):
+        comp = ExportCompositor()
+        base = object()
+        comp.composite(base, [], 1)
+        generation = comp.cache.generation
+        comp.invalidate()
+        assert comp.cached(base, 1) is None
+        assert comp.cache.generation == generation + 1
+
+
+class TestCompositeAsync:
+    """Test flattening off the calling thread."""
+
+    def test_renders_on_worker(self, renders):
+        comp = ExportCompositor()
+        results = []
+        thread = comp.composite_async(object(), [], 1, results.append)
+        thread.join()
+        assert results == [("composite", 1)]
+        assert renders[0][2] is not threading.current_thread()
+
+    def test_up_to_date_composite_is_delivered_directly(self, renders):
+        comp = ExportCompositor()
+        base = object()
+        composite = comp.composite(base, [], 1)
+        results = []
+        assert comp.composite_async(base, [], 1, results.append) is None
+        assert results == [composite]
+
+    def test_errors_go_to_on_error(self, monkeypatch):
+        def broken(pixbuf, elements, cache=None):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(compositor, "render_annotated", broken)
+        monkeypatch.setattr(saving, "GLIB_AVAILABLE", False)
+        comp = ExportCompositor()
+        errors = []
+        comp.composite_async(object(), [], 1, errors.append, errors.append).join()
+        assert len(errors) == 1 and str(errors[0]) == "boom"
+        assert comp.renders == 0
+
+
+class TestExportSnapshot:
+    """Test that exported element lists are isolated from later edits."""
+
+    def _state_with_line(self):
+        state = EditorState()
+        state.set_tool(ToolType.LINE)
+        state.start_drawing(0, 0)
+        state.continue_drawing(10, 10)
+        state.finish_drawing(10, 10)
+        return state
+
+    def test_edits_after_snapshot_copy_the_element(self):
+        state = self._state_with_line()
+        snapshot = state.export_snapshot()
+        original = snapshot[0]
+        x = original.points[0].x
+
+        state.select_at(5, 5)
+        state.move_selected(20, 0)
+        state.finish_move()
+
+        assert state.elements[0] is not original
+        assert original.points[0].x == x
+        assert state.elements[0].points[0].x != x
+
+    def test_points_are_baked_into_private_arrays(self):
+        state = self._state_with_line()
+        live = state.elements[0].points
+        live.rotate(5, 5, 0.5)
+        snapshot = state.export_snapshot()
+        points = snapshot[0].points
+        assert points is not live
+        assert points.matrix is None
+        assert points.raw()[0] is not live.raw()[0]
+        assert points == live
@@ -129,6 +129,20 @@ class TestEditorSettings:
         grid_size = DEFAULT_CONFIG["grid_size"]
         assert 5 <= grid_size <= 100
 
+    def test_default_config_has_pixelate_size(self):
+        assert "pixelate_size" in DEFAULT_CONFIG
+        assert 2 <= DEFAULT_CONFIG["pixelate_size"] <= 100
+
+    def test_default_config_has_stroke_tolerance(self):
+        assert "stroke_tolerance" in DEFAULT_CONFIG
+        assert 0 <= DEFAULT_CONFIG["stroke_tolerance"] <= 5
+
+    def test_default_config_has_undo_memory(self):
+        assert DEFAULT_CONFIG["undo_memory_mb"] >= 1
+
+    def test_default_config_has_picker_sample_size(self):
+        assert DEFAULT_CONFIG["picker_sample_size"] in (1, 3, 5)
+
     def test_load_config_includes_editor_settings(self):
         cfg = load_config()
         assert "grid_size" in cfg
@@ -171,3 +185,8 @@ class TestCheckToolAvailable:
         mock_run.return_value = MagicMock(returncode=0)
         result = check_tool_available(["working_tool", "--version"])
         assert result is True
+
+
+def test_png_optimizer_is_opt_in():
+    assert DEFAULT_CONFIG["png_optimize"] is False
+    assert DEFAULT_CONFIG["png_preset"] == "balanced"
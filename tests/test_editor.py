@@ -1,6 +1,8 @@
 """Tests for editor module."""
 
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
+
+import pytest
 
 import sys
 from pathlib import Path
@@ -2755,6 +2757,21 @@ class TestRotate:
         # Should return False because all selected are locked
         assert not state.rotate_selected(90)
 
+    def test_rotated_stroke_stays_unbaked(self):
+        state = EditorState()
+        state.elements.append(
+            DrawingElement(
+                tool=ToolType.PEN, points=[Point(i, (i * 7) % 13) for i in range(500)]
+            )
+        )
+        state.selected_indices = {0}
+        assert state.rotate_selected(90)
+        # The selection box and the spatial index don't bake the points
+        x1, y1, x2, y2 = state._get_element_bbox(state.elements[0])
+        state._sync_spatial_index()
+        assert state.elements[0].points.matrix is not None
+        assert (x2 - x1, y2 - y1) == pytest.approx((12, 499))
+
 
 class TestOpacity:
     """Test opacity/transparency functionality."""
@@ -3035,3 +3052,1101 @@ class TestGridSnap:
         x, y = state._snap_to_grid(40, 60)
         assert x == 40
         assert y == 60
+
+
+def _legacy_box_blur(pixels, rowstride, n_channels, img_w, img_h, region, radius):
+    """Reference implementation: the original per-pixel nested-loop blur."""
+    x1, y1, x2, y2 = region
+    out = bytearray()
+    for py in range(y1, y2):
+        for px in range(x1, x2):
+            sums = [0, 0, 0]
+            count = 0
+            for dy in range(-radius, radius + 1):
+                for dx in range(-radius, radius + 1):
+                    sx = max(0, min(img_w - 1, px + dx))
+                    sy = max(0, min(img_h - 1, py + dy))
+                    offset = sy * rowstride + sx * n_channels
+                    for c in range(3):
+                        sums[c] += pixels[offset + c]
+                    count += 1
+            offset = py * rowstride + px * n_channels
+            out.extend(s // count for s in sums)
+            out.extend(pixels[offset + 3 : offset + n_channels])
+    return bytes(out)
+
+
+class TestBlurKernels:
+    """Test the vectorized and fallback blur kernels against the original."""
+
+    def _make_image(self, width, height, n_channels, rowstride):
+        import random
+
+        rng = random.Random(42)
+        return bytes(rng.randrange(256) for _ in range(rowstride * height))
+
+    def test_python_fallback_matches_legacy(self):
+        from src.editor import _box_blur_python
+
+        w, h, n, stride = 13, 9, 4, 13 * 4 + 4  # padded rowstride
+        pixels = self._make_image(w, h, n, stride)
+        region = (2, 1, 11, 8)
+        expected = _legacy_box_blur(pixels, stride, n, w, h, region, 3)
+        result = _box_blur_python(pixels, stride, n, w, h, region, 3)
+        assert bytes(result) == expected
+
+    def test_python_fallback_rgb_image(self):
+        from src.editor import _box_blur_python
+
+        w, h, n, stride = 7, 6, 3, 7 * 3 + 3
+        pixels = self._make_image(w, h, n, stride)
+        region = (0, 0, w, h)
+        expected = _legacy_box_blur(pixels, stride, n, w, h, region, 2)
+        assert bytes(_box_blur_python(pixels, stride, n, w, h, region, 2)) == expected
+
+    def test_numpy_matches_legacy(self):
+        np = pytest.importorskip("numpy")
+        from src.editor import _box_blur_numpy
+
+        w, h, n, stride = 17, 11, 4, 17 * 4 + 4
+        pixels = self._make_image(w, h, n, stride)
+        view = np.ndarray(
+            shape=(h, w, n), dtype=np.uint8, buffer=pixels, strides=(stride, n, 1)
+        )
+        region = (3, 2, 15, 10)
+        expected = _legacy_box_blur(pixels, stride, n, w, h, region, 4)
+        result = _box_blur_numpy(view, *region, 4)
+        assert result.shape == (8, 12, 4)
+        assert result.tobytes() == expected
+
+    def test_numpy_zero_radius_is_identity(self):
+        np = pytest.importorskip("numpy")
+        from src.editor import _box_blur_numpy
+
+        arr = np.arange(5 * 4 * 3, dtype=np.uint8).reshape(5, 4, 3)
+        result = _box_blur_numpy(arr, 0, 0, 4, 5, 0)
+        assert np.array_equal(result, arr)
+
+    def test_clamp_region(self):
+        from src.editor import _clamp_region
+
+        assert _clamp_region(-5, -5, 20, 20, 10, 10) == (0, 0, 10, 10)
+        assert _clamp_region(3, 4, 2, 2, 10, 10) == (3, 4, 5, 6)
+        x1, y1, x2, y2 = _clamp_region(20, 20, 5, 5, 10, 10)
+        assert x2 <= x1 and y2 <= y1
+
+
+def _legacy_pixelate(pixels, rowstride, n_channels, region, size):
+    """Reference implementation: per-pixel block lookup (region only).
+
+    Blocks are cells of a grid anchored at the image origin, clipped to
+    the region.
+    """
+    x1, y1, x2, y2 = region
+    out = bytearray(pixels)
+    sums = {}
+    for py in range(y1, y2):
+        for px in range(x1, x2):
+            offset = py * rowstride + px * n_channels
+            block = sums.setdefault((px // size, py // size), [0, 0, 0, 0])
+            for c in range(3):
+                block[c] += pixels[offset + c]
+            block[3] += 1
+    for py in range(y1, y2):
+        for px in range(x1, x2):
+            offset = py * rowstride + px * n_channels
+            block = sums[(px // size, py // size)]
+            for c in range(3):
+                out[offset + c] = block[c] // block[3]
+    # Crop the full-image result down to the region
+    result = bytearray()
+    for py in range(y1, y2):
+        start = py * rowstride + x1 * n_channels
+        result.extend(out[start : start + (x2 - x1) * n_channels])
+    return bytes(result)
+
+
+class TestPixelateKernels:
+    """Test the block-mean pixelate kernels against a reference."""
+
+    def _make_image(self, height, rowstride):
+        import random
+
+        rng = random.Random(7)
+        return bytes(rng.randrange(256) for _ in range(rowstride * height))
+
+    def test_python_fallback_matches_legacy(self):
+        from src.editor import _pixelate_python
+
+        w, h, n, stride = 23, 17, 4, 23 * 4 + 4
+        pixels = self._make_image(h, stride)
+        region = (1, 2, 22, 16)  # Ragged blocks on both edges
+        expected = _legacy_pixelate(pixels, stride, n, region, 5)
+        assert bytes(_pixelate_python(pixels, stride, n, region, 5)) == expected
+
+    def test_numpy_matches_legacy(self):
+        np = pytest.importorskip("numpy")
+        from src.editor import _pixelate_numpy
+
+        w, h, n, stride = 23, 17, 3, 23 * 3 + 3
+        pixels = self._make_image(h, stride)
+        view = np.ndarray(
+            shape=(h, w, n), dtype=np.uint8, buffer=pixels, strides=(stride, n, 1)
+        )
+        region = (1, 2, 22, 16)
+        expected = _legacy_pixelate(pixels, stride, n, region, 6)
+        result = _pixelate_numpy(view, *region, 6)
+        assert result.shape == (14, 21, 3)
+        assert result.tobytes() == expected
+
+    def test_blocks_follow_image_grid(self):
+        from src.editor import _pixelate_python
+
+        # A 1-pixel-high strip; blocks of 4 start at x = 0, 4, 8
+        pixels = bytes(v for x in range(12) for v in (x * 10, 0, 0))
+        out = _pixelate_python(pixels, 36, 3, (2, 0, 11, 1), 4)
+        reds = list(out[0::3])
+        # (20 + 30) / 2, mean of 40..70, mean of 80..100
+        assert reds == [25, 25, 55, 55, 55, 55, 90, 90, 90]
+
+    def test_block_means_match_kernel(self):
+        np = pytest.importorskip("numpy")
+        from src.editor import _block_means_numpy, _block_means_python
+
+        w, h, n, stride = 23, 17, 3, 23 * 3
+        pixels = self._make_image(h, stride)
+        view = np.frombuffer(pixels, dtype=np.uint8).reshape(h, w, n)
+        region = (3, 5, 22, 16)
+        means = _block_means_numpy(view, *region, 6)
+        assert means.shape == (3, 4, 3)
+        assert means.tolist() == [
+            [list(avg) for avg in row]
+            for row in _block_means_python(pixels, stride, n, region, 6)
+        ]
+
+    def test_numpy_block_is_uniform(self):
+        np = pytest.importorskip("numpy")
+        from src.editor import _pixelate_numpy
+
+        arr = np.arange(8 * 8 * 4, dtype=np.uint8).reshape(8, 8, 4)
+        result = _pixelate_numpy(arr, 0, 0, 8, 8, 4)
+        block = result[:4, :4, :3].reshape(-1, 3)
+        assert (block == block[0]).all()
+        # Alpha channel is left untouched
+        assert np.array_equal(result[:, :, 3], arr[:, :, 3])
+
+
+class TestPixelSize:
+    """Test configurable pixelate block size."""
+
+    def test_default_pixel_size(self):
+        state = EditorState()
+        assert state.pixel_size == 15
+
+    def test_set_pixel_size_clamped(self):
+        state = EditorState()
+        state.set_pixel_size(1)
+        assert state.pixel_size == 2
+        state.set_pixel_size(500)
+        assert state.pixel_size == 100
+
+    def test_pixelate_element_uses_state_pixel_size(self):
+        state = EditorState()
+        state.set_tool(ToolType.PIXELATE)
+        state.set_pixel_size(24)
+        state.start_drawing(0, 0)
+        state.finish_drawing(50, 50)
+        assert state.elements[0].pixel_size == 24
+
+
+class TestEffectRenderCache:
+    """Test blur/pixelate raster cache keys and invalidation."""
+
+    def _blur_element(self, x1=10, y1=10, x2=60, y2=40):
+        return DrawingElement(
+            tool=ToolType.BLUR, points=[Point(x1, y1), Point(x2, y2)]
+        )
+
+    def test_key_stable_for_unchanged_element(self):
+        from src.editor import _effect_cache_key
+
+        elem = self._blur_element()
+        base = object()
+        assert _effect_cache_key(elem, base, 0) == _effect_cache_key(elem, base, 0)
+
+    def test_key_changes_with_geometry(self):
+        from src.editor import _effect_cache_key
+
+        elem = self._blur_element()
+        base = object()
+        before = _effect_cache_key(elem, base, 0)
+        elem.points[1] = Point(80, 40)
+        assert _effect_cache_key(elem, base, 0) != before
+
+    def test_key_changes_with_size_and_generation(self):
+        from src.editor import _effect_cache_key
+
+        elem = self._blur_element()
+        base = object()
+        before = _effect_cache_key(elem, base, 0)
+        assert _effect_cache_key(elem, base, 1) != before
+        elem.blur_radius = 4
+        assert _effect_cache_key(elem, base, 0) != before
+
+    def test_pixelate_key_uses_pixel_size(self):
+        from src.editor import _effect_cache_key
+
+        elem = self._blur_element()
+        elem.tool = ToolType.PIXELATE
+        elem.pixel_size = 9
+        assert _effect_cache_key(elem, object(), 0)[3] == 9
+
+    def test_set_pixbuf_invalidates_cache(self):
+        state = EditorState()
+        state.render_cache.put("key", "raster", 10)
+        generation = state.render_cache.generation
+        state.set_pixbuf(MagicMock())
+        assert len(state.render_cache) == 0
+        assert state.render_cache.generation == generation + 1
+
+    def test_replace_pixbuf_keeps_elements(self):
+        state = EditorState(MagicMock())
+        state.set_tool(ToolType.RECTANGLE)
+        state.start_drawing(0, 0)
+        state.finish_drawing(10, 10)
+        state.render_cache.put("key", "raster", 10)
+        new_pixbuf = MagicMock()
+        state.replace_pixbuf(new_pixbuf)
+        assert state.current_pixbuf is new_pixbuf
+        assert len(state.elements) == 1
+        assert len(state.render_cache) == 0
+
+
+class TestEditGeneration:
+    """Test that committed element changes bump the edit generation."""
+
+    def _state_with_rect(self):
+        state = EditorState()
+        state.set_tool(ToolType.RECTANGLE)
+        state.start_drawing(0, 0)
+        state.finish_drawing(100, 50)
+        return state
+
+    def test_finish_drawing_bumps(self):
+        state = EditorState()
+        before = state.edit_generation
+        state.set_tool(ToolType.RECTANGLE)
+        state.start_drawing(0, 0)
+        state.continue_drawing(10, 10)
+        assert state.edit_generation == before  # In-progress only
+        state.finish_drawing(20, 20)
+        assert state.edit_generation > before
+
+    def test_move_bumps(self):
+        state = self._state_with_rect()
+        state.select_at(50, 25)
+        before = state.edit_generation
+        state.move_selected(60, 35)
+        assert state.edit_generation > before
+
+    def test_undo_redo_bump(self):
+        state = self._state_with_rect()
+        before = state.edit_generation
+        state.undo()
+        after_undo = state.edit_generation
+        state.redo()
+        assert before < after_undo < state.edit_generation
+
+    def test_selection_does_not_bump(self):
+        state = self._state_with_rect()
+        before = state.edit_generation
+        state.select_at(50, 25)
+        state.deselect()
+        assert state.edit_generation == before
+
+    def test_push_undo_clears_redo(self):
+        state = self._state_with_rect()
+        state.undo()
+        assert state.redo_stack
+        state._push_undo([])
+        assert not state.redo_stack
+
+
+class TestDamageRects:
+    """Test areas reported for partial redraws."""
+
+    def test_empty_state_has_no_damage(self):
+        state = EditorState()
+        assert state.get_damage_rects(800, 600) == []
+
+    def test_current_element_covers_stroke(self):
+        state = EditorState()
+        state.set_tool(ToolType.PEN)
+        state.start_drawing(100, 100)
+        state.continue_drawing(150, 120)
+        rects = state.get_damage_rects(800, 600)
+        assert len(rects) == 1
+        x1, y1, x2, y2 = rects[0]
+        assert x1 < 100 and y1 < 100 and x2 > 150 and y2 > 120
+        # Damage follows the stroke, not the image
+        assert x2 - x1 < 100 and y2 - y1 < 100
+
+    def test_arrow_extents_cover_head(self):
+        state = EditorState()
+        elem = DrawingElement(
+            tool=ToolType.ARROW, stroke_width=5, points=[Point(0, 0), Point(100, 0)]
+        )
+        x1, y1, x2, y2 = state._get_element_extents(elem)
+        assert y1 <= -20 and y2 >= 20
+
+    def test_selection_and_guides(self):
+        state = EditorState()
+        state.set_tool(ToolType.RECTANGLE)
+        state.start_drawing(10, 10)
+        state.finish_drawing(50, 50)
+        state.select_at(30, 30)
+        state.active_snap_guides = [("h", 200), ("v", 300)]
+        rects = state.get_damage_rects(800, 600)
+        assert len(rects) == 3
+        assert rects[1][0] == 0 and rects[1][2] == 800
+        assert rects[2][1] == 0 and rects[2][3] == 600
+
+
+class TestElementExtents:
+    """Test module-level bbox/extents helpers used for culling."""
+
+    def test_bbox_matches_state_method(self):
+        from src.editor import get_element_bbox
+
+        state = EditorState()
+        elem = DrawingElement(tool=ToolType.LINE, points=[Point(5, 10), Point(1, 2)])
+        assert get_element_bbox(elem) == (1, 2, 5, 10)
+        assert state._get_element_bbox(elem) == get_element_bbox(elem)
+
+    def test_extents_contain_bbox(self):
+        from src.editor import get_element_bbox, get_element_extents
+
+        elem = DrawingElement(
+            tool=ToolType.MEASURE, points=[Point(100, 100), Point(200, 100)]
+        )
+        bx1, by1, bx2, by2 = get_element_bbox(elem)
+        ex1, ey1, ex2, ey2 = get_element_extents(elem)
+        assert ex1 < bx1 and ey1 < by1 and ex2 > bx2 and ey2 > by2
+
+    def test_extents_empty_element(self):
+        from src.editor import get_element_extents
+
+        assert get_element_extents(DrawingElement(tool=ToolType.PEN)) is None
+
+    def test_offscreen_element_is_culled(self):
+        from src.editor import get_element_extents, rects_intersect
+
+        viewport = (0, 0, 800, 600)
+        near = DrawingElement(tool=ToolType.PEN, points=[Point(10, 10), Point(20, 20)])
+        far = DrawingElement(
+            tool=ToolType.PEN, points=[Point(10, 15000), Point(20, 15010)]
+        )
+        assert rects_intersect(get_element_extents(near), viewport)
+        assert not rects_intersect(get_element_extents(far), viewport)
+
+
+class TestSpatialSelection:
+    """Test index-backed hit testing and rubber-band selection."""
+
+    def _add(self, state, tool, x1, y1, x2, y2):
+        state.set_tool(tool)
+        state.start_drawing(x1, y1)
+        state.finish_drawing(x2, y2)
+
+    def test_topmost_element_wins(self):
+        state = EditorState()
+        self._add(state, ToolType.RECTANGLE, 0, 0, 100, 100)
+        self._add(state, ToolType.RECTANGLE, 50, 50, 150, 150)
+        assert state.elements_at(75, 75) == [1, 0]
+        state.select_at(75, 75)
+        assert state.selected_index == 1
+
+    def test_line_hit_only_near_stroke(self):
+        state = EditorState()
+        self._add(state, ToolType.LINE, 0, 0, 100, 100)
+        assert state.elements_at(50, 52) == [0]
+        # Inside the bbox but far from the diagonal
+        assert state.elements_at(90, 10) == []
+
+    def test_distance_to_polyline(self):
+        from src.editor import distance_to_polyline
+
+        points = [Point(0, 0), Point(10, 0), Point(10, 10)]
+        assert distance_to_polyline(points, 5, 3) == 3
+        assert distance_to_polyline(points, 13, 5) == 3
+        assert distance_to_polyline([Point(0, 0)], 3, 4) == 5
+
+    def test_index_follows_move(self):
+        state = EditorState()
+        self._add(state, ToolType.RECTANGLE, 0, 0, 50, 50)
+        state.select_at(25, 25)
+        state.move_selected(525, 525)
+        state.finish_move()
+        state.deselect()
+        assert state.elements_at(25, 25) == []
+        assert state.elements_at(525, 525) == [0]
+
+    def test_index_follows_delete_and_undo(self):
+        state = EditorState()
+        self._add(state, ToolType.RECTANGLE, 0, 0, 50, 50)
+        state.select_at(25, 25)
+        state.delete_selected()
+        assert state.elements_at(25, 25) == []
+        state.undo()
+        assert state.elements_at(25, 25) == [0]
+
+    def test_index_is_incremental(self):
+        state = EditorState()
+        for i in range(5):
+            self._add(state, ToolType.RECTANGLE, i * 100, 0, i * 100 + 50, 50)
+        state.elements_at(0, 0)
+        index = state._spatial_index
+        index.insert = MagicMock(wraps=index.insert)
+        self._add(state, ToolType.RECTANGLE, 1000, 0, 1050, 50)
+        state.elements_at(0, 0)
+        # Only the new element is measured and inserted
+        assert index.insert.call_count == 1
+        assert index.insert.call_args[0][0] == id(state.elements[-1])
+
+    def test_marquee_selects_contained(self):
+        state = EditorState()
+        self._add(state, ToolType.RECTANGLE, 10, 10, 50, 50)
+        self._add(state, ToolType.RECTANGLE, 60, 10, 90, 50)
+        self._add(state, ToolType.RECTANGLE, 80, 80, 300, 300)
+        state.start_marquee(0, 0)
+        state.update_marquee(100, 100)
+        assert state.finish_marquee()
+        assert state.selected_indices == {0, 1}
+        assert state.marquee is None
+
+    def test_marquee_add_to_selection(self):
+        state = EditorState()
+        self._add(state, ToolType.RECTANGLE, 10, 10, 50, 50)
+        self._add(state, ToolType.RECTANGLE, 200, 200, 250, 250)
+        state.select_at(30, 30)
+        state.start_marquee(300, 300)
+        state.update_marquee(150, 150)
+        state.finish_marquee(add_to_selection=True)
+        assert state.selected_indices == {0, 1}
+
+    def test_marquee_empty_clears_selection(self):
+        state = EditorState()
+        self._add(state, ToolType.RECTANGLE, 10, 10, 50, 50)
+        state.select_at(30, 30)
+        state.start_marquee(500, 500)
+        state.update_marquee(600, 600)
+        assert not state.finish_marquee()
+        assert state.selected_indices == set()
+
+    def test_marquee_in_damage_rects(self):
+        state = EditorState()
+        state.start_marquee(10, 10)
+        state.update_marquee(50, 60)
+        rects = state.get_damage_rects(800, 600)
+        assert len(rects) == 1
+        x1, y1, x2, y2 = rects[0]
+        assert x1 < 10 and y1 < 10 and x2 > 50 and y2 > 60
+
+
+class TestSnapEngine:
+    """Test that snapping uses lines built once per drag."""
+
+    def _add_rect(self, state, x1, y1, x2, y2):
+        state.set_tool(ToolType.RECTANGLE)
+        state.start_drawing(x1, y1)
+        state.finish_drawing(x2, y2)
+
+    def test_lines_built_once_per_drag(self):
+        state = EditorState()
+        self._add_rect(state, 10, 100, 50, 150)
+        self._add_rect(state, 200, 300, 250, 350)
+        state.select_at(225, 325)
+        state._get_snap_lines = MagicMock(wraps=state._get_snap_lines)
+        for y in range(320, 200, -10):
+            state.move_selected(225, y)
+        assert state._get_snap_lines.call_count == 1
+
+        state.finish_move()
+        state.select_at(225, 210)
+        state.move_selected(225, 200)
+        assert state._get_snap_lines.call_count == 2
+
+    def test_snaps_to_nearest_line(self):
+        state = EditorState()
+        self._add_rect(state, 10, 100, 50, 150)
+        # Bottom edge (148) is closer to 150 than the top (92) is to 100
+        self._add_rect(state, 200, 92, 250, 148)
+        state.select_at(225, 120)
+        snap_dx, snap_dy = state._apply_snap(state._get_element_bbox(state.elements[1]))
+        assert snap_dy == 2
+        assert ("h", 150) in state.active_snap_guides
+
+
+class TestBBoxCache:
+    """Test versioned bbox caching and font-metric text bboxes."""
+
+    def _add_rect(self, state, x1, y1, x2, y2):
+        state.set_tool(ToolType.RECTANGLE)
+        state.start_drawing(x1, y1)
+        state.finish_drawing(x2, y2)
+
+    def test_bbox_is_cached_until_touched(self):
+        import src.editor as editor
+
+        elem = DrawingElement(tool=ToolType.LINE, points=[Point(0, 0), Point(10, 10)])
+        original = editor._measure_element_bbox
+        editor._measure_element_bbox = MagicMock(wraps=original)
+        try:
+            editor.get_element_bbox(elem)
+            editor.get_element_bbox(elem)
+            assert editor._measure_element_bbox.call_count == 1
+
+            elem.points[1].x = 20
+            elem.touch()
+            assert editor.get_element_bbox(elem) == (0, 0, 20, 10)
+            assert editor._measure_element_bbox.call_count == 2
+        finally:
+            editor._measure_element_bbox = original
+
+    def test_mutations_bump_version(self):
+        state = EditorState()
+        self._add_rect(state, 10, 10, 100, 100)
+        state.selected_indices = {0}
+
+        for action in (
+            lambda: state.nudge_selected(5, 0),
+            lambda: state.flip_horizontal(),
+            lambda: state.flip_vertical(),
+            lambda: state.rotate_selected(90),
+        ):
+            version = state.elements[0].version
+            action()
+            assert state.elements[0].version > version
+
+    def test_bbox_follows_move(self):
+        state = EditorState()
+        self._add_rect(state, 10, 10, 100, 100)
+        state.select_at(50, 50)
+        assert state._get_element_bbox(state.elements[0]) == (10, 10, 100, 100)
+        state.move_selected(60, 50)
+        assert state._get_element_bbox(state.elements[0]) == (20, 10, 110, 100)
+
+    def test_bbox_after_undo_matches_restored_points(self):
+        state = EditorState()
+        self._add_rect(state, 10, 10, 100, 40)
+        state.selected_indices = {0}
+        state.rotate_selected(90)
+        assert state._get_element_bbox(state.elements[0]) != (10, 10, 100, 40)
+        state.undo()
+        assert state._get_element_bbox(state.elements[0]) == (10, 10, 100, 40)
+
+    def test_number_bbox_is_centered_circle(self):
+        from src.editor import get_element_bbox
+
+        elem = DrawingElement(tool=ToolType.NUMBER, points=[Point(100, 100)], number=7)
+        assert get_element_bbox(elem) == (86, 86, 114, 114)
+
+    def test_text_bbox_uses_font_metrics(self):
+        import src.editor as editor
+
+        elem = DrawingElement(tool=ToolType.TEXT, points=[Point(10, 50)], text="Hi")
+        original = editor._measure_text
+        editor._measure_text = MagicMock(
+            return_value=((1, -11, 19, 0), (0, -12, 20, 4))
+        )
+        try:
+            assert editor.get_element_bbox(elem) == (10, 38, 30, 54)
+        finally:
+            editor._measure_text = original
+
+    def test_text_bbox_estimated_without_cairo(self):
+        import src.editor as editor
+
+        elem = DrawingElement(
+            tool=ToolType.TEXT, points=[Point(0, 100)], text="abcd", font_size=10
+        )
+        original = editor._measure_text
+        editor._measure_text = MagicMock(return_value=None)
+        try:
+            x1, y1, x2, y2 = editor.get_element_bbox(elem)
+        finally:
+            editor._measure_text = original
+        assert (x1, y2) == (0, 100)
+        assert x2 == pytest.approx(24)
+        assert y1 == pytest.approx(88)
+
+
+class TestStrokeSimplification:
+    """Test freehand input filtering and simplification."""
+
+    def test_jitter_is_filtered_while_drawing(self):
+        state = EditorState()
+        state.set_tool(ToolType.PEN)
+        state.start_drawing(0, 0)
+        state.continue_drawing(0.5, 0.5)
+        state.continue_drawing(1, 0)
+        assert len(state.current_element.points) == 1
+        state.continue_drawing(5, 0)
+        assert len(state.current_element.points) == 2
+
+    def test_straight_stroke_is_simplified_on_finish(self):
+        state = EditorState()
+        state.set_tool(ToolType.PEN)
+        state.start_drawing(0, 0)
+        for x in range(3, 300, 3):
+            state.continue_drawing(x, x / 2)
+        state.finish_drawing(300, 150)
+        points = state.elements[0].points
+        assert len(points) == 2
+        assert points[-1] == Point(300, 150)
+
+    def test_zero_tolerance_keeps_samples(self):
+        state = EditorState()
+        state.set_tool(ToolType.HIGHLIGHTER)
+        state.set_stroke_tolerance(0)
+        state.start_drawing(0, 0)
+        for x in range(3, 30, 3):
+            state.continue_drawing(x, 0)
+        state.finish_drawing(30, 0)
+        assert len(state.elements[0].points) == 11
+
+    def test_shapes_are_not_simplified(self):
+        state = EditorState()
+        state.set_tool(ToolType.LINE)
+        state.start_drawing(0, 0)
+        state.continue_drawing(0.5, 0)
+        state.finish_drawing(1, 0)
+        assert len(state.elements[0].points) == 2
+
+    def test_tolerance_is_clamped(self):
+        state = EditorState()
+        state.set_stroke_tolerance(-1)
+        assert state.stroke_tolerance == 0
+        state.set_stroke_tolerance(50)
+        assert state.stroke_tolerance == 5
+
+
+class TestUndoHistory:
+    """Test shared-snapshot undo, coalescing and the memory cap."""
+
+    def _add_rect(self, state, x1, y1, x2, y2):
+        state.set_tool(ToolType.RECTANGLE)
+        state.start_drawing(x1, y1)
+        state.finish_drawing(x2, y2)
+
+    def test_snapshot_shares_unchanged_elements(self):
+        state = EditorState()
+        self._add_rect(state, 0, 0, 10, 10)
+        self._add_rect(state, 100, 100, 110, 110)
+        untouched = state.elements[0]
+        state.selected_indices = {1}
+        state.flip_horizontal()
+        assert state.undo_stack[-1][0] is untouched
+        assert state.elements[0] is untouched
+        assert state.undo_stack[-1][1] is not state.elements[1]
+
+    def test_undo_restores_nudged_position(self):
+        state = EditorState()
+        self._add_rect(state, 10, 10, 50, 50)
+        state.selected_indices = {0}
+        state.nudge_selected(5, 0)
+        state.undo()
+        assert state.elements[0].points[0].x == 10
+
+    def test_repeated_nudges_coalesce(self):
+        state = EditorState()
+        self._add_rect(state, 10, 10, 50, 50)
+        state.selected_indices = {0}
+        before = len(state.undo_stack)
+        for _ in range(5):
+            state.nudge_selected(1, 0)
+        assert len(state.undo_stack) == before + 1
+        assert state.elements[0].points[0].x == 15
+        state.undo()
+        assert state.elements[0].points[0].x == 10
+
+    def test_other_operation_breaks_coalescing(self):
+        state = EditorState()
+        self._add_rect(state, 10, 10, 50, 50)
+        state.selected_indices = {0}
+        state.nudge_selected(1, 0)
+        state.adjust_selected_opacity(-0.1)
+        state.adjust_selected_opacity(-0.1)
+        state.nudge_selected(1, 0)
+        assert len(state.undo_stack) == 4
+        assert state.elements[0].color.a == pytest.approx(0.8)
+
+    def test_nudge_after_undo_starts_new_entry(self):
+        state = EditorState()
+        self._add_rect(state, 10, 10, 50, 50)
+        state.selected_indices = {0}
+        state.nudge_selected(1, 0)
+        state.undo()
+        state.nudge_selected(1, 0)
+        state.undo()
+        assert state.elements[0].points[0].x == 10
+
+    def test_drag_is_one_undo_entry(self):
+        state = EditorState()
+        self._add_rect(state, 10, 10, 50, 50)
+        state.select_at(30, 30)
+        before = len(state.undo_stack)
+        for x in range(35, 80, 5):
+            state.move_selected(x, 30)
+        state.finish_move()
+        assert len(state.undo_stack) == before + 1
+        state.undo()
+        assert state.elements[0].points[0].x == 10
+
+    def test_memory_cap_drops_oldest_entries(self):
+        state = EditorState()
+        state.history_limit = 100 * 1024
+        state.elements.append(
+            DrawingElement(
+                tool=ToolType.PEN, points=[Point(i, i % 7) for i in range(1000)]
+            )
+        )
+        state.selected_indices = {0}
+        for _ in range(20):
+            state.flip_vertical()
+        # Each flip retires a ~17KB copy of the stroke
+        assert len(state.undo_stack) < 10
+        assert state.history_nbytes() <= state.history_limit
+        # The newest history is still there (19 flips, y mirrored about 3)
+        state.undo()
+        assert state.elements[0].points[1].y == 5
+
+    def test_deleted_elements_are_charged(self):
+        state = EditorState()
+        state.set_tool(ToolType.PEN)
+        state.set_stroke_tolerance(0)
+        state.start_drawing(0, 0)
+        for x in range(3, 3000, 3):
+            state.continue_drawing(x, 0)
+        state.finish_drawing(3000, 0)
+        before = state.history_nbytes()
+        state.selected_indices = {0}
+        state.delete_selected()
+        assert state.history_nbytes() - before >= 1000 * 16
+
+    def test_locked_elements_are_not_copied(self):
+        state = EditorState()
+        self._add_rect(state, 10, 10, 50, 50)
+        self._add_rect(state, 60, 60, 90, 90)
+        locked = state.elements[1]
+        locked.locked = True
+        state.selected_indices = {0, 1}
+        state.flip_horizontal()
+        state.rotate_selected(90)
+        # The locked element is neither copied nor charged to history
+        assert state.elements[1] is locked
+        assert all(entry[1] is locked for entry in state.undo_stack[-2:])
+        assert state.elements[0] is not state.undo_stack[-1][0]
+
+    def test_redo_enforces_memory_cap(self):
+        state = EditorState()
+        state.elements.append(
+            DrawingElement(
+                tool=ToolType.PEN, points=[Point(i, i % 7) for i in range(1000)]
+            )
+        )
+        state.selected_indices = {0}
+        for _ in range(10):
+            state.flip_vertical()
+        while state.undo():
+            pass
+        state.history_limit = 50 * 1024
+        while state.redo():
+            pass
+        assert state.history_nbytes() <= state.history_limit
+        assert len(state.undo_stack) < 10
+
+    def test_edit_after_export_starts_new_entry(self):
+        state = EditorState()
+        self._add_rect(state, 10, 10, 50, 50)
+        state.selected_indices = {0}
+        state.nudge_selected(1, 0)
+        before = len(state.undo_stack)
+        state.export_snapshot()
+        state.nudge_selected(1, 0)
+        assert len(state.undo_stack) == before + 1
+        state.undo()
+        assert state.elements[0].points[0].x == 11
+
+    def test_set_history_limit(self):
+        state = EditorState()
+        state.set_history_limit(2)
+        assert state.history_limit == 2 * 1024 * 1024
+        state.set_history_limit(0)
+        assert state.history_limit == 1024 * 1024
+
+
+class TestDeferredTransforms:
+    """Test that moving strokes defers point rewriting."""
+
+    def test_dragging_stroke_keeps_samples_untouched(self):
+        state = EditorState()
+        state.elements.append(
+            DrawingElement(
+                tool=ToolType.PEN, points=[Point(i, i % 7) for i in range(0, 500, 5)]
+            )
+        )
+        state.selected_indices = {0}
+        state._drag_start = Point(0, 0)
+        state.move_selected(30, 40)
+        state.move_selected(60, 80)
+        points = state.elements[0].points
+        assert points.matrix is not None
+        assert state._get_element_bbox(state.elements[0]) == (60, 80, 555, 86)
+        assert points.matrix is not None
+
+    def test_freehand_path_uses_raw_samples(self):
+        from src.editor import _render_freehand
+
+        elem = DrawingElement(tool=ToolType.PEN, points=[Point(0, 0), Point(3, 4)])
+        ctx = MagicMock()
+        _render_freehand(ctx, elem)
+        ctx.move_to.assert_called_once_with(0, 0)
+        ctx.line_to.assert_called_once_with(3, 4)
+        ctx.transform.assert_not_called()
+        ctx.stroke.assert_called_once()
+
+
+class TestDragOffset:
+    """Test the running offset kept for drag sprites."""
+
+    def _state(self):
+        state = EditorState()
+        state.snap_enabled = False
+        state.set_tool(ToolType.RECTANGLE)
+        state.start_drawing(10, 10)
+        state.finish_drawing(50, 30)
+        return state
+
+    def test_accumulates_over_a_move(self):
+        state = self._state()
+        assert state.select_at(20, 10)
+        assert state.drag_offset == (0.0, 0.0)
+        state.move_selected(25, 12)
+        state.move_selected(30, 20)
+        assert state.drag_offset == (10, 10)
+        state.finish_move()
+        assert state.drag_offset is None
+
+    def test_includes_snap_offset(self):
+        state = self._state()
+        state.start_drawing(100, 0)
+        state.finish_drawing(120, 5)
+        state.snap_enabled = True
+        state.select_at(20, 10)
+        state.move_selected(67, 10)
+        bbox = state._get_element_bbox(state.elements[0])
+        assert state.drag_offset == (bbox[0] - 10, bbox[1] - 10)
+
+    def test_resize_has_no_offset(self):
+        state = self._state()
+        state.select_at(20, 10)
+        state.finish_move()
+        x1, y1, x2, y2 = state._get_element_bbox(state.elements[0])
+        assert state.select_at(x2, y2)
+        assert state._resize_handle is not None
+        assert state.drag_offset is None
+        state.move_selected(x2 + 10, y2 + 10)
+        assert state.drag_offset is None
+
+
+class TestTextMetricsBBox:
+    """Test that bboxes use the same text layouts as rendering."""
+
+    @pytest.fixture(autouse=True)
+    def toy_metrics(self, monkeypatch):
+        """Measure every string as 10 units per character, 8 high."""
+        import src.editor as editor
+
+        def get_layout(text, family, size, bold=False, italic=False):
+            layout = MagicMock()
+            layout.ink = (0.0, -8.0, len(text) * 10.0, 0.0)
+            layout.logical = (0.0, -9.0, len(text) * 10.0, 3.0)
+            layout.width = len(text) * 10.0
+            layout.height = 8.0
+            return layout
+
+        monkeypatch.setattr(editor, "get_layout", get_layout)
+
+    def test_callout_bbox_covers_box_and_tail(self):
+        from src.editor import get_element_bbox
+
+        elem = DrawingElement(
+            tool=ToolType.CALLOUT,
+            points=[Point(0, 0), Point(100, 100)],
+            text="abcd\nab",
+            font_size=10,
+        )
+        # 40 wide text + 2 * 10 padding; 2 lines * 13 + 2 * 10 padding
+        assert get_element_bbox(elem) == pytest.approx((0, 0, 130, 123))
+
+    def test_callout_tail_inside_box(self):
+        from src.editor import get_element_bbox
+
+        elem = DrawingElement(
+            tool=ToolType.CALLOUT,
+            points=[Point(100, 100), Point(100, 100)],
+            text="ab",
+            font_size=10,
+        )
+        assert get_element_bbox(elem) == pytest.approx((80, 83.5, 120, 116.5))
+
+    def test_multiline_text_bbox_without_metrics(self, monkeypatch):
+        import src.editor as editor
+
+        monkeypatch.setattr(editor, "get_layout", lambda *args, **kwargs: None)
+        elem = DrawingElement(
+            tool=ToolType.TEXT, points=[Point(0, 100)], text="ab\nabcd", font_size=10
+        )
+        x1, y1, x2, y2 = editor.get_element_bbox(elem)
+        assert x2 == pytest.approx(24)
+        assert y2 == pytest.approx(113)
+
+    def test_number_draws_directly_without_cache(self):
+        from src.editor import _render_number
+
+        elem = DrawingElement(tool=ToolType.NUMBER, points=[Point(5, 6)], number=3)
+        ctx = MagicMock()
+        ctx.get_matrix.return_value = MagicMock(xx=1.0, yx=0.0, xy=0.0, yy=1.0)
+        _render_number(ctx, elem)
+        ctx.translate.assert_called_once_with(5, 6)
+        ctx.arc.assert_called_once()
+        ctx.set_source_surface.assert_not_called()
+
+
+class TestEffectPreview:
+    """Test the low-resolution preview of blur/pixelate drags."""
+
+    def test_pixelate_reduces_only_blocks_under_region(self):
+        from src.editor import _preview_geometry
+
+        elem = DrawingElement(
+            tool=ToolType.PIXELATE, points=[Point(47, 100), Point(20, 31)], pixel_size=15
+        )
+        # Blocks from (15, 30) on the image grid through (60, 105)
+        assert _preview_geometry(elem, 3840, 2160) == (15, 30, 3, 5, 0)
+
+    def test_pixelate_grid_stays_put_during_up_left_drag(self):
+        from src.editor import _preview_geometry
+
+        origins = set()
+        for corner in range(40, 10, -1):
+            elem = DrawingElement(
+                tool=ToolType.PIXELATE,
+                points=[Point(60, 60), Point(corner, corner)],
+                pixel_size=15,
+            )
+            origin_x, origin_y = _preview_geometry(elem, 200, 200)[:2]
+            assert origin_x % 15 == 0 and origin_y % 15 == 0
+            origins.add(origin_x)
+        assert origins == {0, 15, 30}
+
+    def test_preview_blocks_are_the_committed_colours(self):
+        from src.editor import (
+            _pixelate_means,
+            _preview_geometry,
+            apply_pixelate_region,
+        )
+        from tests.test_pixels import _FakePixbuf
+
+        pixbuf = _FakePixbuf(40, 30)
+        elem = DrawingElement(
+            tool=ToolType.PIXELATE, points=[Point(7, 4), Point(33, 26)], pixel_size=8
+        )
+        origin_x, origin_y, cols, rows, _ = _preview_geometry(elem, 40, 30)
+        means = _pixelate_means(pixbuf, 7, 4, 33, 26, 8)
+        assert len(means) == cols * rows * 3
+
+        with patch("src.editor._pixbuf_from_region", lambda data, *a: data):
+            committed = apply_pixelate_region(pixbuf, 7, 4, 26, 22, 8)
+        # Each block's committed colour is the preview pixel for that block
+        for py in range(4, 26):
+            for px in range(7, 33):
+                block = (py // 8 - origin_y // 8) * cols + px // 8 - origin_x // 8
+                dst = ((py - 4) * 26 + px - 7) * 3
+                assert committed[dst : dst + 3] == means[block * 3 : block * 3 + 3]
+
+    def test_pixelate_clamps_negative_corner(self):
+        from src.editor import _preview_geometry
+
+        elem = DrawingElement(
+            tool=ToolType.PIXELATE, points=[Point(-30, -4), Point(50, 50)], pixel_size=10
+        )
+        assert _preview_geometry(elem, 100, 95)[:4] == (0, 0, 5, 5)
+
+    def test_blur_reduces_4k_capture(self):
+        from src.editor import PREVIEW_MAX_SIDE, _preview_geometry
+
+        elem = DrawingElement(
+            tool=ToolType.BLUR, points=[Point(0, 0), Point(500, 500)], blur_radius=10
+        )
+        origin_x, origin_y, width, height, radius = _preview_geometry(elem, 3840, 2160)
+        assert (origin_x, origin_y) == (0, 0)
+        assert width <= PREVIEW_MAX_SIDE and (width, height) == (960, 540)
+        assert radius == 2
+
+    def test_small_image_is_not_reduced(self):
+        from src.editor import _preview_geometry
+
+        elem = DrawingElement(
+            tool=ToolType.BLUR, points=[Point(0, 0), Point(5, 5)], blur_radius=3
+        )
+        assert _preview_geometry(elem, 800, 600) == (0, 0, 800, 600, 3)
+
+
+class TestColorPicker:
+    """Test eyedropper sampling."""
+
+    def _state(self):
+        from tests.test_pixels import _FakePixbuf
+
+        return EditorState(_FakePixbuf(20, 20))
+
+    def test_picks_single_pixel(self):
+        color = self._state().pick_color(10, 5)
+        assert (color.r, color.g, color.b) == (10 / 255, 5 / 255, 15 / 255)
+
+    def test_averages_square(self):
+        state = self._state()
+        state.set_pick_sample_size(3)
+        color = state.pick_color(0, 0)
+        assert color.r == pytest.approx(0.5 / 255)
+        assert state.pick_color(10, 5, sample_size=1).r == pytest.approx(10 / 255)
+
+    def test_out_of_bounds(self):
+        assert self._state().pick_color(20, 0) is None
+
+    def test_replaced_image_is_read_again_and_released(self):
+        from src import pixels
+        from tests.test_pixels import _FakePixbuf
+
+        state = self._state()
+        old = state.current_pixbuf
+        state.pick_color(1, 1)
+        cropped = _FakePixbuf(10, 10)
+        state.replace_pixbuf(cropped)
+        state.pick_color(1, 1)
+        assert cropped.copies == 1
+        # The original is kept for the editor; a replaced crop is released
+        assert any(view.pixbuf is old for view in pixels._views.values())
+        state.replace_pixbuf(_FakePixbuf(5, 5))
+        assert not any(view.pixbuf is cropped for view in pixels._views.values())
+
+    def test_sample_size_is_odd_and_clamped(self):
+        state = EditorState()
+        state.set_pick_sample_size(4)
+        assert state.pick_sample_size == 3
+        state.set_pick_sample_size(9)
+        assert state.pick_sample_size == 5
+        state.set_pick_sample_size(0)
+        assert state.pick_sample_size == 1
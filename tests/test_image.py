@@ -0,0 +1,135 @@
+"""Tests for the shared image buffer and its pixel conversions."""
+
+import pytest
+
+from src import image
+from src.image import ARGB32_ORDER, LikxImage, from_argb32, to_argb32
+from tests.test_pixels import _FakePixbuf
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    """Run a test with the vectorized and the pure-Python conversions."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(image, "_numpy", lambda: None)
+    return request.param
+
+
+def _argb32(*pixels):
+    """Pack (r, g, b, a) premultiplied pixels in native ARGB32 byte order."""
+    out = bytearray()
+    for pixel in pixels:
+        px = bytearray(4)
+        for value, offset in zip(pixel, ARGB32_ORDER):
+            px[offset] = value
+        out += px
+    return out
+
+
+class TestToArgb32:
+    """Test RGB(A) to cairo conversion."""
+
+    def test_rgb_is_opaque_and_reordered(self, backend):
+        data = bytes((10, 20, 30, 40, 50, 60)) + b"\0\0"  # 2 px, padded row
+        out = to_argb32(data, 2, 1, 8, 3)
+        assert out == _argb32((10, 20, 30, 255), (40, 50, 60, 255))
+
+    def test_rgba_is_premultiplied(self, backend):
+        data = bytes((255, 128, 0, 128, 200, 100, 50, 0))
+        out = to_argb32(data, 2, 1, 8, 4)
+        assert out == _argb32((128, 64, 0, 128), (0, 0, 0, 0))
+
+    def test_follows_rowstride(self, backend):
+        rows = bytes((1, 2, 3, 255, 9, 9)) + bytes((4, 5, 6, 255, 9, 9))
+        out = to_argb32(rows, 1, 2, 6, 4)
+        assert out == _argb32((1, 2, 3, 255), (4, 5, 6, 255))
+
+
+class TestFromArgb32:
+    """Test cairo to RGB(A) conversion."""
+
+    def test_opaque_becomes_rgb(self, backend):
+        data = _argb32((10, 20, 30, 255), (40, 50, 60, 255))
+        assert from_argb32(data, 2, 1, 8) == (bytes((10, 20, 30, 40, 50, 60)), 3)
+
+    def test_rgb24_ignores_alpha_byte(self, backend):
+        data = _argb32((10, 20, 30, 0))
+        assert from_argb32(data, 1, 1, 4, has_alpha=False) == (bytes((10, 20, 30)), 3)
+
+    def test_translucent_is_unpremultiplied(self, backend):
+        data = _argb32((128, 64, 0, 128), (0, 0, 0, 0), (7, 8, 9, 255))
+        pixels, n = from_argb32(data, 3, 1, 12)
+        assert n == 4
+        assert pixels == bytes((255, 128, 0, 128, 0, 0, 0, 0, 7, 8, 9, 255))
+
+    def test_half_alpha_does_not_wrap(self, backend):
+        # 100 * 255 doesn't fit in a byte; the result must not wrap around
+        data = _argb32((100, 127, 3, 127))
+        assert from_argb32(data, 1, 1, 4) == (bytes((201, 255, 6, 127)), 4)
+
+    def test_round_trip(self, backend):
+        rgba = bytes(
+            value
+            for alpha in (0, 1, 64, 200, 255)
+            for value in (alpha, 255 - alpha, 77, alpha)
+        )
+        pixels, n = from_argb32(to_argb32(rgba, 5, 1, 20, 4), 5, 1, 20)
+        assert n == 4
+        for i in range(5):
+            got = pixels[i * 4 : i * 4 + 4]
+            want = rgba[i * 4 : i * 4 + 4]
+            assert got[3] == want[3]
+            if want[3] == 255:
+                assert got == want
+            elif want[3] >= 64:
+                # Premultiplying loses at most 255 / alpha levels
+                assert all(abs(g - w) <= 255 // want[3] for g, w in zip(got, want))
+
+
+class TestLikxImage:
+    """Test the image buffer."""
+
+    def test_opaque_rgba_pixbuf_is_stored_as_rgb(self, backend):
+        source = _FakePixbuf(3, 2, n_channels=4)
+        img = LikxImage.from_pixbuf(source)
+        assert img.n_channels == 3
+        assert not img.has_alpha
+        assert img.nbytes == 3 * 2 * 3
+        offset = 1 * img.rowstride + 2 * 3
+        assert img.data[offset : offset + 3] == bytes((2, 1, 3))
+
+    def test_translucent_pixbuf_keeps_alpha_and_pixbuf(self, backend):
+        source = _FakePixbuf(2, 2, n_channels=4)
+        data = bytearray(source.data)
+        data[3] = 10
+        source.data = bytes(data)
+        img = LikxImage.from_pixbuf(source)
+        assert img.n_channels == 4
+        assert img.rowstride == source.rowstride
+        assert img.pixbuf() is source
+
+    def test_rgb_pixbuf_is_reused(self, backend):
+        source = _FakePixbuf(2, 2)
+        assert LikxImage.from_pixbuf(source).pixbuf() is source
+
+    def test_array_view(self):
+        np = pytest.importorskip("numpy")
+        img = LikxImage.from_pixbuf(_FakePixbuf(5, 4))
+        array = img.array()
+        assert array.shape == (4, 5, 3)
+        assert tuple(array[2, 3]) == (3, 2, 5)
+        assert img.array() is array
+        assert not array.flags.writeable
+
+        clone = LikxImage.from_array(np.array(array))
+        assert clone.data == bytes(np.ascontiguousarray(array))
+
+    def test_argb32(self):
+        img = LikxImage(bytes((1, 2, 3, 4, 5, 6)), 2, 1, 3)
+        assert img.argb32() == _argb32((1, 2, 3, 255), (4, 5, 6, 255))
+
+    def test_rejects_bad_channel_count(self):
+        with pytest.raises(ValueError):
+            LikxImage(b"", 0, 0, 2)
@@ -0,0 +1,31 @@
+"""Tests for pointer motion batching."""
+
+from src.motion import MotionQueue
+
+
+class TestMotionQueue:
+    """Test MotionQueue coalescing."""
+
+    def test_latest_event_only_by_default(self):
+        queue = MotionQueue()
+        for i in range(10):
+            queue.push(i, i * 2, 0)
+        assert queue.take() == [(9, 18, 0)]
+        assert len(queue) == 0
+
+    def test_keep_all_preserves_order(self):
+        queue = MotionQueue()
+        queue.push(1, 1, 0)
+        queue.push(2, 2, 1)
+        assert queue.take(keep_all=True) == [(1, 1, 0), (2, 2, 1)]
+
+    def test_take_empty(self):
+        queue = MotionQueue()
+        assert queue.take() == []
+        assert queue.take(keep_all=True) == []
+
+    def test_clear(self):
+        queue = MotionQueue()
+        queue.push(1, 1)
+        queue.clear()
+        assert queue.take() == []
@@ -0,0 +1,157 @@
+"""Tests for shared pixel access."""
+
+import pytest
+
+from src import pixels
+from src.pixels import (
+    PixelView,
+    clear_views,
+    pixel_bytes,
+    pixel_view,
+    release_views,
+)
+
+
+class _FakePixbuf:
+    """Minimal pixbuf: RGB(A) rows with padding, pixel (x, y) = (x, y, x + y)."""
+
+    def __init__(self, width, height, n_channels=3, padding=2):
+        self.width = width
+        self.height = height
+        self.n_channels = n_channels
+        self.rowstride = width * n_channels + padding
+        data = bytearray(self.rowstride * height)
+        for y in range(height):
+            for x in range(width):
+                offset = y * self.rowstride + x * n_channels
+                data[offset : offset + 3] = bytes((x, y, x + y))
+                if n_channels == 4:
+                    data[offset + 3] = 255
+        self.data = bytes(data)
+        self.copies = 0
+
+    def get_width(self):
+        return self.width
+
+    def get_height(self):
+        return self.height
+
+    def get_rowstride(self):
+        return self.rowstride
+
+    def get_n_channels(self):
+        return self.n_channels
+
+    def get_pixels(self):
+        self.copies += 1
+        return self.data
+
+
+class _GBytes:
+    def __init__(self, data):
+        self._data = data
+
+    def get_data(self):
+        return self._data
+
+
+class _ReadOnlyPixbuf(_FakePixbuf):
+    def get_pixels(self):
+        raise AssertionError("get_pixels should not be used")
+
+    def read_pixel_bytes(self):
+        return _GBytes(self.data)
+
+
+@pytest.fixture(autouse=True)
+def fresh_views():
+    clear_views()
+    yield
+    clear_views()
+
+
+class TestPixelBytes:
+    """Test the pixel data fetch."""
+
+    def test_prefers_read_pixel_bytes(self):
+        pixbuf = _ReadOnlyPixbuf(2, 2)
+        assert pixel_bytes(pixbuf) == pixbuf.data
+
+    def test_falls_back_to_get_pixels(self):
+        pixbuf = _FakePixbuf(2, 2)
+        assert pixel_bytes(pixbuf) == pixbuf.data
+
+
+class TestPixelView:
+    """Test single-pixel and averaged reads."""
+
+    def test_pixel_follows_rowstride(self):
+        view = PixelView(_FakePixbuf(5, 4, n_channels=4))
+        assert view.pixel(3, 2) == (3, 2, 5, 255)
+        with pytest.raises(IndexError):
+            view.pixel(5, 0)
+
+    def test_average_single_pixel(self):
+        view = PixelView(_FakePixbuf(5, 4))
+        assert view.average(2, 1) == (2, 1, 3)
+
+    def test_average_square(self):
+        view = PixelView(_FakePixbuf(10, 10))
+        assert view.average(4, 6, 3) == (4, 6, 10)
+        assert view.average(4, 6, 5) == (4, 6, 10)
+
+    def test_average_clipped_at_corner(self):
+        view = PixelView(_FakePixbuf(10, 10))
+        # Only x, y in 0..1 are inside the image
+        assert view.average(0, 0, 3) == (0.5, 0.5, 1.0)
+
+    def test_average_outside(self):
+        view = PixelView(_FakePixbuf(3, 3))
+        assert view.average(-1, 0, 3) is None
+        assert view.average(0, 3) is None
+
+    def test_numpy_view_shares_data(self):
+        np = pytest.importorskip("numpy")
+        view = PixelView(_FakePixbuf(5, 4, n_channels=4))
+        array = view.array()
+        assert array.shape == (4, 5, 4)
+        assert tuple(array[2, 3]) == (3, 2, 5, 255)
+        assert np.shares_memory(array, np.frombuffer(view.data, dtype=np.uint8))
+        assert view.array() is array
+
+
+class TestPixelViewCache:
+    """Test that views are shared per pixbuf and generation."""
+
+    def test_pixels_fetched_once(self):
+        pixbuf = _FakePixbuf(4, 4)
+        for x in range(4):
+            pixel_view(pixbuf).pixel(x, 0)
+        assert pixbuf.copies == 1
+
+    def test_generation_refetches(self):
+        pixbuf = _FakePixbuf(4, 4)
+        first = pixel_view(pixbuf, 0)
+        second = pixel_view(pixbuf, 1)
+        assert second is not first
+        assert pixbuf.copies == 2
+        # One view per pixbuf; without a generation the cached one is used
+        assert pixel_view(pixbuf) is second
+        assert len(pixels._views) == 1
+
+    def test_release_views(self):
+        pixbuf = _FakePixbuf(4, 4)
+        pixel_view(pixbuf)
+        release_views(_FakePixbuf(4, 4))
+        assert len(pixels._views) == 1
+        release_views(pixbuf)
+        assert len(pixels._views) == 0
+
+    def test_keeps_a_few_views(self):
+        pixbufs = [_FakePixbuf(2, 2) for _ in range(pixels.MAX_VIEWS + 1)]
+        for pixbuf in pixbufs:
+            pixel_view(pixbuf)
+        pixel_view(pixbufs[-1])
+        assert pixbufs[-1].copies == 1
+        pixel_view(pixbufs[0])
+        assert pixbufs[0].copies == 2
@@ -0,0 +1,187 @@
+"""Tests for the screenshot-aware PNG encoder."""
+
+import struct
+import zlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.png_optimizer import (  # noqa: E402
+    COLOR_INDEXED,
+    COLOR_RGB,
+    COLOR_RGBA,
+    PRESETS,
+    configured_preset,
+    encode_png,
+    optimize_png,
+)
+
+
+def _chunks(data):
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos = 8
+    while pos < len(data):
+        (length,) = struct.unpack(">I", data[pos : pos + 4])
+        tag = data[pos + 4 : pos + 8]
+        body = data[pos + 8 : pos + 8 + length]
+        (crc,) = struct.unpack(">I", data[pos + 8 + length : pos + 12 + length])
+        assert crc == zlib.crc32(tag + body) & 0xFFFFFFFF
+        yield tag, body
+        pos += 12 + length
+
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def _decode(data):
+    """Decode a PNG written by encode_png to (pixels, color_type, depth)."""
+    chunks = dict()
+    idat = b""
+    for tag, body in _chunks(data):
+        if tag == b"IDAT":
+            idat += body
+        else:
+            chunks[tag] = body
+    width, height, depth, color_type = struct.unpack(">IIBB", chunks[b"IHDR"][:10])
+    channels = {COLOR_RGB: 3, COLOR_RGBA: 4, COLOR_INDEXED: 1}[color_type]
+    stride = (width * channels * depth + 7) // 8
+    bpp = max(1, channels * depth // 8)
+    raw = zlib.decompress(idat)
+
+    rows = []
+    prior = bytearray(stride)
+    for y in range(height):
+        kind = raw[y * (stride + 1)]
+        line = bytearray(raw[y * (stride + 1) + 1 : (y + 1) * (stride + 1)])
+        for i in range(stride):
+            a = line[i - bpp] if i >= bpp else 0
+            b = prior[i]
+            c = prior[i - bpp] if i >= bpp else 0
+            pred = [0, a, b, (a + b) // 2, _paeth(a, b, c)][kind]
+            line[i] = (line[i] + pred) & 0xFF
+        rows.append(line)
+        prior = line
+
+    if color_type != COLOR_INDEXED:
+        pixels = np.array(rows, dtype=np.uint8).reshape(height, width, channels)
+        return pixels, color_type, depth
+
+    palette = np.frombuffer(chunks[b"PLTE"], dtype=np.uint8).reshape(-1, 3)
+    alpha = np.full(len(palette), 255, dtype=np.uint8)
+    trns = chunks.get(b"tRNS", b"")
+    alpha[: len(trns)] = np.frombuffer(trns, dtype=np.uint8)
+    bits = np.unpackbits(np.array(rows, dtype=np.uint8), axis=1)
+    bits = bits.reshape(height, -1, depth)[:, :width]
+    indices = (bits * (1 << np.arange(depth - 1, -1, -1))).sum(axis=2)
+    rgba = np.concatenate([palette[indices], alpha[indices][..., None]], axis=2)
+    return rgba, color_type, depth
+
+
+def _ui_like(width=37, height=23, colors=3):
+    """Flat bands of a few colours, like a screenshot of UI chrome."""
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+    for i in range(colors):
+        pixels[:, i * width // colors :] = (i, 255 - i, (i * 97) % 256)
+    return pixels
+
+
+class TestEncodePng:
+    """Test colour type selection and that encoded images decode exactly."""
+
+    @pytest.mark.parametrize("colors,depth", [(2, 1), (3, 2), (16, 4), (200, 8)])
+    def test_few_colours_become_indexed(self, colors, depth):
+        pixels = _ui_like(colors=colors, width=400)
+        data, palette = encode_png(pixels, PRESETS["balanced"])
+        decoded, color_type, bit_depth = _decode(data)
+        assert color_type == COLOR_INDEXED
+        assert bit_depth == depth
+        assert palette == len(np.unique(pixels.reshape(-1, 3), axis=0))
+        assert (decoded[..., :3] == pixels).all()
+        assert (decoded[..., 3] == 255).all()
+
+    def test_translucent_palette_uses_trns(self):
+        pixels = np.zeros((5, 6, 4), dtype=np.uint8)
+        pixels[..., :3] = 200
+        pixels[..., 3] = 255
+        pixels[2:, :, 3] = 100
+        data, _ = encode_png(pixels, PRESETS["fast"])
+        decoded, color_type, _ = _decode(data)
+        assert color_type == COLOR_INDEXED
+        assert (decoded == pixels).all()
+
+    @pytest.mark.parametrize("preset", sorted(PRESETS))
+    def test_many_colours_stay_truecolour(self, preset):
+        rng = np.random.default_rng(1)
+        for channels, expected in ((3, COLOR_RGB), (4, COLOR_RGBA)):
+            pixels = rng.integers(0, 256, (300, 41, channels), dtype=np.uint8)
+            data, palette = encode_png(pixels, PRESETS[preset])
+            decoded, color_type, depth = _decode(data)
+            assert palette is None
+            assert (color_type, depth) == (expected, 8)
+            assert (decoded == pixels).all()
+
+    def test_smooth_gradient_with_every_filter(self):
+        y, x = np.mgrid[0:280, 0:300]
+        pixels = np.stack([x % 256, y % 256, (x + y) % 256], axis=2)
+        pixels = pixels.astype(np.uint8)
+        data, _ = encode_png(pixels, PRESETS["small"])
+        decoded, _, _ = _decode(data)
+        assert (decoded == pixels).all()
+
+
+class _Pixbuf:
+    def __init__(self, pixels):
+        self.pixels = np.ascontiguousarray(pixels)
+
+    def get_width(self):
+        return self.pixels.shape[1]
+
+    def get_height(self):
+        return self.pixels.shape[0]
+
+    def get_rowstride(self):
+        return self.pixels.shape[1] * self.pixels.shape[2]
+
+    def get_n_channels(self):
+        return self.pixels.shape[2]
+
+    def get_pixels(self):
+        return self.pixels.tobytes()
+
+
+class TestOptimizePng:
+    """Test the comparison against GdkPixbuf's encoding."""
+
+    def test_opaque_rgba_is_written_indexed_and_smaller(self):
+        rgba = np.concatenate(
+            [_ui_like(), np.full((23, 37, 1), 255, dtype=np.uint8)], axis=2
+        )
+        baseline = b"x" * 10000
+        result = optimize_png(_Pixbuf(rgba), baseline)
+        assert result.colors == 3
+        assert result.saved == len(baseline) - len(result.data)
+        decoded, _, _ = _decode(result.data)
+        assert (decoded == rgba).all()
+
+    def test_keeps_baseline_when_not_smaller(self):
+        result = optimize_png(_Pixbuf(_ui_like()), b"tiny")
+        assert result.data == b"tiny"
+        assert result.saved == 0
+
+
+class TestConfiguredPreset:
+    def test_opt_in(self):
+        assert configured_preset({}) is None
+        assert configured_preset({"png_optimize": True}) == "balanced"
+        assert configured_preset({"png_optimize": True, "png_preset": "small"}) == (
+            "small"
+        )
+        assert configured_preset({"png_optimize": True, "png_preset": "?"}) == (
+            "balanced"
+        )
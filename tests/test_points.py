@@ -0,0 +1,242 @@
+"""Tests for compact point storage."""
+
+import copy
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.editor import DrawingElement, Point, ToolType, distance_to_polyline
+from src.points import PointArray, simplify
+
+
+class TestPointArray:
+    """Test PointArray sequence behaviour."""
+
+    def test_append_and_index(self):
+        points = PointArray()
+        points.append(Point(1, 2))
+        points.append(Point(3, 4))
+        assert len(points) == 2
+        assert points[0].x == 1 and points[0].y == 2
+        assert points[-1] == Point(3, 4)
+
+    def test_index_out_of_range(self):
+        points = PointArray([Point(1, 2)])
+        with pytest.raises(IndexError):
+            points[1]
+        with pytest.raises(IndexError):
+            points[-2]
+
+    def test_views_write_through(self):
+        points = PointArray([Point(1, 2), Point(3, 4)])
+        for p in points:
+            p.x += 10
+        points[0].y = 0
+        assert list(points.coords()) == [(11, 0), (13, 4)]
+
+    def test_setitem_replaces_point(self):
+        points = PointArray([Point(1, 2), Point(3, 4)])
+        points[-1] = Point(5, 6)
+        assert points == [Point(1, 2), Point(5, 6)]
+
+    def test_slice_is_a_copy(self):
+        points = PointArray([Point(0, 0), Point(1, 1), Point(2, 2)])
+        tail = points[1:]
+        assert tail == [Point(1, 1), Point(2, 2)]
+        tail[0].x = 99
+        assert points[1].x == 1
+        assert points[::2] == [Point(0, 0), Point(2, 2)]
+
+    def test_deepcopy_is_independent(self):
+        points = PointArray([Point(1, 2)])
+        clone = copy.deepcopy(points)
+        clone[0].x = 5
+        assert points[0].x == 1
+        assert clone == PointArray([Point(5, 2)])
+
+    def test_from_coords_rejects_odd_length(self):
+        assert PointArray.from_coords([1, 2, 3, 4]) == [Point(1, 2), Point(3, 4)]
+        with pytest.raises(ValueError):
+            PointArray.from_coords([1, 2, 3])
+
+    def test_bounds(self):
+        assert PointArray().bounds() is None
+        points = PointArray([Point(5, -1), Point(-2, 7), Point(3, 3)])
+        assert points.bounds() == (-2, -1, 5, 7)
+
+    def test_nbytes_is_16_per_point(self):
+        points = PointArray([Point(i, i) for i in range(100)])
+        assert points.nbytes() == 1600
+
+
+class TestPointArrayTransforms:
+    """Test bulk transforms."""
+
+    def test_translate(self):
+        points = PointArray([Point(1, 2), Point(3, 4)])
+        points.translate(10, -2)
+        assert points == [Point(11, 0), Point(13, 2)]
+
+    def test_scale_about_center(self):
+        points = PointArray([Point(0, 0), Point(10, 20)])
+        points.scale(5, 10, 2, 0.5)
+        assert points == [Point(-5, 5), Point(15, 15)]
+
+    def test_mirror(self):
+        points = PointArray([Point(0, 3), Point(10, 7)])
+        points.scale(4, 0, -1, 1)
+        assert points == [Point(8, 3), Point(-2, 7)]
+
+    def test_rotate_quarter_turn(self):
+        points = PointArray([Point(1, 0)])
+        points.rotate(0, 0, math.pi / 2)
+        assert points[0].x == pytest.approx(0, abs=1e-9)
+        assert points[0].y == pytest.approx(1)
+
+
+class TestPendingTransform:
+    """Test that transforms are deferred until the samples are read."""
+
+    def test_transforms_are_deferred(self):
+        points = PointArray([Point(0, 0), Point(10, 0)])
+        raw = points.raw()[0]
+        points.translate(5, 5)
+        points.scale(0, 0, 2, 2)
+        assert raw.tolist() == [0, 0, 10, 0]
+        assert points.matrix == (2, 0, 0, 2, 10, 10)
+
+    def test_reading_bakes(self):
+        points = PointArray([Point(0, 0), Point(10, 0)])
+        points.translate(5, 5)
+        assert points[1] == Point(15, 5)
+        assert points.matrix is None
+        assert points.raw()[0].tolist() == [5, 5, 15, 5]
+
+    def test_bounds_do_not_bake_axis_aligned_transforms(self):
+        points = PointArray([Point(0, 0), Point(10, 20)])
+        points.translate(1, 2)
+        points.scale(0, 0, -1, 1)
+        assert points.bounds() == (-11, 2, -1, 22)
+        assert points.matrix is not None
+
+    def test_rotated_bounds_are_exact(self):
+        points = PointArray([Point(-10, 0), Point(10, 0)])
+        points.rotate(0, 0, math.pi / 4)
+        x1, y1, x2, y2 = points.bounds()
+        assert x2 == pytest.approx(10 / math.sqrt(2))
+        assert y2 == pytest.approx(10 / math.sqrt(2))
+
+    def test_rotated_bounds_leave_matrix_pending(self):
+        import random
+
+        rng = random.Random(3)
+        points = PointArray(
+            Point(rng.uniform(-50, 50), rng.uniform(-20, 20)) for _ in range(300)
+        )
+        points.rotate(5, 5, 0.7)
+        points.translate(3, -2)
+        bounds = points.bounds()
+        assert points.matrix is not None
+        baked = copy.copy(points)
+        baked.baked()
+        assert bounds == pytest.approx(baked.bounds())
+        # Later rotations reuse the hull of the unchanged samples
+        hull = points._hull
+        points.rotate(0, 0, 1.1)
+        points.bounds()
+        assert points._hull is hull and points.matrix is not None
+
+    def test_writes_drop_the_hull(self):
+        points = PointArray([Point(0, 0), Point(1, 0), Point(0, 1)])
+        points.rotate(0, 0, 0.3)
+        points.bounds()
+        points.append(Point(10, 10))
+        points.rotate(0, 0, -0.3)
+        baked = copy.copy(points)
+        baked.baked()
+        assert points.bounds() == pytest.approx(baked.bounds())
+
+    def test_copy_keeps_pending_matrix(self):
+        points = PointArray([Point(1, 1)])
+        points.translate(1, 0)
+        clone = copy.deepcopy(points)
+        assert clone.matrix == points.matrix
+        clone.translate(1, 0)
+        assert points[0] == Point(2, 1)
+        assert clone[0] == Point(3, 1)
+
+    def test_ref_sees_later_transform(self):
+        points = PointArray([Point(1, 1)])
+        ref = points[0]
+        points.translate(4, 0)
+        assert ref.x == 5
+
+    def test_bounds_follow_writes(self):
+        points = PointArray([Point(0, 0), Point(1, 1)])
+        assert points.bounds() == (0, 0, 1, 1)
+        points[1].x = 7
+        points.append(Point(-3, 0))
+        assert points.bounds() == (-3, 0, 7, 1)
+
+    def test_multiply_order(self):
+        from src.points import multiply
+
+        translate = (1, 0, 0, 1, 10, 0)
+        scale = (2, 0, 0, 2, 0, 0)
+        assert multiply(translate, scale) == (2, 0, 0, 2, 20, 0)
+        assert multiply(scale, translate) == (2, 0, 0, 2, 10, 0)
+
+
+class TestDrawingElementPoints:
+    """Test that elements store their points compactly."""
+
+    def test_list_is_converted(self):
+        elem = DrawingElement(tool=ToolType.PEN, points=[Point(0, 0), Point(1, 1)])
+        assert isinstance(elem.points, PointArray)
+        assert elem.points == [Point(0, 0), Point(1, 1)]
+
+    def test_default_is_empty_array(self):
+        elem = DrawingElement(tool=ToolType.PEN)
+        assert isinstance(elem.points, PointArray)
+        assert len(elem.points) == 0
+
+    def test_element_deepcopy_copies_points(self):
+        elem = DrawingElement(tool=ToolType.PEN, points=[Point(0, 0)])
+        clone = copy.deepcopy(elem)
+        clone.points[0].x = 3
+        assert elem.points[0].x == 0
+
+
+class TestSimplify:
+    """Test Ramer-Douglas-Peucker stroke simplification."""
+
+    def test_collinear_points_collapse(self):
+        points = PointArray([Point(i, 2 * i) for i in range(100)])
+        assert simplify(points, 0.5) == [Point(0, 0), Point(99, 198)]
+
+    def test_corners_are_kept(self):
+        points = PointArray(
+            [Point(i, 0) for i in range(10)] + [Point(9, i) for i in range(1, 10)]
+        )
+        assert simplify(points, 0.5) == [Point(0, 0), Point(9, 0), Point(9, 9)]
+
+    def test_stroke_doubling_back_is_kept(self):
+        points = PointArray([Point(0, 0), Point(10, 0), Point(5, 0)])
+        assert len(simplify(points, 0.5)) == 3
+
+    def test_error_stays_within_tolerance(self):
+        points = PointArray([Point(i, 20 * math.sin(i / 15)) for i in range(300)])
+        simplified = simplify(points, 0.5)
+        assert len(simplified) < len(points) / 5
+        for p in points:
+            assert distance_to_polyline(simplified, p.x, p.y) <= 0.5 + 1e-9
+
+    def test_zero_tolerance_copies(self):
+        points = PointArray([Point(0, 0), Point(1, 0), Point(2, 0)])
+        result = simplify(points, 0)
+        assert result == points
+        assert result is not points
@@ -0,0 +1,74 @@
+"""Tests for the render cache module."""
+
+from src.render_cache import DEFAULT_MAX_BYTES, RenderCache
+
+
+class TestRenderCache:
+    """Test RenderCache LRU behaviour."""
+
+    def test_default_budget(self):
+        cache = RenderCache()
+        assert cache.max_bytes == DEFAULT_MAX_BYTES
+        assert len(cache) == 0
+        assert cache.total_bytes == 0
+
+    def test_put_and_get(self):
+        cache = RenderCache(max_bytes=100)
+        cache.put("a", "raster", 10)
+        assert cache.get("a") == "raster"
+        assert "a" in cache
+        assert cache.total_bytes == 10
+
+    def test_get_missing_returns_default(self):
+        cache = RenderCache()
+        assert cache.get("missing") is None
+        assert cache.get("missing", 42) == 42
+        assert cache.misses == 2
+
+    def test_hits_counted(self):
+        cache = RenderCache()
+        cache.put("a", 1, 1)
+        cache.get("a")
+        cache.get("a")
+        assert cache.hits == 2
+
+    def test_evicts_least_recently_used(self):
+        cache = RenderCache(max_bytes=30)
+        cache.put("a", 1, 10)
+        cache.put("b", 2, 10)
+        cache.put("c", 3, 10)
+        cache.get("a")  # "b" is now the oldest
+        cache.put("d", 4, 10)
+        assert "b" not in cache
+        assert "a" in cache and "c" in cache and "d" in cache
+        assert cache.total_bytes == 30
+
+    def test_oversized_value_not_cached(self):
+        cache = RenderCache(max_bytes=10)
+        cache.put("big", 1, 11)
+        assert "big" not in cache
+        assert cache.total_bytes == 0
+
+    def test_replacing_key_updates_size(self):
+        cache = RenderCache(max_bytes=100)
+        cache.put("a", 1, 40)
+        cache.put("a", 2, 10)
+        assert cache.get("a") == 2
+        assert cache.total_bytes == 10
+
+    def test_discard(self):
+        cache = RenderCache()
+        cache.put("a", 1, 10)
+        cache.discard("a")
+        cache.discard("a")
+        assert len(cache) == 0
+        assert cache.total_bytes == 0
+
+    def test_invalidate_clears_and_bumps_generation(self):
+        cache = RenderCache()
+        cache.put("a", 1, 10)
+        generation = cache.generation
+        cache.invalidate()
+        assert len(cache) == 0
+        assert cache.total_bytes == 0
+        assert cache.generation == generation + 1
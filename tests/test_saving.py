@@ -0,0 +1,232 @@
+"""Tests for background saving."""
+
+import os
+import stat
+import threading
+from pathlib import Path
+
+import pytest
+
+from src import saving
+from src.saving import SaveService, pixbuf_format, write_atomic
+
+
+class _EncodingPixbuf:
+    """Pixbuf stand-in whose encoder returns fixed bytes (and can block)."""
+
+    def __init__(self, data=b"encoded", gate=None):
+        self.data = data
+        self.gate = gate
+        self.formats = []
+
+    def save_to_bufferv(self, format_name, keys, values):
+        if self.gate is not None:
+            assert self.gate.wait(5)
+        self.formats.append((format_name, keys, values))
+        return True, self.data
+
+
+@pytest.fixture(autouse=True)
+def no_main_loop(monkeypatch):
+    monkeypatch.setattr(saving, "GLIB_AVAILABLE", False)
+
+
+@pytest.fixture
+def service():
+    service = SaveService(max_workers=2)
+    yield service
+    service.shutdown()
+
+
+class TestWriteAtomic:
+    """Test the temp-file-and-rename writer."""
+
+    def test_writes_and_leaves_no_temp_file(self, tmp_path):
+        target = tmp_path / "sub" / "shot.png"
+        write_atomic(target, b"abc")
+        assert target.read_bytes() == b"abc"
+        assert [p.name for p in target.parent.iterdir()] == ["shot.png"]
+
+    def test_reports_progress_per_chunk(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(saving, "WRITE_CHUNK", 4)
+        counts = []
+        write_atomic(tmp_path / "a.bin", b"0123456789", counts.append)
+        assert counts == [4, 8, 10]
+
+    def test_failure_keeps_old_file(self, tmp_path):
+        target = tmp_path / "shot.png"
+        target.write_bytes(b"old")
+
+        def fail(count):
+            raise OSError("disk full")
+
+        with pytest.raises(OSError):
+            write_atomic(target, b"new", fail)
+        assert target.read_bytes() == b"old"
+        assert [p.name for p in tmp_path.iterdir()] == ["shot.png"]
+
+    def test_new_file_follows_umask(self, tmp_path):
+        old_umask = os.umask(0o022)
+        try:
+            write_atomic(tmp_path / "shot.png", b"abc")
+        finally:
+            os.umask(old_umask)
+        assert stat.S_IMODE((tmp_path / "shot.png").stat().st_mode) == 0o644
+
+    def test_replaced_file_keeps_its_mode(self, tmp_path):
+        target = tmp_path / "shot.png"
+        target.write_bytes(b"old")
+        target.chmod(0o640)
+        write_atomic(target, b"new")
+        assert stat.S_IMODE(target.stat().st_mode) == 0o640
+
+
+class TestPixbufFormat:
+    def test_maps_extensions(self):
+        assert pixbuf_format("JPG") == "jpeg"
+        assert pixbuf_format("png") == "png"
+        assert pixbuf_format("webp") == "png"
+
+
+class TestSaveService:
+    """Test queued saves on worker threads."""
+
+    def test_save_writes_file_and_reports(self, service, tmp_path):
+        target = tmp_path / "shot.jpg"
+        stages = []
+        done = []
+        job = service.save(
+            _EncodingPixbuf(),
+            target,
+            on_done=done.append,
+            on_progress=lambda j: stages.append((j.stage, j.progress)),
+            options={"quality": "90"},
+        )
+        assert job.wait(5)
+        assert job.succeeded
+        assert target.read_bytes() == b"encoded"
+        assert job.format == "jpeg"
+        assert done == [job]
+        assert [stage for stage, _ in stages][:3] == ["rendering", "encoding", "writing"]
+        progress = [p for _, p in stages]
+        assert progress == sorted(progress) and progress[-1] == 1.0
+        assert service.pending == []
+
+    def test_callable_source_runs_on_worker(self, service, tmp_path):
+        threads = []
+
+        def render():
+            threads.append(threading.current_thread())
+            return _EncodingPixbuf()
+
+        job = service.save(render, tmp_path / "a.png")
+        job.wait(5)
+        assert job.succeeded
+        assert threads[0] is not threading.current_thread()
+
+    def test_failure_is_reported(self, service, tmp_path):
+        def broken():
+            raise RuntimeError("no image")
+
+        done = []
+        job = service.save(broken, tmp_path / "a.png", on_done=done.append)
+        job.wait(5)
+        assert job.stage == "failed"
+        assert str(job.error) == "no image"
+        assert done == [job]
+        assert not (tmp_path / "a.png").exists()
+
+    def test_parallelism_is_bounded(self, tmp_path):
+        service = SaveService(max_workers=1)
+        gate = threading.Event()
+        try:
+            first = service.save(_EncodingPixbuf(b"1", gate), tmp_path / "1.png")
+            second = service.save(_EncodingPixbuf(b"2"), tmp_path / "2.png")
+            assert not second.wait(0.1)
+            assert second.stage == "queued"
+            assert service.pending == [first, second]
+            gate.set()
+            assert second.wait(5) and first.succeeded and second.succeeded
+        finally:
+            gate.set()
+            service.shutdown()
+
+    def test_older_save_to_same_file_is_skipped(self, tmp_path):
+        service = SaveService(max_workers=1)
+        gate = threading.Event()
+        try:
+            blocker = service.save(_EncodingPixbuf(b"x", gate), tmp_path / "x.png")
+            target = tmp_path / "shot.png"
+            old = service.save(_EncodingPixbuf(b"old"), target)
+            new = service.save(_EncodingPixbuf(b"new"), target)
+            gate.set()
+            assert new.wait(5) and old.wait(5) and blocker.wait(5)
+            assert old.stage == "superseded"
+            assert new.succeeded
+            assert target.read_bytes() == b"new"
+        finally:
+            gate.set()
+            service.shutdown()
+
+
+class TestSaveCaptureAsync:
+    """Test the capture-level wrapper."""
+
+    def test_saves_capture(self, tmp_path, monkeypatch):
+        from src.capture import CaptureResult, save_capture_async
+
+        service = SaveService()
+        monkeypatch.setattr(saving, "_service", service)
+        results = []
+        pixbuf = _EncodingPixbuf()
+        job = save_capture_async(
+            CaptureResult(True, pixbuf=pixbuf), results.append, tmp_path / "a.png"
+        )
+        job.wait(5)
+        service.shutdown()
+        assert results[0].success
+        assert results[0].filepath == Path(tmp_path / "a.png")
+        assert results[0].pixbuf is pixbuf
+        assert pixbuf.formats[0][0] == "png"
+
+    def test_nothing_to_save(self):
+        from src.capture import CaptureResult, save_capture_async
+
+        results = []
+        assert save_capture_async(CaptureResult(False), results.append) is None
+        assert results[0].success is False
+
+
+class TestOptimizedSave:
+    """Test the opt-in PNG optimizer stage."""
+
+    def test_png_is_optimized_and_savings_reported(self, service, tmp_path):
+        np = pytest.importorskip("numpy")
+        from tests.test_pixels import _FakePixbuf
+
+        class _Flat(_FakePixbuf):
+            def save_to_bufferv(self, format_name, keys, values):
+                return True, b"\0" * 100000
+
+        pixbuf = _Flat(40, 30, padding=0)
+        pixbuf.data = np.full((30, 40, 3), 7, dtype=np.uint8).tobytes()
+        stages = []
+        job = service.save(
+            pixbuf,
+            tmp_path / "a.png",
+            optimize="fast",
+            on_progress=lambda j: stages.append(j.stage),
+        )
+        job.wait(5)
+        assert job.succeeded
+        assert "optimizing" in stages
+        written = (tmp_path / "a.png").read_bytes()
+        assert written.startswith(b"\x89PNG")
+        assert job.saved_bytes == 100000 - len(written)
+
+    def test_other_formats_are_not_optimized(self, service, tmp_path):
+        pixbuf = _EncodingPixbuf()
+        job = service.save(pixbuf, tmp_path / "a.jpg", optimize="small")
+        job.wait(5)
+        assert (tmp_path / "a.jpg").read_bytes() == b"encoded"
+        assert job.saved_bytes == 0
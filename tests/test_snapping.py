@@ -0,0 +1,50 @@
+"""Tests for the snapping module."""
+
+from src.snapping import SnapLines, nearest_line
+
+
+class TestNearestLine:
+    """Test bisect-based nearest line lookup."""
+
+    def test_empty(self):
+        assert nearest_line([], 5) is None
+
+    def test_below_and_above_range(self):
+        assert nearest_line([10, 20, 30], -100) == 10
+        assert nearest_line([10, 20, 30], 100) == 30
+
+    def test_between(self):
+        assert nearest_line([10, 20, 30], 14) == 10
+        assert nearest_line([10, 20, 30], 16) == 20
+
+    def test_exact(self):
+        assert nearest_line([10, 20, 30], 20) == 20
+
+
+class TestSnapLines:
+    """Test SnapLines snapping."""
+
+    def test_lines_sorted_and_unique(self):
+        lines = SnapLines([50, 10, 50], [30, 20])
+        assert lines.h_lines == [10, 50]
+        assert lines.v_lines == [20, 30]
+
+    def test_snap_within_threshold(self):
+        lines = SnapLines([100], [])
+        assert lines.snap_y([95], 10) == (5, 100)
+
+    def test_snap_outside_threshold(self):
+        lines = SnapLines([100], [])
+        assert lines.snap_y([80], 10) is None
+
+    def test_snap_picks_nearest_candidate(self):
+        # Top edge is 8 away from 100, bottom edge only 2 away from 150
+        lines = SnapLines([100, 150], [])
+        assert lines.snap_y([92, 117, 148], 10) == (2, 150)
+
+    def test_snap_exact_alignment(self):
+        lines = SnapLines([], [40])
+        assert lines.snap_x([40, 60, 80], 10) == (0, 40)
+
+    def test_no_lines(self):
+        assert SnapLines([], []).snap_x([10], 10) is None
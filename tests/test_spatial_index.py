@@ -0,0 +1,68 @@
+"""Tests for the spatial index module."""
+
+from src.spatial_index import SpatialIndex
+
+
+class TestSpatialIndex:
+    """Test SpatialIndex insert/remove/query."""
+
+    def test_empty(self):
+        index = SpatialIndex()
+        assert len(index) == 0
+        assert index.query_point(0, 0) == set()
+        assert index.query_rect((0, 0, 100, 100)) == set()
+
+    def test_insert_and_query_point(self):
+        index = SpatialIndex(cell_size=64)
+        index.insert("a", (10, 10, 50, 50))
+        index.insert("b", (40, 40, 300, 300))
+        assert index.query_point(20, 20) == {"a"}
+        assert index.query_point(45, 45) == {"a", "b"}
+        assert index.query_point(250, 250) == {"b"}
+        assert index.query_point(500, 500) == set()
+
+    def test_query_point_respects_bbox_within_cell(self):
+        index = SpatialIndex(cell_size=256)
+        index.insert("a", (0, 0, 10, 10))
+        assert index.query_point(100, 100) == set()
+
+    def test_query_rect(self):
+        index = SpatialIndex(cell_size=64)
+        index.insert("a", (0, 0, 10, 10))
+        index.insert("b", (1000, 1000, 1010, 1010))
+        assert index.query_rect((-5, -5, 5, 5)) == {"a"}
+        assert index.query_rect((0, 0, 2000, 2000)) == {"a", "b"}
+
+    def test_query_rect_large_sparse(self):
+        index = SpatialIndex(cell_size=16)
+        index.insert("a", (5000, 5000, 5010, 5010))
+        assert index.query_rect((0, 0, 100000, 100000)) == {"a"}
+
+    def test_insert_replaces(self):
+        index = SpatialIndex(cell_size=64)
+        index.insert("a", (0, 0, 10, 10))
+        index.insert("a", (500, 500, 510, 510))
+        assert len(index) == 1
+        assert index.query_point(5, 5) == set()
+        assert index.query_point(505, 505) == {"a"}
+        assert index.bbox("a") == (500, 500, 510, 510)
+
+    def test_remove(self):
+        index = SpatialIndex()
+        index.insert("a", (0, 0, 10, 10))
+        index.remove("a")
+        index.remove("missing")
+        assert "a" not in index
+        assert index.query_point(5, 5) == set()
+        assert index._cells == {}
+
+    def test_negative_coordinates(self):
+        index = SpatialIndex(cell_size=64)
+        index.insert("a", (-100, -100, -90, -90))
+        assert index.query_point(-95, -95) == {"a"}
+
+    def test_clear(self):
+        index = SpatialIndex()
+        index.insert("a", (0, 0, 10, 10))
+        index.clear()
+        assert len(index) == 0
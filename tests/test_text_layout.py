@@ -0,0 +1,106 @@
+"""Tests for the text layout cache."""
+
+from unittest.mock import MagicMock, call
+
+import pytest
+
+from src.text_layout import TOY_LINE_SPACING, TextLayout, TextLayoutCache
+
+
+class _ToyContext:
+    """Stand-in for a cairo context: 10 units per character, 8 high."""
+
+    def select_font_face(self, *args):
+        pass
+
+    def set_font_size(self, size):
+        pass
+
+    def font_extents(self):
+        return (9.0, 3.0, 12.0, 100.0, 0.0)
+
+    def text_extents(self, text):
+        if not text.strip():
+            return (0.0, 0.0, 0.0, 0.0, len(text) * 10.0, 0.0)
+        return (1.0, -8.0, len(text) * 10.0 - 2, 8.0, len(text) * 10.0, 0.0)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """TextLayoutCache measuring with the toy stand-in context."""
+    monkeypatch.setattr("src.text_layout.PANGO_AVAILABLE", False)
+    cache = TextLayoutCache(max_layouts=3)
+    cache._toy_context = _ToyContext()
+    return cache
+
+
+class TestTextLayoutCache:
+    """Test TextLayoutCache LRU behaviour."""
+
+    def test_layouts_are_reused(self, cache):
+        first = cache.get("Hi", "Sans", 12)
+        assert cache.get("Hi", "Sans", 12) is first
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_key_covers_font(self, cache):
+        cache.max_layouts = 10
+        cache.get("Hi", "Sans", 12)
+        cache.get("Hi", "Serif", 12)
+        cache.get("Hi", "Sans", 14)
+        cache.get("Hi", "Sans", 12, bold=True)
+        cache.get("Hi", "Sans", 12, italic=True)
+        assert (cache.hits, cache.misses) == (0, 5)
+
+    def test_evicts_least_recently_used(self, cache):
+        a = cache.get("a", "Sans", 12)
+        cache.get("b", "Sans", 12)
+        cache.get("c", "Sans", 12)
+        cache.get("a", "Sans", 12)
+        cache.get("d", "Sans", 12)
+        assert len(cache) == 3
+        assert cache.get("a", "Sans", 12) is a
+        misses = cache.misses
+        cache.get("b", "Sans", 12)
+        assert cache.misses == misses + 1
+
+    def test_unmeasurable_is_not_cached(self, cache):
+        cache._toy_context = False
+        assert cache.get("Hi", "Sans", 12) is None
+        assert len(cache) == 0
+
+    def test_clear(self, cache):
+        cache.get("Hi", "Sans", 12)
+        cache.clear()
+        assert len(cache) == 0
+
+
+class TestToyLayout:
+    """Test the cairo toy-font fallback."""
+
+    def test_single_line_metrics(self, cache):
+        layout = cache.get("abc", "Sans", 12)
+        assert layout.ink == (1.0, -8.0, 29.0, 0.0)
+        assert layout.logical == (0.0, -9.0, 30.0, 3.0)
+        assert layout.width == 28 and layout.height == 8
+
+    def test_lines_stack_below_first_baseline(self, cache):
+        layout = cache.get("ab\n\nabcd", "Sans", 10)
+        advance = 10 * TOY_LINE_SPACING
+        assert layout.ink == (1.0, -8.0, 39.0, 2 * advance)
+        assert layout.logical == (0.0, -9.0, 40.0, 2 * advance + 3.0)
+
+    def test_show_draws_each_line(self, cache):
+        layout = cache.get("a\nb", "Sans", 10, bold=True)
+        ctx = MagicMock()
+        layout.show(ctx, 5, 20)
+        ctx.select_font_face.assert_called_once_with("Sans", 0, 1)
+        assert ctx.move_to.call_args_list == [call(5, 20), call(5, 20 + 13.0)]
+        assert ctx.show_text.call_args_list == [call("a"), call("b")]
+
+
+class TestTextLayout:
+    """Test TextLayout geometry helpers."""
+
+    def test_size_from_ink(self):
+        layout = TextLayout((2, -10, 12, 3), (0, -12, 14, 4))
+        assert (layout.width, layout.height) == (10, 13)
@@ -0,0 +1,70 @@
+"""Tests for the tiled image module."""
+
+from unittest.mock import MagicMock
+
+from src.tiled_image import TILE_SIZE, TiledImage, iter_tiles
+
+
+def _pixbuf(width, height):
+    pixbuf = MagicMock()
+    pixbuf.get_width.return_value = width
+    pixbuf.get_height.return_value = height
+    pixbuf.new_subpixbuf.side_effect = lambda x, y, w, h: ("tile", x, y, w, h)
+    return pixbuf
+
+
+class TestIterTiles:
+    """Test tile grid layout."""
+
+    def test_covers_image_exactly(self):
+        tiles = list(iter_tiles(2500, 1100, tile_size=1024))
+        assert len(tiles) == 3 * 2
+        assert sum(w * h for _, _, w, h in tiles) == 2500 * 1100
+        assert tiles[-1] == (2048, 1024, 452, 76)
+
+    def test_beyond_cairo_limit(self):
+        # A 50-frame 1080p scroll capture
+        tiles = list(iter_tiles(1920, 54000))
+        assert max(h for _, _, _, h in tiles) <= TILE_SIZE
+        assert sum(w * h for _, _, w, h in tiles) == 1920 * 54000
+
+    def test_region_limits_tiles(self):
+        tiles = list(iter_tiles(4096, 40000, 1024, region=(100, 30000, 200, 30100)))
+        assert tiles == [(0, 29696, 1024, 1024)]
+
+    def test_region_spanning_tile_border(self):
+        tiles = list(iter_tiles(4096, 4096, 1024, region=(1000, 0, 1100, 10)))
+        assert [(x, y) for x, y, _, _ in tiles] == [(0, 0), (1024, 0)]
+
+    def test_region_outside_image(self):
+        assert list(iter_tiles(100, 100, 64, region=(200, 200, 300, 300))) == []
+
+
+class TestTiledImage:
+    """Test lazy tile creation."""
+
+    def test_size(self):
+        image = TiledImage(_pixbuf(100, 40000))
+        assert image.get_width() == 100
+        assert image.get_height() == 40000
+
+    def test_tiles_created_lazily(self):
+        pixbuf = _pixbuf(2048, 40000)
+        image = TiledImage(pixbuf)
+        assert len(image) == 0
+        tiles = list(image.tiles(region=(0, 0, 10, 10)))
+        assert tiles == [(0, 0, ("tile", 0, 0, 1024, 1024))]
+        assert len(image) == 1
+
+    def test_tiles_are_reused(self):
+        pixbuf = _pixbuf(2048, 2048)
+        image = TiledImage(pixbuf)
+        list(image.tiles())
+        list(image.tiles())
+        assert pixbuf.new_subpixbuf.call_count == 4
+        assert len(image) == 4
+
+    def test_edge_tiles_are_clipped(self):
+        image = TiledImage(_pixbuf(1500, 100))
+        tiles = [tile for _, _, tile in image.tiles()]
+        assert tiles == [("tile", 0, 0, 1024, 100), ("tile", 1024, 0, 476, 100)]